@@ -1,2 +1,5 @@
 from hm_pyhelper.diagnostics.diagnostics_report import DiagnosticsReport  # noqa F401
-from hm_pyhelper.diagnostics.diagnostic import Diagnostic  # noqa F401
\ No newline at end of file
+from hm_pyhelper.diagnostics.diagnostic import Diagnostic  # noqa F401
+from hm_pyhelper.diagnostics.diagnostic import AsyncDiagnostic  # noqa F401
+from hm_pyhelper.diagnostics.compact_report import CompactDiagnosticsReport  # noqa F401
+from hm_pyhelper.diagnostics.error_index import ErrorKeyGroup  # noqa F401
@@ -0,0 +1,251 @@
+"""
+Compact binary encoding of diagnostics reports.
+
+Values are encoded like JSON values, with a one byte type tag. Keys from
+hm_pyhelper.constants.diagnostics, and strings equal to one of them such
+as the entries of the errors list, are encoded as small integer field
+ids instead of text.
+
+FIELD_KEYS is append-only: field ids are positions in it, so existing
+entries must never be reordered or removed.
+"""
+import struct
+
+from hm_pyhelper.constants import diagnostics as keys
+from hm_pyhelper.diagnostics.diagnostics_report import DiagnosticsReport, \
+    DIAGNOSTICS_PASSED_KEY, SERIALIZATION_LEGACY
+from hm_pyhelper.diagnostics.timings import DIAGNOSTICS_TIMINGS_KEY
+
+FORMAT_VERSION = 1
+MAGIC = b'\xd1'
+
+# Field id 0 is reserved for keys sent as text
+FIELD_KEYS = (
+    None,
+    DIAGNOSTICS_PASSED_KEY,
+    keys.ERRORS_KEY,
+    keys.BALENA_DEVICE_ID_KEY,
+    keys.BALENA_NAME_KEY,
+    keys.BLUETOOTH_KEY,
+    keys.DEVICE_STATUS_KEY,
+    keys.DISK_IMAGE_KEY,
+    keys.ECC_KEY,
+    keys.ETH_MAC_ADDRESS_KEY,
+    keys.FIRMWARE_SHORT_HASH_KEY,
+    keys.FIRMWARE_VERSION_KEY,
+    keys.FREQUENCY_KEY,
+    keys.LORA_KEY,
+    keys.LTE_KEY,
+    keys.ONBOARDING_KEY,
+    keys.PF_KEY,
+    keys.PUBLIC_KEY,
+    keys.SERIAL_NUMBER_KEY,
+    keys.VARIANT_KEY,
+    keys.WIFI_MAC_ADDRESS_KEY,
+    keys.VALIDATOR_ADDRESS_KEY,
+    keys.VALIDATOR_URI_KEY,
+    keys.VALIDATOR_BLOCK_HEIGHT_KEY,
+    keys.VALIDATOR_BLOCK_HEIGHT_SHORT_KEY,
+    keys.VALIDATOR_BLOCK_AGE,
+    keys.GATEWAY_PUBKEY_KEY,
+    keys.GATEWAY_REGION_KEY,
+    keys.GATEWAY_REGION_SHORT_KEY,
+    DIAGNOSTICS_TIMINGS_KEY
+)
+FIELD_IDS = {key: field_id for field_id, key in enumerate(FIELD_KEYS)
+             if key is not None}
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STR = 5
+# A string from FIELD_KEYS, sent as its field id
+TAG_FIELD = 6
+TAG_LIST = 7
+TAG_DICT = 8
+
+_CONSTANTS = {TAG_NONE: None, TAG_FALSE: False, TAG_TRUE: True}
+_DOUBLE = struct.Struct('<d')
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_str(out: bytearray, value: str):
+    data = value.encode('utf-8')
+    _write_varint(out, len(data))
+    out += data
+
+
+def _write_key(out: bytearray, key):
+    if not isinstance(key, str):
+        raise TypeError("Keys must be str, not %s" % type(key).__name__)
+    field_id = FIELD_IDS.get(key)
+    if field_id is None:
+        out.append(0)
+        _write_str(out, key)
+    else:
+        _write_varint(out, field_id)
+
+
+def _write_value(out: bytearray, value):
+    if value is None:
+        out.append(TAG_NONE)
+    elif value is True:
+        out.append(TAG_TRUE)
+    elif value is False:
+        out.append(TAG_FALSE)
+    elif isinstance(value, str):
+        field_id = FIELD_IDS.get(value)
+        if field_id is None:
+            out.append(TAG_STR)
+            _write_str(out, value)
+        else:
+            out.append(TAG_FIELD)
+            _write_varint(out, field_id)
+    elif isinstance(value, int):
+        out.append(TAG_INT)
+        # zigzag, so small negative numbers stay short
+        _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif isinstance(value, float):
+        out.append(TAG_FLOAT)
+        out += _DOUBLE.pack(value)
+    else:
+        _write_container(out, value)
+
+
+def _write_container(out: bytearray, value):
+    if isinstance(value, dict):
+        out.append(TAG_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            _write_key(out, key)
+            _write_value(out, item)
+    elif isinstance(value, (list, tuple)):
+        out.append(TAG_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _write_value(out, item)
+    else:
+        raise TypeError("Object of type %s can't be encoded"
+                        % type(value).__name__)
+
+
+def encode_report(report: dict, mode: str = SERIALIZATION_LEGACY) -> bytes:
+    """
+    Returns report encoded in the binary format. DiagnosticsReports are
+    serialized in mode, see DiagnosticsReport.to_dict.
+
+    Raises:
+        - TypeError if report contains values JSON can't encode either.
+    """
+    if isinstance(report, DiagnosticsReport):
+        report = report.to_dict(mode)
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _write_value(out, report)
+    return bytes(out)
+
+
+class _Reader(object):
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def byte(self) -> int:
+        try:
+            value = self.data[self.pos]
+        except IndexError:
+            raise ValueError("Truncated diagnostics report")
+        self.pos += 1
+        return value
+
+    def varint(self) -> int:
+        value = self.byte()
+        if value < 0x80:
+            return value
+        value &= 0x7f
+        shift = 7
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def bytes(self, length) -> bytes:
+        end = self.pos + length
+        if end > len(self.data):
+            raise ValueError("Truncated diagnostics report")
+        value = self.data[self.pos:end]
+        self.pos = end
+        return value
+
+    def str(self) -> str:
+        try:
+            return self.bytes(self.varint()).decode('utf-8')
+        except UnicodeDecodeError:
+            raise ValueError("Invalid string in diagnostics report")
+
+    def field(self) -> str:
+        field_id = self.varint()
+        if field_id == 0 or field_id >= len(FIELD_KEYS):
+            raise ValueError("Unknown field id %d" % field_id)
+        return FIELD_KEYS[field_id]
+
+    def key(self) -> str:
+        field_id = self.varint()
+        if field_id == 0:
+            return self.str()
+        if field_id >= len(FIELD_KEYS):
+            raise ValueError("Unknown field id %d" % field_id)
+        return FIELD_KEYS[field_id]
+
+    def value(self):
+        tag = self.byte()
+        if tag in _CONSTANTS:
+            return _CONSTANTS[tag]
+        if tag == TAG_INT:
+            value = self.varint()
+            return -((value + 1) >> 1) if value & 1 else value >> 1
+        if tag == TAG_FLOAT:
+            return _DOUBLE.unpack(self.bytes(_DOUBLE.size))[0]
+        if tag == TAG_STR:
+            return self.str()
+        if tag == TAG_FIELD:
+            return self.field()
+        if tag == TAG_LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == TAG_DICT:
+            result = {}
+            for _ in range(self.varint()):
+                key = self.key()
+                result[key] = self.value()
+            return result
+        raise ValueError("Unknown value tag %d" % tag)
+
+
+def decode_report(data: bytes) -> DiagnosticsReport:
+    """
+    Returns the DiagnosticsReport encoded in data by encode_report.
+
+    Raises:
+        - ValueError if data is not a valid encoded report.
+    """
+    if data[:1] != MAGIC or len(data) < 2:
+        raise ValueError("Not an encoded diagnostics report")
+    if data[1] != FORMAT_VERSION:
+        raise ValueError("Unsupported encoding version %d" % data[1])
+
+    reader = _Reader(data)
+    reader.pos = 2
+    report_dict = reader.value()
+    if not isinstance(report_dict, dict) or reader.pos != len(data):
+        raise ValueError("Not an encoded diagnostics report")
+    return DiagnosticsReport.from_json_dict(report_dict)
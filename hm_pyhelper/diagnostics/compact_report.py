@@ -0,0 +1,100 @@
+from typing import Union
+
+from hm_pyhelper.diagnostics.diagnostics_report import DiagnosticsReport, \
+    DIAGNOSTICS_ERRORS_KEY
+from hm_pyhelper.diagnostics.error_index import ErrorIndex
+
+
+class CompactDiagnosticsReport(DiagnosticsReport):
+    """
+    DiagnosticsReport storing each result once, under the key of its
+    diagnostic, instead of under both key and friendly key. Friendly
+    keys still work for reading, writing and checking errors, they are
+    resolved to the key of the diagnostic having that friendly key.
+
+    The errors list only holds keys. Use to_dict() or to_json() to get
+    a report in legacy format, with both names.
+
+    Usage:
+        report = CompactDiagnosticsReport([ExampleDiagnostic()])
+        report.perform_diagnostics()
+        report['friendly_key'] == report['key']
+        upload(report.to_json(SERIALIZATION_FRIENDLY))
+    """
+
+    def __init__(self, diagnostics=[], **kwargs):
+        super(CompactDiagnosticsReport, self).__init__(diagnostics, **kwargs)
+        # Fold results deserialized under both names
+        for friendly_key, key in self._terse_keys.items():
+            if dict.__contains__(self, friendly_key):
+                value = dict.pop(self, friendly_key)
+                if not dict.__contains__(self, key):
+                    dict.__setitem__(self, key, value)
+        self[DIAGNOSTICS_ERRORS_KEY] = ErrorIndex(
+            self._resolve(error) for error in self[DIAGNOSTICS_ERRORS_KEY])
+
+    def _resolve(self, key):
+        return self._terse_keys.get(key, key)
+
+    def __getitem__(self, key):
+        return super(CompactDiagnosticsReport, self).__getitem__(
+            self._resolve(key))
+
+    def __setitem__(self, key, value):
+        super(CompactDiagnosticsReport, self).__setitem__(
+            self._resolve(key), value)
+
+    def __delitem__(self, key):
+        super(CompactDiagnosticsReport, self).__delitem__(self._resolve(key))
+
+    def __contains__(self, key):
+        return super(CompactDiagnosticsReport, self).__contains__(
+            self._resolve(key))
+
+    def get(self, key, default=None):
+        return super(CompactDiagnosticsReport, self).get(
+            self._resolve(key), default)
+
+    def pop(self, key, *default):
+        return super(CompactDiagnosticsReport, self).pop(
+            self._resolve(key), *default)
+
+    def setdefault(self, key, default=None):
+        return super(CompactDiagnosticsReport, self).setdefault(
+            self._resolve(key), default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def append_error(self, key):
+        terse_key = self._resolve(key)
+        with self._lock:
+            errors = self._error_index()
+            # record_failure appends both names of a diagnostic, count
+            # them once
+            if terse_key != key and terse_key in errors:
+                return
+            errors.append(terse_key)
+
+    def has_errors(self, keys_to_check: Union[tuple, list, set] = None) -> set:
+        """
+        See DiagnosticsReport.has_errors. Friendly keys in keys_to_check
+        are returned if their diagnostic has an error.
+        """
+        if keys_to_check is None:
+            return self[DIAGNOSTICS_ERRORS_KEY]
+
+        errors = self._error_index()
+        return {key for key in keys_to_check if self._resolve(key) in errors}
+
+    def has_any_error(self, keys_to_check: Union[tuple, list, set]) -> bool:
+        errors = self._error_index()
+        return any(self._resolve(key) in errors for key in keys_to_check)
+
+    def get_missing_keys(self, required_keys: set) -> set:
+        return {key for key in required_keys if key not in self}
@@ -0,0 +1,165 @@
+"""
+Delta encoding of successive diagnostics reports, so devices can upload
+only what changed since their previous upload.
+"""
+import copy
+
+from hm_pyhelper.diagnostics.diagnostics_report import \
+    DIAGNOSTICS_ERRORS_KEY, SERIALIZATION_LEGACY
+from hm_pyhelper.exceptions import DiagnosticsDeltaSequenceError
+from hm_pyhelper.hardware_definitions import get_variant_attribute
+
+# Messages between two full snapshots on cellular variants, so a
+# receiver that missed a message recovers eventually.
+DEFAULT_FULL_SNAPSHOT_INTERVAL = 24
+
+
+def diff_reports(old: dict, new: dict) -> dict:
+    """
+    Returns the delta turning report old into report new, see
+    apply_delta. Sections without changes are left out, the delta of
+    identical reports is {}.
+    {
+        "changed": dict
+            keys of both reports with a different value -> new value,
+        "added": dict
+            keys only in new -> value,
+        "removed": list
+            keys only in old,
+        "errors_added": list
+            errors of new not in old, in order,
+        "errors_removed": list
+            errors of old not in new
+    }
+    """
+    delta = {
+        'changed': {key: value for key, value in new.items()
+                    if key in old and key != DIAGNOSTICS_ERRORS_KEY
+                    and old[key] != value},
+        'added': {key: value for key, value in new.items()
+                  if key not in old},
+        'removed': [key for key in old if key not in new]
+    }
+
+    old_errors = old.get(DIAGNOSTICS_ERRORS_KEY)
+    new_errors = new.get(DIAGNOSTICS_ERRORS_KEY)
+    if old_errors is not None and new_errors is not None:
+        new_set = set(new_errors)
+        old_set = set(old_errors)
+        errors_added = [key for key in new_errors if key not in old_set]
+        errors_removed = [key for key in old_errors if key not in new_set]
+        if [key for key in old_errors if key in new_set] + errors_added \
+                == list(new_errors):
+            delta['errors_added'] = errors_added
+            delta['errors_removed'] = errors_removed
+        else:
+            # Reordered, send the whole list
+            delta['changed'][DIAGNOSTICS_ERRORS_KEY] = new_errors
+
+    return {section: changes for section, changes in delta.items() if changes}
+
+
+def apply_delta(report: dict, delta: dict) -> dict:
+    """
+    Returns a copy of report with delta, from diff_reports, applied.
+    """
+    result = copy.deepcopy(report)
+    for key in delta.get('removed', ()):
+        result.pop(key, None)
+    result.update(copy.deepcopy(delta.get('changed', {})))
+    result.update(copy.deepcopy(delta.get('added', {})))
+
+    if 'errors_added' in delta or 'errors_removed' in delta:
+        removed = set(delta.get('errors_removed', ()))
+        result[DIAGNOSTICS_ERRORS_KEY] = \
+            [key for key in result.get(DIAGNOSTICS_ERRORS_KEY, ())
+             if key not in removed] + list(delta.get('errors_added', ()))
+    return result
+
+
+class DeltaEncoder(object):
+    """
+    Encodes successive reports of a device as upload messages:
+        {"seq": int, "snapshot": dict}
+            the whole report, first and every full_snapshot_interval
+            messages, or after reset(),
+        {"seq": int, "delta": dict}
+            changes since the report of message seq - 1.
+    seq increases by one with every message. Call reset() when an
+    upload failed, so the next message is a snapshot again.
+    """
+
+    def __init__(self, full_snapshot_interval=DEFAULT_FULL_SNAPSHOT_INTERVAL,
+                 mode=SERIALIZATION_LEGACY):
+        if full_snapshot_interval < 1:
+            raise ValueError("full_snapshot_interval must be at least 1")
+        self.full_snapshot_interval = full_snapshot_interval
+        self.mode = mode
+        self.sequence = 0
+        self._previous = None
+        self._snapshot_sequence = None
+
+    @classmethod
+    def for_variant(cls, variant_name, **kwargs):
+        """
+        Returns an encoder sending deltas on cellular variants, and full
+        snapshots only on others.
+        """
+        if not get_variant_attribute(variant_name, 'CELLULAR'):
+            kwargs['full_snapshot_interval'] = 1
+        return cls(**kwargs)
+
+    def reset(self):
+        self._previous = None
+
+    def encode(self, report) -> dict:
+        if hasattr(report, 'to_dict'):
+            report_dict = copy.deepcopy(report.to_dict(self.mode))
+        else:
+            report_dict = copy.deepcopy(dict(report))
+
+        self.sequence += 1
+        if self._previous is None or self.sequence - self._snapshot_sequence \
+                >= self.full_snapshot_interval:
+            message = {'seq': self.sequence, 'snapshot': report_dict}
+            self._snapshot_sequence = self.sequence
+        else:
+            message = {'seq': self.sequence,
+                       'delta': diff_reports(self._previous, report_dict)}
+        self._previous = report_dict
+        return message
+
+
+class DeltaDecoder(object):
+    """
+    Rebuilds the reports of a device from the messages of its
+    DeltaEncoder.
+    """
+
+    def __init__(self):
+        self.sequence = None
+        self.report = None
+
+    def decode(self, message: dict) -> dict:
+        """
+        Returns the report carried by message.
+
+        Raises:
+            - DiagnosticsDeltaSequenceError if message is a delta not
+              following the previous message. Reports can be decoded
+              again from the next snapshot.
+        """
+        if 'snapshot' in message:
+            self.report = copy.deepcopy(message['snapshot'])
+        elif self.sequence is None or message['seq'] != self.sequence + 1:
+            expected = None if self.sequence is None else self.sequence + 1
+            self.sequence = None
+            self.report = None
+            raise DiagnosticsDeltaSequenceError(
+                "Expected message %s but got delta %s"
+                % (expected, message['seq']))
+        else:
+            self.report = apply_delta(self.report, message['delta'])
+
+        self.sequence = message['seq']
+        return copy.deepcopy(self.report)
@@ -0,0 +1,85 @@
+from typing import Optional
+
+from hm_pyhelper.diagnostics.diagnostic import Diagnostic
+
+
+class DependencyGraph(object):
+    """
+    Orders diagnostics according to their depends_on keys. A diagnostic
+    is ready once every diagnostic providing one of its dependencies,
+    by key or friendly_key, has completed. Dependencies on keys no
+    diagnostic provides are ignored here.
+
+    Ready diagnostics are handed out in list order, so diagnostics
+    without dependencies run in the order they were given.
+    """
+
+    def __init__(self, diagnostics):
+        providers = {}
+        for diagnostic in diagnostics:
+            providers[diagnostic.key] = diagnostic
+            providers[diagnostic.friendly_key] = diagnostic
+
+        self._waiting = list(diagnostics)
+        self._completed = set()
+        self._prerequisites = {}
+        for diagnostic in diagnostics:
+            self._prerequisites[diagnostic] = [
+                providers[key] for key in diagnostic.depends_on
+                if key in providers and providers[key] is not diagnostic
+            ]
+        self._check_cycles()
+
+    def _check_cycles(self):
+        visited = set()
+
+        def visit(diagnostic, path):
+            if diagnostic in path:
+                cycle = path[path.index(diagnostic):] + [diagnostic]
+                raise ValueError("Diagnostics dependency cycle: %s"
+                                 % ' -> '.join(d.key for d in cycle))
+            if diagnostic in visited:
+                return
+            for prerequisite in self._prerequisites[diagnostic]:
+                visit(prerequisite, path + [diagnostic])
+            visited.add(diagnostic)
+
+        for diagnostic in self._waiting:
+            visit(diagnostic, [])
+
+    def has_waiting(self) -> bool:
+        return bool(self._waiting)
+
+    def pop_ready(self) -> Optional[Diagnostic]:
+        """
+        Returns the next diagnostic whose prerequisites have completed,
+        or None if none is ready yet.
+        """
+        for i, diagnostic in enumerate(self._waiting):
+            if all(prerequisite in self._completed
+                   for prerequisite in self._prerequisites[diagnostic]):
+                return self._waiting.pop(i)
+        return None
+
+    def complete(self, diagnostic):
+        self._completed.add(diagnostic)
+
+    def complete_unchanged(self, unchanged):
+        """
+        Completes the diagnostics in unchanged without handing them out,
+        except those depending, directly or not, on a diagnostic that
+        still has to run. Returns the diagnostics completed this way.
+        """
+        unchanged = set(unchanged)
+        completed = []
+        ready = True
+        while ready:
+            ready = [diagnostic for diagnostic in self._waiting
+                     if diagnostic in unchanged and
+                     all(prerequisite in self._completed
+                         for prerequisite in self._prerequisites[diagnostic])]
+            for diagnostic in ready:
+                self._waiting.remove(diagnostic)
+                self._completed.add(diagnostic)
+            completed.extend(ready)
+        return completed
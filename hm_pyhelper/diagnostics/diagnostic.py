@@ -4,14 +4,39 @@ class Diagnostic():
     a type of diagnostic reading to a DiagnosticReport.
     """
 
-    def __init__(self, key, friendly_key):
+    # Keys of the diagnostics that must pass before this one runs.
+    # Extending classes can override this, or pass depends_on.
+    depends_on = ()
+
+    # Seconds a passing result stays fresh. A DiagnosticsReport runs the
+    # diagnostic again only once its result is older than that. None
+    # runs it every time, suitable for anything that can change.
+    ttl = None
+
+    def __init__(self, key, friendly_key, depends_on=None):
         """
         key - Key of relevant value in diagnostics_report dictionary
         friendly_key - Same as key but a human_friendly_snake_case
                         version. To replace key eventually.
+        depends_on - Keys (or friendly keys) of diagnostics this one
+                        depends on. If any of them fails, this one is
+                        recorded as failed without running.
         """
         self.key = key
         self.friendly_key = friendly_key
+        if depends_on is not None:
+            self.depends_on = tuple(depends_on)
 
     def perform_test(self, diagnostics_report):
         raise Exception("Should be implemented by extending class")
+
+
+class AsyncDiagnostic(Diagnostic):
+    """
+    Diagnostic whose perform_test is a coroutine, for diagnostics mostly
+    waiting on I/O. DiagnosticsReport.perform_diagnostics_async awaits
+    it on the event loop, perform_diagnostics runs it with asyncio.run.
+    """
+
+    async def perform_test(self, diagnostics_report):
+        raise Exception("Should be implemented by extending class")
@@ -1,5 +1,23 @@
-from typing import Union
+from typing import AsyncIterator, Callable, Iterator, NamedTuple, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import copyreg
 import json
+import queue
+import threading
+import time
+
+from hm_pyhelper.diagnostics.dependency_graph import DependencyGraph
+from hm_pyhelper.diagnostics.diagnostic import AsyncDiagnostic, Diagnostic
+from hm_pyhelper.diagnostics.error_index import ErrorIndex
+from hm_pyhelper.diagnostics.timings import DiagnosticsTimings, \
+    DIAGNOSTICS_TIMINGS_KEY, OUTCOME_CANCELLED, OUTCOME_ERROR, \
+    OUTCOME_FAILED, OUTCOME_PASSED, OUTCOME_SKIPPED, OUTCOME_TIMEOUT, \
+    cpu_timed
+from hm_pyhelper.exceptions import DiagnosticTimeout
+from hm_pyhelper.logger import get_logger
+
+LOGGER = get_logger(__name__)
 
 # Name of key in diagnostics containing meta-information about
 # the overall state of the miner.
@@ -9,6 +27,18 @@ DIAGNOSTICS_PASSED_KEY = 'diagnostics_passed'
 # that are considered to be errors.
 DIAGNOSTICS_ERRORS_KEY = 'errors'
 
+# to_dict modes. Legacy reports carry each result under both the terse
+# key and the friendly key of its diagnostic, other modes under one.
+SERIALIZATION_LEGACY = 'legacy'
+SERIALIZATION_FRIENDLY = 'friendly'
+SERIALIZATION_TERSE = 'terse'
+
+
+class DiagnosticEvent(NamedTuple):
+    diagnostic: Diagnostic
+    result: object
+    passed: bool
+
 
 class DiagnosticsReport(dict):
 
@@ -28,14 +58,57 @@ class DiagnosticsReport(dict):
                                 "errors": ["blah"], "ECC": false}'
             report = DiagnosticsReport.from_json_str(report_json_str)
         """
+        # friendly key -> key, and key -> friendly key, of the diagnostics
+        # known to this report
+        self._terse_keys = {}
+        self._friendly_keys = {}
+        for diagnostic in diagnostics:
+            # Only diagnostics have aliases, skip anything else passed in
+            if isinstance(diagnostic, Diagnostic):
+                self._add_alias(diagnostic)
         super(DiagnosticsReport, self).__init__(kwargs)
 
         if DIAGNOSTICS_PASSED_KEY not in self:
             self.__setitem__(DIAGNOSTICS_PASSED_KEY, False)
 
-        if DIAGNOSTICS_ERRORS_KEY not in self:
-            self.__setitem__(DIAGNOSTICS_ERRORS_KEY, [])
+        self.__setitem__(DIAGNOSTICS_ERRORS_KEY, ErrorIndex(
+            self.get(DIAGNOSTICS_ERRORS_KEY, ())))
         self.diagnostics = diagnostics
+        self._init_run_state()
+        # Key of each diagnostic that passed -> when it completed
+        self._performed_at = {}
+        self._recording_failure = False
+
+    def _add_alias(self, diagnostic):
+        if diagnostic.friendly_key != diagnostic.key:
+            self._terse_keys[diagnostic.friendly_key] = diagnostic.key
+            self._friendly_keys[diagnostic.key] = diagnostic.friendly_key
+
+    # Per run state, not copied or pickled
+    _RUN_STATE = ('_lock', '_abandoned', '_subscribers', '_timings')
+
+    def _init_run_state(self):
+        # Guards writes made by diagnostics running in worker threads
+        self._lock = threading.RLock()
+        # Threads of diagnostics that timed out, their late results
+        # are dropped
+        self._abandoned = set()
+        # DiagnosticsTimings of the current run, if requested
+        self._timings = None
+        self._subscribers = []
+
+    def __reduce__(self):
+        # Items are restored together with the attributes, subclasses
+        # resolving keys in __setitem__ need the aliases first
+        state = {name: value for name, value in self.__dict__.items()
+                 if name not in self._RUN_STATE}
+        return copyreg.__newobj__, (self.__class__,), (state, dict(self))
+
+    def __setstate__(self, state):
+        attributes, items = state
+        self.__dict__.update(attributes)
+        self._init_run_state()
+        dict.update(self, items)
 
     def passed(self):
         return self[DIAGNOSTICS_PASSED_KEY]
@@ -43,8 +116,27 @@ class DiagnosticsReport(dict):
     def set_passed(self, passed):
         self.__setitem__(DIAGNOSTICS_PASSED_KEY, passed)
 
+    def _error_index(self) -> ErrorIndex:
+        errors = self[DIAGNOSTICS_ERRORS_KEY]
+        if not isinstance(errors, ErrorIndex):
+            # The errors list was replaced by a plain one
+            errors = ErrorIndex(errors)
+            self.__setitem__(DIAGNOSTICS_ERRORS_KEY, errors)
+        return errors
+
     def append_error(self, key):
-        self.__getitem__(DIAGNOSTICS_ERRORS_KEY).append(key)
+        """
+        Add key to the errors, or count it once more if it already is.
+        """
+        with self._lock:
+            self._error_index().append(key)
+
+    def get_error_count(self, key) -> int:
+        """
+        Returns how many times key was added to the errors since the
+        diagnostics last ran, 0 if it isn't an error.
+        """
+        return self._error_index().get_count(key)
 
     def has_errors(self, keys_to_check: Union[tuple, list, set] = None) -> set:
         """
@@ -62,10 +154,15 @@ class DiagnosticsReport(dict):
         if keys_to_check is None:
             return self[DIAGNOSTICS_ERRORS_KEY]
 
-        if not isinstance(keys_to_check, set):
-            keys_to_check = set(keys_to_check)
+        errors = self._error_index()
+        return {key for key in keys_to_check if key in errors}
 
-        return keys_to_check.intersection(self[DIAGNOSTICS_ERRORS_KEY])
+    def has_any_error(self, keys_to_check: Union[tuple, list, set]) -> bool:
+        """
+        Return True if any of keys_to_check has an error.
+        """
+        errors = self._error_index()
+        return any(key in errors for key in keys_to_check)
 
     def get_missing_keys(self, required_keys: set) -> set:
         """
@@ -79,38 +176,491 @@ class DiagnosticsReport(dict):
         """
         return required_keys.difference(self.keys())
 
-    def perform_diagnostics(self):
-        self.__setitem__(DIAGNOSTICS_PASSED_KEY, True)
-        for diagnostic in self.diagnostics:
-            diagnostic.perform_test(self)
+    def perform_diagnostics(self, max_workers: int = None,
+                            timeout: float = None, force: bool = False,
+                            timings: bool = False):
+        """
+        Run all diagnostics, one after another in the calling thread by
+        default.
+
+        Diagnostics run after the diagnostics they depend on. If one of
+        those failed, they are recorded as failed without running.
+
+        When called again, diagnostics whose previous result is still
+        fresh (see Diagnostic.ttl) keep it and are not run again, unless
+        a diagnostic they depend on runs again.
+
+        AsyncDiagnostics run in an event loop of their own, in a helper
+        thread when called from a running event loop. This call blocks
+        that loop, use perform_diagnostics_async there instead.
+
+        Args:
+            max_workers (int, None): Run diagnostics concurrently, in
+                up to that many threads. Exceptions raised by
+                perform_test are then recorded as failures of that
+                diagnostic instead of being propagated.
+            timeout (float, None): Seconds a diagnostic may run before
+                a DiagnosticTimeout failure is recorded for it. Whatever
+                it records afterwards is ignored. Implies running in
+                threads, a single one if max_workers is None.
+            force (bool): Run all diagnostics, even those with a fresh
+                result.
+            timings (bool): Record the wall time, CPU time, start offset
+                and outcome of each diagnostic, and a summary of the
+                run, under DIAGNOSTICS_TIMINGS_KEY.
+
+        Raises:
+            ValueError: if diagnostics depend on each other in a cycle.
+        """
+        self._perform_diagnostics(threading.Event(), max_workers, timeout,
+                                  force, timings)
+
+    def _perform_diagnostics(self, stop, max_workers=None, timeout=None,
+                             force=False, timings=False):
+        # No diagnostic starts once stop is set
+        graph = self._prepare(force, timings)
+        try:
+            if max_workers is None and timeout is None:
+                while graph.has_waiting() and not stop.is_set():
+                    diagnostic = graph.pop_ready()
+                    if not self._skip_if_prerequisites_failed(diagnostic):
+                        self._perform_test(diagnostic)
+                    self._complete(graph, diagnostic)
+            else:
+                self._perform_in_pool(graph, max_workers or 1, timeout, stop)
+        finally:
+            self._record_timings()
+
+    async def perform_diagnostics_async(self, max_concurrency: int = None,
+                                        timeout: float = None,
+                                        force: bool = False,
+                                        timings: bool = False):
+        """
+        Same as perform_diagnostics, on the running event loop.
+        AsyncDiagnostics are awaited, other diagnostics run in a thread
+        each. Exceptions raised by perform_test are recorded as failures.
+
+        Args:
+            max_concurrency (int, None): Maximum number of diagnostics
+                running at a time, unlimited if None.
+            timeout (float, None): Seconds a diagnostic may run before
+                it is cancelled and a DiagnosticTimeout failure is
+                recorded for it. Diagnostics running in threads can't
+                be cancelled, whatever they record afterwards is ignored.
+            force (bool): Run all diagnostics, even those with a fresh
+                result.
+            timings (bool): See perform_diagnostics. The CPU time of
+                AsyncDiagnostics excludes time spent awaiting.
+
+        Cancelling the call cancels the running diagnostics, the
+        remaining ones don't run.
+
+        Raises:
+            ValueError: if diagnostics depend on each other in a cycle.
+        """
+        graph = self._prepare(force, timings)
+        running = {}
+        try:
+            while True:
+                self._start_ready_tasks(graph, running, max_concurrency,
+                                        timeout)
+                if not running:
+                    return
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    self._complete(graph, running.pop(task))
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            self._record_timings()
+
+    def _prepare(self, force, timings):
+        graph = DependencyGraph(self.diagnostics)
+        fresh = []
+        if not force:
+            fresh = graph.complete_unchanged(
+                diagnostic for diagnostic in self.diagnostics
+                if not self.is_stale(diagnostic))
+        with self._lock:
+            for diagnostic in self.diagnostics:
+                if diagnostic not in fresh:
+                    self._clear_errors(diagnostic)
+            # Errors not tied to these diagnostics, eg. deserialized
+            # ones, don't fail the run
+            self.set_passed(not any(
+                self.has_any_error((diagnostic.key, diagnostic.friendly_key))
+                for diagnostic in fresh))
+            self.pop(DIAGNOSTICS_TIMINGS_KEY, None)
+            self._timings = None
+            if timings:
+                self._timings = DiagnosticsTimings()
+                self._timings.fresh = len(fresh)
+        return graph
+
+    def _perform_test(self, diagnostic):
+        """
+        Runs diagnostic in the calling thread.
+        """
+        self._start_timing(diagnostic)
+        cpu_started = time.thread_time()
+        outcome = OUTCOME_ERROR
+        try:
+            if isinstance(diagnostic, AsyncDiagnostic):
+                self._run_coroutine(diagnostic.perform_test(self))
+            else:
+                diagnostic.perform_test(self)
+            outcome = None
+        finally:
+            self._finish_timing(diagnostic, outcome,
+                                time.thread_time() - cpu_started)
+
+    @staticmethod
+    def _run_coroutine(coroutine):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+
+        # asyncio.run can't be nested, run it in a thread of its own
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+    def _start_timing(self, diagnostic):
+        if self._timings is not None:
+            return self._timings.start(diagnostic)
+        return None
+
+    def _finish_timing(self, diagnostic, outcome=None, cpu_time=None):
+        if self._timings is None:
+            return
+        if outcome is None:
+            outcome = OUTCOME_FAILED if self.has_errors((diagnostic.key,)) \
+                else OUTCOME_PASSED
+        self._timings.finish(diagnostic, outcome, cpu_time)
+
+    def _record_timings(self):
+        if self._timings is None:
+            return
+        self._timings.stop()
+        with self._lock:
+            self.__setitem__(DIAGNOSTICS_TIMINGS_KEY, self._timings.to_dict())
+
+    def is_stale(self, diagnostic) -> bool:
+        """
+        Returns True if diagnostic has to run again: it never passed, or
+        passed more than diagnostic.ttl seconds ago.
+        """
+        performed_at = self._performed_at.get(diagnostic.key)
+        return performed_at is None or diagnostic.ttl is None or \
+            time.monotonic() - performed_at >= diagnostic.ttl
+
+    def _clear_errors(self, diagnostic):
+        errors = self._error_index()
+        errors.discard(diagnostic.key)
+        errors.discard(diagnostic.friendly_key)
+        self._performed_at.pop(diagnostic.key, None)
+
+    def _complete(self, graph, diagnostic):
+        graph.complete(diagnostic)
+        if not self.has_errors((diagnostic.key,)):
+            self._performed_at[diagnostic.key] = time.monotonic()
+
+    def _skip_if_prerequisites_failed(self, diagnostic) -> bool:
+        failed = self.has_errors(diagnostic.depends_on)
+        if not failed:
+            return False
+        self.record_failure("Skipped, depends on failed %s"
+                            % ', '.join(sorted(failed)), diagnostic)
+        self._start_timing(diagnostic)
+        self._finish_timing(diagnostic, OUTCOME_SKIPPED)
+        return True
+
+    def _run_diagnostic(self, diagnostic, finished):
+        try:
+            self._perform_test(diagnostic)
+        except Exception as e:
+            LOGGER.exception("Diagnostic %s failed" % diagnostic.key)
+            self.record_failure(e, diagnostic)
+        finally:
+            finished.put(diagnostic)
+
+    def _start_ready(self, graph, running, max_workers, finished, stop):
+        while len(running) < max_workers and not stop.is_set():
+            diagnostic = graph.pop_ready()
+            if diagnostic is None:
+                return
+            if self._skip_if_prerequisites_failed(diagnostic):
+                self._complete(graph, diagnostic)
+                continue
+            thread = threading.Thread(target=self._run_diagnostic,
+                                      args=(diagnostic, finished),
+                                      name='diagnostic-%s' % diagnostic.key,
+                                      daemon=True)
+            running[diagnostic] = (time.monotonic(), thread)
+            thread.start()
+
+    def _perform_in_pool(self, graph, max_workers, timeout, stop):
+        # Each diagnostic gets its own daemon thread, at most max_workers
+        # at a time. A timed out diagnostic can't be interrupted, its
+        # thread is abandoned and its slot given to the next diagnostic.
+        finished = queue.Queue()
+        running = {}
+        while True:
+            self._start_ready(graph, running, max_workers, finished, stop)
+            if not running:
+                return
+
+            wait_for = None
+            if timeout is not None:
+                started_at = min(started_at for started_at, _ in running.values())
+                wait_for = max(0, started_at + timeout - time.monotonic())
+            try:
+                diagnostic = finished.get(timeout=wait_for)
+                # Abandoned diagnostics finishing late were already completed
+                if running.pop(diagnostic, None) is not None:
+                    self._complete(graph, diagnostic)
+            except queue.Empty:
+                pass
+
+            if timeout is not None:
+                for diagnostic in self._expire(running, timeout):
+                    self._complete(graph, diagnostic)
+
+    def _start_ready_tasks(self, graph, running, max_concurrency, timeout):
+        while max_concurrency is None or len(running) < max_concurrency:
+            diagnostic = graph.pop_ready()
+            if diagnostic is None:
+                return
+            if self._skip_if_prerequisites_failed(diagnostic):
+                self._complete(graph, diagnostic)
+                continue
+            task = asyncio.ensure_future(
+                self._perform_test_async(diagnostic, timeout))
+            running[task] = diagnostic
+
+    async def _perform_test_async(self, diagnostic, timeout):
+        timing = self._start_timing(diagnostic)
+        if not isinstance(diagnostic, AsyncDiagnostic):
+            test = self._perform_test_in_thread(diagnostic, timing)
+        elif timing is not None:
+            test = cpu_timed(diagnostic.perform_test(self), timing)
+        else:
+            test = diagnostic.perform_test(self)
+
+        outcome = None
+        try:
+            await asyncio.wait_for(test, timeout)
+        except asyncio.TimeoutError:
+            outcome = OUTCOME_TIMEOUT
+            self.record_failure(DiagnosticTimeout(
+                "Diagnostic timed out after %ss" % timeout), diagnostic)
+        except asyncio.CancelledError:
+            outcome = OUTCOME_CANCELLED
+            raise
+        except Exception as e:
+            outcome = OUTCOME_ERROR
+            LOGGER.exception("Diagnostic %s failed" % diagnostic.key)
+            self.record_failure(e, diagnostic)
+        finally:
+            self._finish_timing(diagnostic, outcome)
+
+    async def _perform_test_in_thread(self, diagnostic, timing):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(error):
+            if future.done():
+                return
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+        def run():
+            error = None
+            cpu_started = time.thread_time()
+            try:
+                diagnostic.perform_test(self)
+            except Exception as e:
+                error = e
+            if timing is not None:
+                timing.add_cpu_time(time.thread_time() - cpu_started)
+            try:
+                loop.call_soon_threadsafe(resolve, error)
+            except RuntimeError:
+                # The event loop is closed, nobody is waiting anymore
+                pass
+
+        thread = threading.Thread(target=run, daemon=True,
+                                  name='diagnostic-%s' % diagnostic.key)
+        thread.start()
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                self._abandoned.add(thread)
+            raise
+
+    def _expire(self, running, timeout) -> list:
+        now = time.monotonic()
+        expired = [diagnostic for diagnostic, (started_at, _) in running.items()
+                   if now - started_at >= timeout]
+        for diagnostic in expired:
+            _, thread = running.pop(diagnostic)
+            self.record_failure(DiagnosticTimeout(
+                "Diagnostic timed out after %ss" % timeout), diagnostic)
+            self._finish_timing(diagnostic, OUTCOME_TIMEOUT)
+            with self._lock:
+                self._abandoned.add(thread)
+        return expired
 
     def record_result(self, result, diagnostic):
         """
         Add the result to both key and friendly name, until key
         is deprecated.
         """
-        self.__setitem__(diagnostic.key, result)
-        # The current keys are terse. Let's migrate to human friendly ones.
-        self.__setitem__(diagnostic.friendly_key, result)
+        with self._lock:
+            if threading.current_thread() in self._abandoned:
+                return
+            self._add_alias(diagnostic)
+            self.__setitem__(diagnostic.key, result)
+            # The current keys are terse. Let's migrate to human friendly ones.
+            self.__setitem__(diagnostic.friendly_key, result)
+            # record_failure notifies subscribers itself
+            notify = not self._recording_failure
+        if notify:
+            self._notify(DiagnosticEvent(diagnostic, result, True))
 
     def record_failure(self, msg_or_exception, diagnostic):
         """
         Set the overall diagnostics status to failure and add this error
         to the list.
         """
-        # If one test fails, then the overall state is a failure
-        self.set_passed(False)
+        with self._lock:
+            if threading.current_thread() in self._abandoned:
+                return
+
+            # If one test fails, then the overall state is a failure
+            self.set_passed(False)
+
+            # Add the failing key to list of errors
+            self.append_error(diagnostic.key)
+            self.append_error(diagnostic.friendly_key)
+
+            # Provide additional details, like error message
+            record_failure_as = msg_or_exception
+            # Don't stringify bools
+            if not isinstance(msg_or_exception, bool):
+                record_failure_as = str(record_failure_as)
+            self._recording_failure = True
+            try:
+                self.record_result(record_failure_as, diagnostic)
+            finally:
+                self._recording_failure = False
+        self._notify(DiagnosticEvent(diagnostic, record_failure_as, False))
+
+    def subscribe(self, callback: Callable[[DiagnosticEvent], None]) -> Callable:
+        """
+        Registers callback to be called with a DiagnosticEvent each time
+        a result or failure is recorded, possibly from the thread running
+        the diagnostic. Returns a function that unsubscribes.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _notify(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                LOGGER.exception("Diagnostics subscriber failed")
+
+    def iter_diagnostics(self, **kwargs) -> Iterator[DiagnosticEvent]:
+        """
+        Runs perform_diagnostics(**kwargs) in a background thread and
+        yields a DiagnosticEvent for each result or failure as soon as
+        it is recorded. Exceptions raised by perform_diagnostics are
+        raised once all events have been yielded. Leaving the iteration
+        early stops starting diagnostics and waits for the running ones.
+
+        Usage:
+            for diagnostic, result, passed in report.iter_diagnostics():
+                render(diagnostic.friendly_key, result, passed)
+        """
+        events = queue.Queue()
+        done = object()
+        errors = []
+        stop = threading.Event()
+
+        def run():
+            try:
+                self._perform_diagnostics(stop, **kwargs)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                events.put(done)
+
+        unsubscribe = self.subscribe(events.put)
+        thread = threading.Thread(target=run, daemon=True, name='diagnostics')
+        try:
+            thread.start()
+            while True:
+                event = events.get()
+                if event is done:
+                    break
+                yield event
+        finally:
+            stop.set()
+            unsubscribe()
+            # Don't leave it writing to the report, eg. while the
+            # diagnostics run again
+            if thread.ident is not None:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+    async def aiter_diagnostics(self, **kwargs) -> AsyncIterator[DiagnosticEvent]:
+        """
+        Async version of iter_diagnostics, running
+        perform_diagnostics_async(**kwargs). Leaving the iteration early
+        cancels the diagnostics still running.
+        """
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        done = object()
 
-        # Add the failing key to list of errors
-        self.append_error(diagnostic.key)
-        self.append_error(diagnostic.friendly_key)
+        def put(event):
+            # Results of diagnostics running in threads are recorded there
+            loop.call_soon_threadsafe(events.put_nowait, event)
 
-        # Provide additional details, like error message
-        record_failure_as = msg_or_exception
-        # Don't stringify bools
-        if not isinstance(msg_or_exception, bool):
-            record_failure_as = str(record_failure_as)
-        self.record_result(record_failure_as, diagnostic)
+        unsubscribe = self.subscribe(put)
+        task = asyncio.ensure_future(self.perform_diagnostics_async(**kwargs))
+        task.add_done_callback(lambda _: events.put_nowait(done))
+        try:
+            while True:
+                event = await events.get()
+                if event is done:
+                    break
+                yield event
+        finally:
+            unsubscribe()
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        # Raises exceptions of perform_diagnostics_async
+        task.result()
 
     def get_report_subset(self, keys_to_extract):
         return {key: self.__getitem__(key) for key in keys_to_extract}
@@ -122,10 +672,53 @@ class DiagnosticsReport(dict):
         error_messages = map(get_error_message, self.has_errors())
         return ("\n").join(error_messages)
 
+    def _names(self, key, mode) -> list:
+        """
+        Returns the names key is serialized under in mode.
+        """
+        terse = self._terse_keys.get(key, key)
+        friendly = self._friendly_keys.get(terse)
+        if friendly is None or mode == SERIALIZATION_LEGACY:
+            names = [key] if friendly is None else [terse, friendly]
+        elif mode == SERIALIZATION_TERSE:
+            names = [terse]
+        elif mode == SERIALIZATION_FRIENDLY:
+            names = [friendly]
+        else:
+            raise ValueError("Unknown serialization mode %r" % mode)
+        return names
+
+    def to_dict(self, mode: str = SERIALIZATION_LEGACY) -> dict:
+        """
+        Returns the report as a plain dict for serialization. Results of
+        known diagnostics are stored under both their key and friendly
+        key in SERIALIZATION_LEGACY mode, under their friendly key only
+        in SERIALIZATION_FRIENDLY mode, and under their key only in
+        SERIALIZATION_TERSE mode. The errors list is converted likewise.
+        """
+        with self._lock:
+            items = list(dict.items(self))
+        report_dict = {}
+        for key, value in items:
+            if key == DIAGNOSTICS_ERRORS_KEY:
+                errors = []
+                for error in value:
+                    errors.extend(name for name in self._names(error, mode)
+                                  if name not in errors)
+                value = errors
+            for name in self._names(key, mode):
+                # A value stored under its own name wins over its alias
+                if name == key or name not in report_dict:
+                    report_dict[name] = value
+        return report_dict
+
+    def to_json(self, mode: str = SERIALIZATION_LEGACY) -> str:
+        return json.dumps(self.to_dict(mode))
+
     @staticmethod
     def from_json_str(json_str):
         report_dict = json.loads(json_str)
-        return DiagnosticsReport(report_dict)
+        return DiagnosticsReport(**report_dict)
 
     @staticmethod
     def from_json_dict(report_dict):
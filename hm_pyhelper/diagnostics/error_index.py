@@ -0,0 +1,115 @@
+from typing import Iterable
+
+
+class ErrorIndex(list):
+    """
+    Errors list of a DiagnosticsReport. Behaves as a list of unique keys
+    in the order they were first added, and serializes to JSON as one,
+    with constant time membership tests. Appending a key already in the
+    list only increments its count.
+    """
+
+    def __init__(self, errors: Iterable = (), counts: dict = None):
+        super(ErrorIndex, self).__init__()
+        self._counts = {}
+        for key in errors:
+            self.append(key)
+        if counts is not None:
+            self._counts.update((key, count) for key, count in counts.items()
+                                if key in self._counts)
+
+    def __reduce__(self):
+        # The default list pickling appends items after restoring
+        # _counts, which would drop them all as duplicates.
+        return self.__class__, (list(self), self._counts)
+
+    def __contains__(self, key):
+        return key in self._counts
+
+    def get_count(self, key) -> int:
+        """
+        Returns how many times key was added, 0 if it isn't an error.
+        """
+        return self._counts.get(key, 0)
+
+    def append(self, key):
+        if key in self._counts:
+            self._counts[key] += 1
+        else:
+            self._counts[key] = 1
+            super(ErrorIndex, self).append(key)
+
+    def extend(self, keys):
+        for key in keys:
+            self.append(key)
+
+    def __iadd__(self, keys):
+        self.extend(keys)
+        return self
+
+    def insert(self, index, key):
+        if key in self._counts:
+            self._counts[key] += 1
+        else:
+            self._counts[key] = 1
+            super(ErrorIndex, self).insert(index, key)
+
+    def remove(self, key):
+        super(ErrorIndex, self).remove(key)
+        del self._counts[key]
+
+    def discard(self, key):
+        if key in self._counts:
+            self.remove(key)
+
+    def pop(self, index=-1):
+        key = super(ErrorIndex, self).pop(index)
+        del self._counts[key]
+        return key
+
+    def clear(self):
+        super(ErrorIndex, self).clear()
+        self._counts.clear()
+
+    def _reindex(self):
+        keys = list(self)
+        counts = self._counts
+        super(ErrorIndex, self).clear()
+        self._counts = {}
+        for key in keys:
+            self.append(key)
+        for key in self._counts:
+            self._counts[key] = counts.get(key, 1)
+
+    def __setitem__(self, index, value):
+        super(ErrorIndex, self).__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index):
+        super(ErrorIndex, self).__delitem__(index)
+        self._reindex()
+
+
+class ErrorKeyGroup(object):
+    """
+    Group of keys checked against the errors of many reports, eg. by
+    alerting rules. Duplicate keys are dropped once, when the group is
+    created.
+
+    Usage:
+        ECC_ERRORS = ErrorKeyGroup([ECC_KEY, ONBOARDING_KEY, PUBLIC_KEY])
+        if ECC_ERRORS.any(report):
+            failing_keys = ECC_ERRORS.errors(report)
+    """
+
+    def __init__(self, keys: Iterable):
+        self.keys = tuple(dict.fromkeys(keys))
+
+    def errors(self, report) -> set:
+        """
+        Returns the keys of this group that are errors in report.
+        """
+        return report.has_errors(self.keys)
+
+    def any(self, report) -> bool:
+        return report.has_any_error(self.keys)
@@ -0,0 +1,153 @@
+import threading
+import time
+import types
+
+# Name of key in diagnostics containing how long each diagnostic took,
+# when requested.
+DIAGNOSTICS_TIMINGS_KEY = 'diagnostics_timings'
+
+OUTCOME_PASSED = 'passed'
+OUTCOME_FAILED = 'failed'
+# perform_test raised an exception
+OUTCOME_ERROR = 'error'
+OUTCOME_TIMEOUT = 'timeout'
+# Not run because a diagnostic it depends on failed
+OUTCOME_SKIPPED = 'skipped'
+OUTCOME_CANCELLED = 'cancelled'
+
+# Number of diagnostics listed in the summary as slowest
+SLOWEST_COUNT = 3
+
+
+class DiagnosticTiming(object):
+    """
+    Timing of a single diagnostic. cpu_time only counts the time spent
+    by the diagnostic itself, and is None for diagnostics that timed out
+    in a thread.
+    """
+
+    def __init__(self, start_offset):
+        self.start_offset = start_offset
+        self.wall_time = None
+        self.cpu_time = None
+        self.outcome = None
+
+    def add_cpu_time(self, seconds):
+        self.cpu_time = (self.cpu_time or 0.0) + seconds
+
+    def to_dict(self) -> dict:
+        return {
+            'start_offset': self.start_offset,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'outcome': self.outcome
+        }
+
+
+class DiagnosticsTimings(object):
+    """
+    Collects the DiagnosticTiming of each diagnostic run by one
+    perform_diagnostics call. Start offsets are relative to the
+    creation of this object.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._started_at = clock()
+        self._wall_time = None
+        self._lock = threading.Lock()
+        self._timings = {}
+        self.fresh = 0
+
+    def start(self, diagnostic) -> DiagnosticTiming:
+        timing = DiagnosticTiming(self._clock() - self._started_at)
+        with self._lock:
+            self._timings[diagnostic.key] = timing
+        return timing
+
+    def finish(self, diagnostic, outcome, cpu_time=None):
+        """
+        Records the outcome of diagnostic, unless it is already
+        finished, eg. a timed out diagnostic that eventually returned.
+        """
+        with self._lock:
+            timing = self._timings.get(diagnostic.key)
+            if timing is None or timing.outcome is not None:
+                return
+            timing.wall_time = self._clock() - self._started_at \
+                - timing.start_offset
+            timing.outcome = outcome
+            if cpu_time is not None:
+                timing.add_cpu_time(cpu_time)
+
+    def stop(self):
+        self._wall_time = self._clock() - self._started_at
+
+    def summary(self) -> dict:
+        """
+        Returns totals of the run:
+        {
+            "wall_time": float
+                seconds from the start to the end of the run,
+            "cpu_time": float
+                sum of the cpu_time of all diagnostics,
+            "count": int
+                number of diagnostics that ran or were skipped,
+            "fresh": int
+                number of diagnostics not run as their result is fresh,
+            "outcomes": dict
+                number of diagnostics per outcome,
+            "slowest": list
+                keys of the diagnostics with the longest wall_time
+        }
+        """
+        with self._lock:
+            timings = dict(self._timings)
+        outcomes = {}
+        for timing in timings.values():
+            outcomes[timing.outcome] = outcomes.get(timing.outcome, 0) + 1
+        slowest = sorted(timings, reverse=True,
+                         key=lambda key: timings[key].wall_time or 0.0)
+        return {
+            'wall_time': self._wall_time,
+            'cpu_time': sum(timing.cpu_time or 0.0
+                            for timing in timings.values()),
+            'count': len(timings),
+            'fresh': self.fresh,
+            'outcomes': outcomes,
+            'slowest': slowest[:SLOWEST_COUNT]
+        }
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            diagnostics = {key: timing.to_dict()
+                           for key, timing in self._timings.items()}
+        return {
+            'diagnostics': diagnostics,
+            'summary': self.summary()
+        }
+
+
+@types.coroutine
+def cpu_timed(coroutine, timing: DiagnosticTiming):
+    """
+    Awaits coroutine, adding the CPU time spent running it, but not
+    the coroutines running while it waits, to timing.
+    """
+    send, error = None, None
+    while True:
+        started = time.thread_time()
+        try:
+            if error is not None:
+                awaiting = coroutine.throw(error)
+            else:
+                awaiting = coroutine.send(send)
+        except StopIteration as e:
+            return e.value
+        finally:
+            timing.add_cpu_time(time.thread_time() - started)
+
+        try:
+            send, error = (yield awaiting), None
+        except BaseException as e:
+            send, error = None, e
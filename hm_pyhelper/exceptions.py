@@ -40,3 +40,15 @@ class GatewayMFRInvalidVersion(Exception):
 
 class UnsupportedGatewayMfrVersion(Exception):
     pass
+
+
+class MalformedAddGatewayTxn(Exception):
+    pass
+
+
+class DiagnosticTimeout(Exception):
+    pass
+
+
+class DiagnosticsDeltaSequenceError(Exception):
+    pass
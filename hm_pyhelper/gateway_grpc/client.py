@@ -1,25 +1,39 @@
-import base58
+from collections import deque
+from typing import Iterable, NamedTuple, Optional
+
 import grpc
 
 from hm_pyhelper.protos import blockchain_txn_add_gateway_v1_pb2, \
     local_pb2_grpc, local_pb2, region_pb2, gateway_staking_mode_pb2
 from hm_pyhelper.gateway_grpc.exceptions import MinerMalformedAddGatewayTxn
+from hm_pyhelper.gateway_grpc.metrics import MetricsInterceptor
+from hm_pyhelper.gateway_grpc.router_watcher import RouterWatcher
 
 from hm_pyhelper.logger import get_logger
+from hm_pyhelper.util import add_gateway_txn as add_gateway_txn_util
+from hm_pyhelper.util.address import decode_address, encode_address
 
 LOGGER = get_logger(__name__)
 
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_STAKING_MODE = gateway_staking_mode_pb2.gateway_staking_mode.light
+
+
+class AddGatewayTxnResult(NamedTuple):
+    '''
+    Outcome of one item of GatewayClient.create_add_gateway_txns.
+    Exactly one of txn and error is set.
+    '''
+    owner_address: str
+    payer_address: str
+    staking_mode: int
+    txn: Optional[bytes] = None
+    error: Optional[Exception] = None
 
-def decode_pub_key(encoded_key: bytes) -> str:
-    # Addresses returned by the RPC response are missing a leading
-    # byte for the version. The version is currently always 0.
-    # https://github.com/helium/helium-js/blob/8d5cb76e156fb80de6fc80f239b43e3872c7b7d7/packages/crypto/src/Address.ts#L64
-    version_byte = b'\x00'
 
+def decode_pub_key(encoded_key: bytes) -> str:
     # Convert binary address to base58
-    complete_key = version_byte + encoded_key
-    decoded_key = base58.b58encode_check(complete_key).decode()
-    return decoded_key
+    return encode_address(encoded_key)
 
 
 class GatewayClient(object):
@@ -31,13 +45,27 @@ class GatewayClient(object):
     using GatewayClient.stub.<api>
 
     All methods might return grpc pass through exceptions.
+
+    If metrics is True (or a MetricsInterceptor), every unary call made
+    through the channel, including direct GatewayClient.stub calls, is
+    timed and can be inspected with GatewayClient.metrics.get_metrics().
+
+    url may be a 'unix:///path/to/socket' target, grpc connects to unix
+    domain sockets natively.
     '''
 
-    def __init__(self, url='helium-miner:4467'):
+    def __init__(self, url='helium-miner:4467', metrics=False):
         self._url = url
         self._channel = grpc.insecure_channel(url)
         self._channel.subscribe(self._connect_state_handler)
-        self.stub = local_pb2_grpc.apiStub(self._channel)
+
+        self.metrics = None
+        channel = self._channel
+        if metrics:
+            self.metrics = metrics if isinstance(metrics, MetricsInterceptor) \
+                else MetricsInterceptor()
+            channel = grpc.intercept_channel(self._channel, self.metrics)
+        self.stub = local_pb2_grpc.apiStub(channel)
 
     def _connect_state_handler(self, state):
         if state == grpc.ChannelConnectivity.SHUTDOWN:
@@ -75,6 +103,31 @@ class GatewayClient(object):
         encoded_key = self.stub.pubkey(local_pb2.pubkey_req()).address
         return decode_pub_key(encoded_key)
 
+    def get_router(self, timeout: float = None) -> dict:
+        '''
+        Returns the router the gateway is currently connected to
+        {
+            "uri": str
+                uri of the router eg. "http://mainnet-router.helium.io:8080",
+            "connected": bool
+                True if the gateway has an active router session
+        }
+        timeout is the deadline of the call in seconds, None waits
+        forever.
+        '''
+        response = self.stub.router(local_pb2.router_req(), timeout=timeout)
+        return {
+            'uri': response.uri,
+            'connected': response.connected
+        }
+
+    def watch_router(self, **kwargs):
+        '''
+        Returns a RouterWatcher which yields router state transitions.
+        Keyword arguments are passed through to RouterWatcher.
+        '''
+        return RouterWatcher(self, **kwargs)
+
     def get_summary(self) -> dict:
         '''
         Returns a dict with following information
@@ -92,7 +145,7 @@ class GatewayClient(object):
 
     def create_add_gateway_txn(self, owner_address: str, payer_address: str,
                                staking_mode: gateway_staking_mode_pb2.gateway_staking_mode
-                               = gateway_staking_mode_pb2.gateway_staking_mode.light
+                               = DEFAULT_STAKING_MODE
                                ) -> bytes:
         """
         Invokes the txn_add_gateway RPC endpoint on the gateway and returns
@@ -108,9 +161,8 @@ class GatewayClient(object):
                             ref:
                             https://github.com/helium/proto/blob/master/src/service/local.proto#L38
         """
-        # base58 gives version number as first byte. Get rid of it.
-        owner = base58.b58decode_check(owner_address)[1:]
-        payer = base58.b58decode_check(payer_address)[1:]
+        owner = decode_address(owner_address)
+        payer = decode_address(payer_address)
         response = self.stub.add_gateway(local_pb2.add_gateway_req(
             owner=owner,
             payer=payer,
@@ -118,6 +170,70 @@ class GatewayClient(object):
         ))
         return response.add_gateway_txn
 
+    def create_add_gateway_txns(self, txn_requests: Iterable[tuple],
+                                max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+                                ) -> Iterable[AddGatewayTxnResult]:
+        """
+        Bulk version of create_add_gateway_txn. Pipelines add_gateway
+        RPCs with at most max_in_flight outstanding calls and yields an
+        AddGatewayTxnResult per request, in the same order as requested.
+
+        Errors are reported per item in AddGatewayTxnResult.error instead
+        of being raised, so one bad request does not abort the batch.
+
+        Parameters:
+            - txn_requests: iterable of (owner_address, payer_address) or
+                            (owner_address, payer_address, staking_mode)
+                            tuples. It is consumed lazily.
+            - max_in_flight: maximum number of concurrent RPCs.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+
+        in_flight = deque()
+        try:
+            for txn_request in txn_requests:
+                in_flight.append(self._submit_add_gateway_txn(txn_request))
+                if len(in_flight) >= max_in_flight:
+                    yield _collect_add_gateway_txn(*in_flight.popleft())
+
+            while in_flight:
+                yield _collect_add_gateway_txn(*in_flight.popleft())
+        finally:
+            # consumer stopped early, don't leave RPCs running
+            for _, future in in_flight:
+                if future is not None:
+                    future.cancel()
+
+    def _submit_add_gateway_txn(self, txn_request: tuple) -> tuple:
+        owner_address, payer_address, *rest = txn_request
+        staking_mode = rest[0] if rest else DEFAULT_STAKING_MODE
+        result = AddGatewayTxnResult(owner_address, payer_address, staking_mode)
+
+        try:
+            owner = decode_address(owner_address)
+            payer = decode_address(payer_address)
+        except ValueError as e:
+            error = MinerMalformedAddGatewayTxn(f"Invalid address: {e}")
+            return result._replace(error=error), None
+
+        future = self.stub.add_gateway.future(local_pb2.add_gateway_req(
+            owner=owner,
+            payer=payer,
+            staking_mode=staking_mode
+        ))
+        return result, future
+
+
+def _collect_add_gateway_txn(result: AddGatewayTxnResult,
+                             future: Optional[grpc.Future]) -> AddGatewayTxnResult:
+    if future is None:
+        return result
+    error = future.exception()
+    if error is not None:
+        return result._replace(error=error)
+    return result._replace(txn=future.result().add_gateway_txn)
+
 
 def get_address_from_add_gateway_txn(add_gateway_txn:
                                      blockchain_txn_add_gateway_v1_pb2,
@@ -137,21 +253,6 @@ def get_address_from_add_gateway_txn(add_gateway_txn:
         MinerMalformedAddGatewayTxn if expected_address supplied and
         does not match the return value.
     """
-
-    # Addresses returned by the RPC response are missing a leading
-    # byte for the version. The version is currently always 0.
-    # https://github.com/helium/helium-js/blob/8d5cb76e156fb80de6fc80f239b43e3872c7b7d7/packages/crypto/src/Address.ts#L64
-    version_byte = b'\x00'
-
-    # Convert binary address to base58
-    address_bytes = version_byte + getattr(add_gateway_txn, address_type)
-    address = str(base58.b58encode_check(address_bytes), 'utf-8')
-
-    # Ensure resulting address matches expectation
-    is_expected_address_defined = expected_address is not None
-    if is_expected_address_defined and address != expected_address:
-        msg = f"Expected {address_type} address to be {expected_address}," + \
-              f"but is {address}"
-        raise MinerMalformedAddGatewayTxn(msg)
-
-    return address
+    return add_gateway_txn_util.get_address_from_add_gateway_txn(
+        add_gateway_txn, address_type, expected_address,
+        MinerMalformedAddGatewayTxn)
@@ -1,2 +1,5 @@
-class MinerMalformedAddGatewayTxn(Exception):
+from hm_pyhelper.exceptions import MalformedAddGatewayTxn
+
+
+class MinerMalformedAddGatewayTxn(MalformedAddGatewayTxn):
     pass
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import Counter
+
+import grpc
+
+# Upper bounds in seconds of the latency histogram buckets. A final
+# overflow bucket catches everything slower than the last bound.
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MethodMetrics(object):
+    '''
+    Latency histogram, status code counts and payload sizes
+    of a single RPC method.
+    '''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.status_codes = Counter()
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def record(self, latency, status_code, request_size, response_size):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if latency <= bound:
+                index = i
+                break
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.status_codes[status_code.name] += 1
+        self.request_bytes += request_size
+        self.response_bytes += response_size
+
+    def latency_quantile(self, quantile):
+        '''
+        Estimates the latency quantile as the upper bound of the bucket
+        it falls in. Returns max_latency for the overflow bucket.
+        '''
+        if self.count == 0:
+            return 0.0
+        rank = quantile * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max_latency)
+        return self.max_latency
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.count - self.status_codes[grpc.StatusCode.OK.name],
+            'status_codes': dict(self.status_codes),
+            'latency': {
+                'mean': self.total_latency / self.count if self.count else 0.0,
+                'p50': self.latency_quantile(0.50),
+                'p99': self.latency_quantile(0.99),
+                'max': self.max_latency,
+                'buckets': dict(zip([*self.buckets, float('inf')],
+                                    self.bucket_counts))
+            },
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes
+        }
+
+
+class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor):
+    '''
+    Unary client interceptor recording per-method latency histograms,
+    status code counts and payload sizes. Latency is measured from the
+    moment the call enters the channel until its response is available,
+    so it excludes time spent in the calling Python code.
+
+    Install on a channel with grpc.intercept_channel, or let
+    GatewayClient(metrics=True) do it.
+    '''
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = client_call_details.method
+        if isinstance(method, bytes):
+            method = method.decode()
+        request_size = request.ByteSize()
+        start = time.perf_counter()
+        call = continuation(client_call_details, request)
+
+        def on_done(done_call):
+            latency = time.perf_counter() - start
+            status_code = done_call.code()
+            response_size = 0
+            if status_code == grpc.StatusCode.OK:
+                response_size = done_call.result().ByteSize()
+            self._record(method, latency, status_code,
+                         request_size, response_size)
+
+        # Runs immediately for blocking calls, on completion for futures
+        call.add_done_callback(on_done)
+        return call
+
+    def _record(self, method, latency, status_code, request_size, response_size):
+        with self._lock:
+            if method not in self._metrics:
+                self._metrics[method] = MethodMetrics(self.buckets)
+            self._metrics[method].record(latency, status_code,
+                                         request_size, response_size)
+
+    def methods(self) -> list:
+        with self._lock:
+            return list(self._metrics)
+
+    def get_metrics(self, method: str = None) -> dict:
+        '''
+        Returns a snapshot of the recorded metrics keyed by full method
+        name, eg. '/helium.local.api/pubkey'. If method is given, only
+        that method's metrics are returned, or None if it was not called.
+        The method may also be given by its short name, eg. 'pubkey'.
+        '''
+        with self._lock:
+            if method is None:
+                return {name: metrics.to_dict()
+                        for name, metrics in self._metrics.items()}
+            for name, metrics in self._metrics.items():
+                if method in (name, name.rsplit('/', 1)[-1]):
+                    return metrics.to_dict()
+            return None
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
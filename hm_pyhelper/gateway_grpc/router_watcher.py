@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import grpc
+
+from hm_pyhelper.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_MIN_INTERVAL = 1.0  # seconds
+DEFAULT_MAX_INTERVAL = 30.0  # seconds
+DEFAULT_BACKOFF = 2.0
+# Deadline of each router call, a wedged gateway-rs must not block
+# the watcher and stop()
+DEFAULT_TIMEOUT = 5.0  # seconds
+
+# State reported while gateway-rs itself can not be reached.
+UNREACHABLE_STATE = {
+    'uri': None,
+    'connected': False
+}
+
+
+class RouterWatcher(object):
+    '''
+    Polls the router state of a GatewayClient and yields only the
+    transitions, starting with the initial state.
+
+    The poll interval starts at min_interval and is multiplied by
+    backoff after every poll that saw no change, up to max_interval.
+    Any transition resets it to min_interval.
+
+    Usage as a generator:
+        for state in client.watch_router():
+            print(state['uri'], state['connected'])
+
+    Usage as an async iterator:
+        async for state in client.watch_router():
+            print(state['uri'], state['connected'])
+
+    While gateway-rs is unreachable, or doesn't answer within timeout
+    seconds, the state is UNREACHABLE_STATE.
+    '''
+
+    def __init__(self, client, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, backoff=DEFAULT_BACKOFF,
+                 timeout=DEFAULT_TIMEOUT):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Expected 0 < min_interval <= max_interval")
+        if backoff < 1:
+            raise ValueError("backoff must be >= 1")
+
+        self._client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self._stop_event = threading.Event()
+        # (loop, asyncio.Event) while iterated asynchronously
+        self._async_stop = None
+
+    def stop(self):
+        '''
+        Ends iteration after the current poll, or right away while
+        waiting for the next one. May be called from any thread.
+        '''
+        self._stop_event.set()
+        async_stop = self._async_stop
+        if async_stop is not None:
+            loop, event = async_stop
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # loop already closed
+                pass
+
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def poll(self) -> dict:
+        '''
+        Returns the current router state without waiting.
+        '''
+        try:
+            return self._client.get_router(timeout=self.timeout)
+        except grpc.RpcError as e:
+            LOGGER.warning(f"Unable to fetch router state: {e}")
+            return dict(UNREACHABLE_STATE)
+
+    def _next_interval(self, interval, changed):
+        if changed:
+            return self.min_interval
+        return min(interval * self.backoff, self.max_interval)
+
+    def __iter__(self):
+        previous = None
+        interval = self.min_interval
+        while not self.stopped():
+            state = self.poll()
+            changed = state != previous
+            interval = self._next_interval(interval, changed)
+            if changed:
+                previous = state
+                yield state
+            self._stop_event.wait(interval)
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        self._async_stop = (loop, stop_event)
+        previous = None
+        interval = self.min_interval
+        try:
+            while not self.stopped():
+                # grpc calls block, keep them off the event loop
+                state = await loop.run_in_executor(None, self.poll)
+                changed = state != previous
+                interval = self._next_interval(interval, changed)
+                if changed:
+                    previous = state
+                    yield state
+                if self.stopped():
+                    break
+                try:
+                    await asyncio.wait_for(stop_event.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._async_stop = None
@@ -1 +1,2 @@
 from hm_pyhelper.miner_json_rpc.client import Client as MinerClient  # noqa
+from hm_pyhelper.miner_json_rpc.async_client import AsyncClient as AsyncMinerClient  # noqa
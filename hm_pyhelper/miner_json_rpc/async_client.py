@@ -0,0 +1,312 @@
+import asyncio
+import json
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+
+from hm_pyhelper.miner_json_rpc.client import build_request, \
+    build_batch_request, parse_batch_response, check_batch_results, \
+    check_region, parse_add_gateway_txn, DEFAULT_CONNECT_TIMEOUT, \
+    DEFAULT_READ_TIMEOUT
+from hm_pyhelper.miner_json_rpc.unix_adapter import get_socket_path, \
+    is_unix_url
+from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError, \
+    MinerMalformedURL, MinerFailedFetchData
+
+DEFAULT_MAX_CONNECTIONS = 4
+
+
+class _ConnectionDropped(ConnectionError):
+    """
+    The connection closed before any byte of the response was read.
+    """
+
+
+class AsyncHTTPConnectionPool(object):
+    """
+    Minimal HTTP/1.1 keep-alive connection pool on top of asyncio
+    streams, sufficient for POSTing JSON to the miner. At most
+    max_connections requests are in flight at a time, idle connections
+    are reused by later requests. 'unix:///path/to/socket' URLs connect
+    to a unix domain socket. read_timeout bounds sending the request
+    and reading the whole response.
+    """
+
+    def __init__(self, url, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.url = url
+        self.socket_path = None
+        if is_unix_url(url):
+            self.socket_path = get_socket_path(url)
+            self.host = 'localhost'
+            self.ssl = False
+            self.port = 80
+            self.path = '/'
+        else:
+            parsed_url = urlparse(url)
+            if parsed_url.scheme not in ('http', 'https') or not parsed_url.hostname:
+                raise MinerMalformedURL(
+                    "Miner JSONRPC URL '%s' is not a valid URL" % url)
+            self.host = parsed_url.hostname
+            self.ssl = parsed_url.scheme == 'https'
+            self.port = parsed_url.port or (443 if self.ssl else 80)
+            self.path = parsed_url.path or '/'
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = deque()
+        # Created on first use so it binds to the running event loop
+        self._semaphore = None
+
+    async def _connect(self):
+        if self.socket_path is not None:
+            connection = asyncio.open_unix_connection(self.socket_path)
+        else:
+            connection = asyncio.open_connection(self.host, self.port,
+                                                 ssl=self.ssl)
+        return await asyncio.wait_for(connection, self.connect_timeout)
+
+    async def post_json(self, body):
+        """
+        POSTs body as JSON and returns (status, response body).
+
+        Raises:
+            - ValueError if the response is not valid HTTP.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+
+        payload = json.dumps(body).encode()
+        async with self._semaphore:
+            while self._idle:
+                # Idle connections may have been closed by the server
+                # in the meantime, retry those on a fresh connection.
+                # Only when no response was received: the miner may
+                # have acted on the request otherwise, and calls like
+                # txn_add_gateway must not be sent twice.
+                connection = self._idle.popleft()
+                try:
+                    return await self._request(connection, payload)
+                except _ConnectionDropped:
+                    pass
+            return await self._request(await self._connect(), payload)
+
+    async def _request(self, connection, payload):
+        reader, writer = connection
+        try:
+            status, body, keep_alive = await asyncio.wait_for(
+                self._exchange(reader, writer, payload), self.read_timeout)
+        except BaseException:
+            writer.close()
+            raise
+
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            writer.close()
+        return status, body
+
+    async def _exchange(self, reader, writer, payload):
+        try:
+            writer.write(b'POST %s HTTP/1.1\r\n'
+                         b'Host: %s:%d\r\n'
+                         b'Content-Type: application/json\r\n'
+                         b'Content-Length: %d\r\n'
+                         b'\r\n%s' % (self.path.encode(), self.host.encode(),
+                                      self.port, len(payload), payload))
+            await writer.drain()
+            first_byte = await reader.read(1)
+        except ConnectionError:
+            raise _ConnectionDropped()
+        if not first_byte:
+            raise _ConnectionDropped()
+        return await self._read_response(reader, first_byte)
+
+    async def _read_response(self, reader, first_byte):
+        status_line = first_byte + await reader.readline()
+        version, status = status_line.split()[:2]
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+
+        keep_alive = version == b'HTTP/1.1' and \
+            headers.get('connection') != 'close'
+        if headers.get('transfer-encoding') == 'chunked':
+            body = await self._read_chunked(reader)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), body, keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # skip trailers
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.popleft()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+class AsyncClient(object):
+    """
+    asyncio version of miner_json_rpc.Client with the same methods and
+    exceptions. Requests share a pool of keep-alive connections, use it
+    as an async context manager or await close() to release them.
+    Timeouts and circuit_breaker behave as in Client.
+
+    Usage:
+        async with AsyncClient() as client:
+            height = await client.get_height()
+    """
+
+    def __init__(self, url='http://helium-miner:4467',
+                 max_connections=DEFAULT_MAX_CONNECTIONS,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 circuit_breaker=None):
+        self.url = url
+        self.circuit_breaker = circuit_breaker
+        self._pool = None
+        self._pool_kwargs = {
+            'max_connections': max_connections,
+            'connect_timeout': connect_timeout,
+            'read_timeout': read_timeout
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, _, _2, _3):
+        await self.close()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+
+    async def _post(self, req_body):
+        if self.circuit_breaker is None:
+            return await self._send(req_body)
+
+        self.circuit_breaker.before_call(self.url)
+        try:
+            response = await self._send(req_body)
+        except MinerConnectionError:
+            self.circuit_breaker.record_failure()
+            raise
+        except Exception:
+            # The miner answered, or the request never left
+            self.circuit_breaker.record_success()
+            raise
+        except BaseException:
+            # Cancelled or interrupted, the miner didn't answer
+            self.circuit_breaker.release()
+            raise
+        self.circuit_breaker.record_success()
+        return response
+
+    async def _send(self, req_body):
+        if self._pool is None:
+            # Raises MinerMalformedURL, like Client does on first request
+            self._pool = AsyncHTTPConnectionPool(self.url, **self._pool_kwargs)
+
+        try:
+            status, body = await self._pool.post_json(req_body)
+        except asyncio.TimeoutError:
+            raise MinerConnectionError(
+                "Timed out waiting for miner %s" % self.url
+            )
+        except (OSError, asyncio.IncompleteReadError):
+            raise MinerConnectionError(
+                "Unable to connect to miner %s" % self.url
+            )
+        except ValueError:
+            raise MinerFailedFetchData(
+                "Miner %s sent a malformed HTTP response" % self.url
+            )
+
+        if 400 <= status < 600:
+            # Same as Response.raise_for_status() in Client
+            raise requests.exceptions.HTTPError(
+                "%d %s Error for url: %s"
+                % (status, 'Client' if status < 500 else 'Server', self.url)
+            )
+        if not 200 <= status < 300:
+            raise MinerFailedFetchData(
+                "Miner %s responded with HTTP status %d" % (self.url, status)
+            )
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise MinerFailedFetchData(
+                "Miner %s sent an invalid JSON response" % self.url
+            )
+
+    async def _fetch_data(self, method, **kwargs):
+        response = await self._post(build_request(method, 1, kwargs))
+        return response.get('result')
+
+    async def batch(self, calls, raise_on_error=True) -> list:
+        """
+        See Client.batch.
+        """
+        requests_body = build_batch_request(calls)
+        if not requests_body:
+            return []
+
+        results = parse_batch_response(requests_body,
+                                       await self._post(requests_body))
+        return check_batch_results(results, raise_on_error)
+
+    async def get_height(self):
+        return await self._fetch_data('info_height')
+
+    async def get_region(self):
+        region = await self._fetch_data('info_region')
+        return check_region(region, self.url)
+
+    async def get_summary(self):
+        return await self._fetch_data('info_summary')
+
+    async def get_peer_addr(self):
+        return await self._fetch_data('peer_addr')
+
+    async def get_peer_book(self):
+        return await self._fetch_data('peer_book', addr='self')
+
+    async def get_firmware_version(self):
+        summary = await self.get_summary()
+        return summary.get('firmware_version')
+
+    async def create_add_gateway_txn(self, owner_address: str, payer_address: str,
+                                     gateway_address: str = None) -> dict:
+        """
+        See Client.create_add_gateway_txn.
+        """
+        rpc_response = await self._fetch_data('txn_add_gateway',
+                                              owner=owner_address,
+                                              payer=payer_address)
+        return parse_add_gateway_txn(rpc_response, owner_address,
+                                     payer_address, gateway_address)
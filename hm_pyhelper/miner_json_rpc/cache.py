@@ -0,0 +1,133 @@
+import copy
+import json
+import threading
+import time
+
+# Seconds a result stays fresh, per JSON-RPC method. Methods without a
+# TTL are never cached.
+DEFAULT_CACHE_TTLS = {
+    'info_height': 5.0,
+    'info_region': 300.0,
+    'info_summary': 60.0
+}
+
+
+class _CacheEntry(object):
+    def __init__(self, value, fetched_at):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class _InFlight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache(object):
+    """
+    Per-method cache of miner JSON-RPC results.
+
+    Results are kept for ttls[method] seconds. Concurrent callers asking
+    for the same method while it is being fetched wait for and share
+    that single request, including its exception if it fails. Failed
+    requests are not cached.
+
+    Callers get a copy of the cached value, so mutating it is safe.
+    """
+
+    def __init__(self, ttls=None, clock=time.monotonic):
+        self.ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _key(method, params):
+        return method, json.dumps(params, sort_keys=True) if params else None
+
+    def get(self, method, params, fetch):
+        """
+        Returns the cached result of method called with params, calling
+        fetch() to refresh it when missing or stale.
+        """
+        ttl = self.ttls.get(method)
+        if ttl is None:
+            return fetch()
+
+        key = self._key(method, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry.fetched_at < ttl:
+                self.hits += 1
+                return copy.deepcopy(entry.value)
+
+            in_flight = self._in_flight.get(key)
+            is_owner = in_flight is None
+            if is_owner:
+                self.misses += 1
+                in_flight = self._in_flight[key] = _InFlight()
+            else:
+                self.coalesced += 1
+
+        if is_owner:
+            self._fetch(key, in_flight, fetch)
+        else:
+            in_flight.done.wait()
+
+        if in_flight.error is not None:
+            raise in_flight.error
+        return copy.deepcopy(in_flight.value)
+
+    def _fetch(self, key, in_flight, fetch):
+        try:
+            in_flight.value = fetch()
+        except BaseException as e:
+            in_flight.error = e
+        with self._lock:
+            if in_flight.error is None:
+                self._entries[key] = _CacheEntry(in_flight.value, self._clock())
+            del self._in_flight[key]
+        in_flight.done.set()
+
+    def get_metadata(self, method, params=None):
+        """
+        Returns staleness information about the cached result of method,
+        or None if nothing is cached:
+        {
+            "age": float
+                seconds since the result was fetched,
+            "ttl": float
+                seconds the result stays fresh,
+            "stale": bool
+                True if the next call will fetch again
+        }
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(method, params))
+            if entry is None:
+                return None
+            age = self._clock() - entry.fetched_at
+            ttl = self.ttls.get(method)
+            return {
+                'age': age,
+                'ttl': ttl,
+                'stale': ttl is None or age >= ttl
+            }
+
+    def invalidate(self, method=None):
+        """
+        Drops the cached results of method, or of all methods if None.
+        """
+        with self._lock:
+            if method is None:
+                self._entries = {}
+            else:
+                self._entries = {key: entry
+                                 for key, entry in self._entries.items()
+                                 if key[0] != method}
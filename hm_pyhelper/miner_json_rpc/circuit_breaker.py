@@ -0,0 +1,125 @@
+import threading
+import time
+
+from hm_pyhelper.logger import get_logger
+from hm_pyhelper.miner_json_rpc.exceptions import MinerCircuitOpen
+
+LOGGER = get_logger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0  # seconds
+
+
+class CircuitBreaker(object):
+    """
+    Fails calls fast while the miner is unreachable.
+
+    After failure_threshold consecutive failures the circuit opens and
+    every call raises MinerCircuitOpen (a MinerConnectionError) without
+    touching the network. Once reset_timeout seconds have passed the
+    circuit is half open: a single probe call is let through, closing
+    the circuit on success or re-opening it on failure.
+
+    A breaker can be shared by several clients talking to the same miner.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, clock=time.monotonic):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be >= 1")
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+            self._calls = 0
+            self._failures = 0
+            self._rejected = 0
+            self._times_opened = 0
+
+    def _current_state(self):
+        if self._state == STATE_OPEN and \
+                self._clock() - self._opened_at >= self.reset_timeout:
+            return STATE_HALF_OPEN
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self, url=''):
+        """
+        Raises MinerCircuitOpen if the call must not be attempted.
+        Every call allowed through must be followed by record_success,
+        record_failure or release.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = True
+            elif state != STATE_CLOSED:
+                self._rejected += 1
+                retry_in = 0.0
+                if self._opened_at is not None:
+                    retry_in = max(0.0, self.reset_timeout -
+                                   (self._clock() - self._opened_at))
+                raise MinerCircuitOpen(
+                    "Circuit open for miner %s, retry in %.1fs" % (url, retry_in)
+                )
+            self._calls += 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                LOGGER.info("Miner reachable again, closing circuit")
+            self._state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def release(self):
+        """
+        Ends a call without an outcome, eg. one cancelled before the
+        miner answered. A half open circuit lets the next call probe.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            if self._state == STATE_HALF_OPEN or \
+                    self._consecutive_failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    self._times_opened += 1
+                    LOGGER.warning("Opening circuit after %d consecutive "
+                                   "failures" % self._consecutive_failures)
+                self._state = STATE_OPEN
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._consecutive_failures,
+                'calls': self._calls,
+                'failures': self._failures,
+                'rejected': self._rejected,
+                'times_opened': self._times_opened
+            }
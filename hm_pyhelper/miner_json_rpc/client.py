@@ -1,34 +1,213 @@
 import requests
 import base64
-import base58
-
-from hm_pyhelper.protos import blockchain_txn_pb2, \
-                               blockchain_txn_add_gateway_v1_pb2
+from requests.adapters import HTTPAdapter
+
+from hm_pyhelper.protos import blockchain_txn_add_gateway_v1_pb2
+from hm_pyhelper.miner_json_rpc.cache import ResponseCache
+from hm_pyhelper.miner_json_rpc.unix_adapter import UnixHTTPAdapter, \
+                                                    UNIX_REQUEST_URL, \
+                                                    get_socket_path, \
+                                                    is_unix_url
+from hm_pyhelper.miner_json_rpc.streaming import iter_result_items, \
+                                                 STREAM_CHUNK_SIZE
+from hm_pyhelper.util import add_gateway_txn as add_gateway_txn_util
+from hm_pyhelper.util.add_gateway_txn import inspect_add_gateway_txn, \
+                                             verify_add_gateway_txn
 from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError, \
                                                   MinerMalformedURL, \
                                                   MinerRegionUnset, \
-                                                  MinerMalformedAddGatewayTxn
+                                                  MinerMalformedAddGatewayTxn, \
+                                                  MinerFailedFetchData, \
+                                                  MinerJSONRPCException
+
+
+# Connections kept alive per Client. Polling is mostly sequential,
+# a few spare connections cover occasional concurrent callers.
+DEFAULT_POOL_MAXSIZE = 4
+
+# The miner can take a while to answer while syncing, but must not
+# block callers forever when wedged.
+DEFAULT_CONNECT_TIMEOUT = 5.0  # seconds
+DEFAULT_READ_TIMEOUT = 30.0  # seconds
+
+
+def build_request(method, request_id, params=None) -> dict:
+    req_body = {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": method,
+    }
+    if params:
+        req_body["params"] = params
+    return req_body
+
+
+def parse_batch_response(requests_body, responses_body) -> list:
+    """
+    Demultiplexes a JSON-RPC batch response by id. Returns the result of
+    each request in requests_body order, or a MinerFailedFetchData if the
+    call failed or is missing from the response.
+    """
+    if isinstance(responses_body, dict):
+        # Servers reply with a single error object if the whole
+        # batch is rejected.
+        responses_body = [responses_body]
+    responses_by_id = {response.get('id'): response
+                       for response in responses_body
+                       if isinstance(response, dict)}
+
+    results = []
+    for req_body in requests_body:
+        method = req_body['method']
+        response = responses_by_id.get(req_body['id'])
+        if response is None:
+            results.append(MinerFailedFetchData(
+                "No response from miner for %s" % method))
+        elif response.get('error') is not None:
+            error = response['error']
+            results.append(MinerFailedFetchData(
+                "Miner %s call failed: %s (%s)"
+                % (method, error.get('message'), error.get('code'))))
+        else:
+            results.append(response.get('result'))
+    return results
+
+
+def build_batch_request(calls) -> list:
+    requests_body = []
+    for request_id, call in enumerate(calls, start=1):
+        method, params = (call, None) if isinstance(call, str) else call
+        requests_body.append(build_request(method, request_id, params))
+    return requests_body
+
+
+def check_batch_results(results: list, raise_on_error: bool) -> list:
+    if raise_on_error:
+        for result in results:
+            if isinstance(result, MinerJSONRPCException):
+                raise result
+    return results
+
+
+def check_region(region: dict, url: str) -> dict:
+    if not region.get('region'):
+        raise MinerRegionUnset(
+            "Miner at %s does not have an asserted region"
+            % url
+        )
+    return region
+
+
+def parse_add_gateway_txn(rpc_response: dict, owner_address: str,
+                          payer_address: str, gateway_address: str = None) -> dict:
+    """
+    Decodes and validates the txn_add_gateway RPC response into the
+    payload returned by Client.create_add_gateway_txn.
+    """
+    encoded_wrapped_txn = rpc_response['result']
+
+    # Base64 decode
+    # https://github.com/helium/miner/blob/b9d2cd108cdcc864b641ccf4209f790b1461926d/src/jsonrpc/miner_jsonrpc_txn.erl#L38
+    decoded_wrapped_txn = base64.b64decode(encoded_wrapped_txn)
+
+    # Deserialize wrapped protobuf and unwrap blockchain_txn_add_gateway_v1
+    # https://github.com/helium/proto/blob/6dc60a9933628c3baf9d2f5386481f20a5d79bb8/src/blockchain_txn_add_gateway_v1.proto#L1
+    txn_info = inspect_add_gateway_txn(
+        decoded_wrapped_txn, wrapped=True,
+        error_class=MinerMalformedAddGatewayTxn)
+    verify_add_gateway_txn(txn_info, gateway_address, owner_address,
+                           payer_address, MinerMalformedAddGatewayTxn)
+
+    return {
+        **txn_info._asdict(),
+        'txn': encoded_wrapped_txn
+    }
 
 
 class Client(object):
+    """
+    JSON-RPC client for helium miner. Requests share a keep-alive
+    requests.Session, so use it as a context manager or call close()
+    to release pooled connections.
 
-    def __init__(self, url='http://helium-miner:4467'):
-        self.url = url
+    Requests time out after connect_timeout/read_timeout seconds with
+    MinerConnectionError. Pass a CircuitBreaker to fail fast while the
+    miner is unreachable.
 
-    def __fetch_data(self, method, **kwargs):
-        req_body = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": method,
-        }
-        if kwargs:
-            req_body["params"] = kwargs
+    Pass a ResponseCache (or cache=True for the default TTLs) to reuse
+    recent results of slowly changing methods like info_region.
+
+    url may also be 'unix:///path/to/socket' to talk to a miner over
+    a unix domain socket.
+    """
+
+    def __init__(self, url='http://helium-miner:4467',
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 circuit_breaker=None,
+                 cache=None):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.circuit_breaker = circuit_breaker
+        self.cache = ResponseCache() if cache is True else cache or None
+        self.session = requests.Session()
+        if is_unix_url(url):
+            self._request_url = UNIX_REQUEST_URL
+            self.session.mount(UNIX_REQUEST_URL, UnixHTTPAdapter(
+                get_socket_path(url), pool_maxsize=pool_maxsize))
+        else:
+            self._request_url = url
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _, _2, _3):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def __post(self, req_body, stream=False):
+        if self.circuit_breaker is None:
+            return self.__send(req_body, stream)
+
+        self.circuit_breaker.before_call(self.url)
         try:
-            response = requests.post(self.url, json=req_body)  # nosec
+            response = self.__send(req_body, stream)
+        except MinerConnectionError:
+            self.circuit_breaker.record_failure()
+            raise
+        except Exception:
+            # The miner answered, or the request never left
+            self.circuit_breaker.record_success()
+            raise
+        except BaseException:
+            # Cancelled or interrupted, the miner didn't answer
+            self.circuit_breaker.release()
+            raise
+        # Streamed responses are recorded once consumed
+        if not stream:
+            self.circuit_breaker.record_success()
+        return response
+
+    def __send(self, req_body, stream=False):
+        # Only pass stream when set, to keep the common call minimal
+        kwargs = {'stream': True} if stream else {}
+        try:
+            response = self.session.post(self._request_url, json=req_body,
+                                         timeout=self.timeout, **kwargs)
         except requests.exceptions.ConnectionError:
             raise MinerConnectionError(
                 "Unable to connect to miner %s" % self.url
             )
+        except requests.exceptions.Timeout:
+            raise MinerConnectionError(
+                "Timed out waiting for miner %s" % self.url
+            )
         except requests.exceptions.MissingSchema:
             raise MinerMalformedURL(
                 "Miner JSONRPC URL '%s' is not a valid URL"
@@ -36,21 +215,58 @@ class Client(object):
             )
 
         if not response.ok:
+            # Return the connection to the pool, streamed bodies are
+            # otherwise left unread
+            response.close()
             response.raise_for_status()
 
-        return response.json().get('result')
+        return response
+
+    def __fetch_data(self, method, **kwargs):
+        if self.cache is not None:
+            return self.cache.get(method, kwargs,
+                                  lambda: self.__fetch_uncached(method, kwargs))
+        return self.__fetch_uncached(method, kwargs)
+
+    def __fetch_uncached(self, method, params):
+        req_body = build_request(method, 1, params)
+        return self.__post(req_body).json().get('result')
+
+    def batch(self, calls, raise_on_error=True) -> list:
+        """
+        Sends several calls as a single JSON-RPC 2.0 batch request and
+        returns their results in the same order as calls.
+
+        Parameters:
+            - calls: iterable of method names, or (method, params) tuples
+                     where params is a dict.
+            - raise_on_error: if True, the first failed call raises a
+                              MinerJSONRPCException. Otherwise the
+                              exception is returned in its place.
+
+        Usage:
+            height, region = client.batch(['info_height', 'info_region'])
+        """
+        requests_body = build_batch_request(calls)
+        if not requests_body:
+            return []
+
+        results = parse_batch_response(requests_body,
+                                       self.__post(requests_body).json())
+        return check_batch_results(results, raise_on_error)
+
+    def call(self, method, **kwargs):
+        """
+        Calls any JSON-RPC method on the miner and returns its result.
+        """
+        return self.__fetch_data(method, **kwargs)
 
     def get_height(self):
         return self.__fetch_data('info_height')
 
     def get_region(self):
         region = self.__fetch_data('info_region')
-        if not region.get('region'):
-            raise MinerRegionUnset(
-                "Miner at %s does not have an asserted region"
-                % self.url
-            )
-        return region
+        return check_region(region, self.url)
 
     def get_summary(self):
         return self.__fetch_data('info_summary')
@@ -61,6 +277,43 @@ class Client(object):
     def get_peer_book(self):
         return self.__fetch_data('peer_book', addr='self')
 
+    def iter_peer_book(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Streaming version of get_peer_book. Parses the response body
+        incrementally and yields peer book entries one by one, so memory
+        use does not grow with the size of the peer book.
+
+        Raises:
+            - MinerFailedFetchData if the miner returns an error.
+            - MinerConnectionError if the connection fails mid-stream.
+        """
+        req_body = build_request('peer_book', 1, {'addr': 'self'})
+        response = self.__post(req_body, stream=True)
+        breaker = self.circuit_breaker
+        try:
+            yield from iter_result_items(
+                response.iter_content(chunk_size=chunk_size), 'peer_book')
+        except requests.exceptions.RequestException:
+            if breaker is not None:
+                breaker.record_failure()
+            raise MinerConnectionError(
+                "Lost connection to miner %s" % self.url
+            )
+        except Exception:
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        except BaseException:
+            # Consumer stopped early, or interrupted
+            if breaker is not None:
+                breaker.release()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+        finally:
+            response.close()
+
     def get_firmware_version(self):
         summary = self.get_summary()
         return summary.get('firmware_version')
@@ -97,38 +350,8 @@ class Client(object):
         rpc_response = self.__fetch_data('txn_add_gateway',
                                          owner=owner_address,
                                          payer=payer_address)
-        encoded_wrapped_txn = rpc_response['result']
-
-        # Base64 decode
-        # https://github.com/helium/miner/blob/b9d2cd108cdcc864b641ccf4209f790b1461926d/src/jsonrpc/miner_jsonrpc_txn.erl#L38
-        decoded_wrapped_txn = base64.b64decode(encoded_wrapped_txn)
-
-        # Deserialize wrapped protobuf
-        # https://github.com/helium/blockchain-core/blob/3cd6bca6c5595a1363a9bbd625ef254383a4141b/src/transactions/blockchain_txn.erl#L160
-        wrapped_txn = blockchain_txn_pb2.blockchain_txn()
-        wrapped_txn.ParseFromString(decoded_wrapped_txn)
-
-        # Unwrap to get blockchain_txn_add_gateway_v1
-        # https://github.com/helium/proto/blob/6dc60a9933628c3baf9d2f5386481f20a5d79bb8/src/blockchain_txn_add_gateway_v1.proto#L1
-        add_gateway_txn = wrapped_txn.add_gateway
-
-        txn_gateway_address = get_address_from_add_gateway_txn(
-            add_gateway_txn, 'gateway', gateway_address)
-
-        txn_owner_address = get_address_from_add_gateway_txn(
-            add_gateway_txn, 'owner', owner_address)
-
-        txn_payer_address = get_address_from_add_gateway_txn(
-            add_gateway_txn, 'payer', payer_address)
-
-        return {
-            'gateway_address': txn_gateway_address,
-            'owner_address': txn_owner_address,
-            'payer_address': txn_payer_address,
-            'fee': add_gateway_txn.fee,
-            'staking_fee': add_gateway_txn.staking_fee,
-            'txn': encoded_wrapped_txn
-        }
+        return parse_add_gateway_txn(rpc_response, owner_address,
+                                     payer_address, gateway_address)
 
 
 def get_address_from_add_gateway_txn(add_gateway_txn:
@@ -149,21 +372,6 @@ def get_address_from_add_gateway_txn(add_gateway_txn:
         MinerMalformedAddGatewayTxn if expected_address supplied and
         does not match the return value.
     """
-
-    # Addresses returned by the RPC response are missing a leading
-    # byte for the version. The version is currently always 0.
-    # https://github.com/helium/helium-js/blob/8d5cb76e156fb80de6fc80f239b43e3872c7b7d7/packages/crypto/src/Address.ts#L64
-    version_byte = b'\x00'
-
-    # Convert binary address to base58
-    address_bytes = version_byte + getattr(add_gateway_txn, address_type)
-    address = str(base58.b58encode_check(address_bytes), 'utf-8')
-
-    # Ensure resulting address matches expectation
-    is_expected_address_defined = expected_address is not None
-    if is_expected_address_defined and address != expected_address:
-        msg = f"Expected {address_type} address to be {expected_address}," + \
-              f"but is {address}"
-        raise MinerMalformedAddGatewayTxn(msg)
-
-    return address
+    return add_gateway_txn_util.get_address_from_add_gateway_txn(
+        add_gateway_txn, address_type, expected_address,
+        MinerMalformedAddGatewayTxn)
@@ -1,3 +1,6 @@
+from hm_pyhelper.exceptions import MalformedAddGatewayTxn
+
+
 class MinerJSONRPCException(Exception):
     pass
 
@@ -6,6 +9,10 @@ class MinerConnectionError(MinerJSONRPCException):
     pass
 
 
+class MinerCircuitOpen(MinerConnectionError):
+    pass
+
+
 class MinerMalformedURL(MinerJSONRPCException):
     pass
 
@@ -22,5 +29,5 @@ class MinerFailedToFetchEthernetAddress(MinerJSONRPCException):
     pass
 
 
-class MinerMalformedAddGatewayTxn(MinerJSONRPCException):
+class MinerMalformedAddGatewayTxn(MinerJSONRPCException, MalformedAddGatewayTxn):
     pass
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Any, NamedTuple, Optional
+
+from hm_pyhelper.miner_json_rpc.client import Client
+
+DEFAULT_MAX_WORKERS = 32
+# Local endpoints answer quickly, don't let a dead host hold up a sweep
+DEFAULT_CONNECT_TIMEOUT = 2.0  # seconds
+DEFAULT_READ_TIMEOUT = 10.0  # seconds
+
+
+class FleetResult(NamedTuple):
+    url: str
+    result: Any = None
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+
+
+class FleetRun(object):
+    """
+    Results of one sweep across the fleet. Iterating yields a FleetResult
+    per miner as soon as it completes. Each miner is only called once:
+    later iterations replay the results already collected, then resume
+    the sweep if an earlier iteration stopped early. summary() may be
+    called at any time and covers the results collected so far.
+    """
+
+    def __init__(self, urls, task, max_workers):
+        self.urls = list(urls)
+        self._task = task
+        self._max_workers = max_workers
+        # In completion order
+        self._results = []
+        # In the order of urls, None until completed
+        self._by_index = [None] * len(self.urls)
+        # index -> Future of the call to that miner, once submitted
+        self._futures = {}
+        # Reentrant, a callback added to a done future runs immediately
+        self._lock = threading.RLock()
+
+    def __iter__(self):
+        with self._lock:
+            collected = list(self._results)
+            executor, futures = self._submit_pending()
+        yield from collected
+
+        try:
+            for future in as_completed(futures):
+                if not future.cancelled():
+                    yield self._record(futures[future], future)
+        finally:
+            if executor is not None:
+                # consumer stopped early: skip the miners not started
+                # yet, calls in flight are recorded when they complete
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_pending(self):
+        """
+        Returns the executor running the calls to miners without a
+        result, if any was needed, and a dict of their futures to index.
+        Calls still in flight from an earlier iteration are reused.
+        """
+        executor = None
+        futures = {}
+        for index, result in enumerate(self._by_index):
+            if result is not None:
+                continue
+            future = self._futures.get(index)
+            if future is None or future.cancelled():
+                if executor is None:
+                    executor = ThreadPoolExecutor(
+                        max_workers=min(self._max_workers, len(self.urls)))
+                future = executor.submit(self._run_one, self.urls[index])
+                future.add_done_callback(partial(self._record, index))
+                self._futures[index] = future
+            futures[future] = index
+        return executor, futures
+
+    def _record(self, index, future):
+        if future.cancelled():
+            return None
+        result = future.result()
+        with self._lock:
+            if self._by_index[index] is None:
+                self._by_index[index] = result
+                self._results.append(result)
+        return result
+
+    def _run_one(self, url):
+        start = time.monotonic()
+        try:
+            result = self._task(url)
+        except Exception as e:
+            return FleetResult(url, error=e, elapsed=time.monotonic() - start)
+        return FleetResult(url, result=result, elapsed=time.monotonic() - start)
+
+    def results(self) -> list:
+        """
+        Runs the sweep to completion and returns the results in the
+        order of urls.
+        """
+        for _ in self:
+            pass
+        with self._lock:
+            return list(self._by_index)
+
+    def summary(self) -> dict:
+        with self._lock:
+            results = list(self._results)
+        failures = {result.url: f"{type(result.error).__name__}: {result.error}"
+                    for result in results if result.error is not None}
+        return {
+            'total': len(self.urls),
+            'completed': len(results),
+            'succeeded': len(results) - len(failures),
+            'failed': len(failures),
+            'errors_by_type': dict(Counter(type(result.error).__name__
+                                           for result in results
+                                           if result.error is not None)),
+            'failures': failures
+        }
+
+
+class FleetClient(object):
+    """
+    Runs miner JSON-RPC calls across many miners concurrently, with at
+    most max_workers requests in flight and per-host timeouts.
+
+    Usage:
+        fleet = FleetClient(['http://10.0.0.2:4467', 'http://10.0.0.3:4467'])
+        sweep = fleet.run('info_height')
+        for result in sweep:
+            print(result.url, result.result or result.error)
+        print(sweep.summary())
+    """
+
+    def __init__(self, urls, max_workers=DEFAULT_MAX_WORKERS,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.urls = list(urls)
+        self.max_workers = max_workers
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def _client(self, url) -> Client:
+        return Client(url, pool_maxsize=1,
+                      connect_timeout=self.connect_timeout,
+                      read_timeout=self.read_timeout)
+
+    def run(self, method, **params) -> FleetRun:
+        """
+        Calls method with params on every miner. FleetResult.result is
+        the method's result.
+        """
+        def task(url):
+            with self._client(url) as client:
+                return client.call(method, **params)
+        return FleetRun(self.urls, task, self.max_workers)
+
+    def run_batch(self, calls, raise_on_error=False) -> FleetRun:
+        """
+        Sends calls as one JSON-RPC batch to every miner, see Client.batch.
+        FleetResult.result is the list of results.
+        """
+        # Read once, calls may be an iterator
+        calls = list(calls)
+
+        def task(url):
+            with self._client(url) as client:
+                return client.batch(calls, raise_on_error=raise_on_error)
+        return FleetRun(self.urls, task, self.max_workers)
@@ -0,0 +1,198 @@
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+from hm_pyhelper.logger import get_logger
+from hm_pyhelper.miner_json_rpc.client import Client
+from hm_pyhelper.miner_json_rpc.exceptions import MinerJSONRPCException
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_MIN_INTERVAL = 1.0  # seconds
+DEFAULT_MAX_INTERVAL = 30.0  # seconds
+DEFAULT_STALL_THRESHOLD = 600.0  # seconds
+# Weight of the latest sample in the blocks per second moving average
+DEFAULT_SMOOTHING = 0.3
+
+
+class HeightEvent(NamedTuple):
+    height: int
+    previous_height: Optional[int]
+    blocks_per_second: float
+    stalled: bool
+    seconds_since_change: float
+
+
+class HeightFollower(object):
+    """
+    Polls the miner block height and notifies subscribers when it
+    changes, or when it has not changed for stall_threshold seconds.
+
+    Polling is fast (min_interval) while the miner is catching up, ie.
+    more than one block arrived since the last poll, and slows down
+    towards max_interval once it follows the head of the chain.
+
+    Use get_height_follower() to share a single polling loop between
+    all consumers in a process.
+    """
+
+    def __init__(self, client, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL,
+                 stall_threshold=DEFAULT_STALL_THRESHOLD,
+                 smoothing=DEFAULT_SMOOTHING, clock=time.monotonic):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Expected 0 < min_interval <= max_interval")
+
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.stall_threshold = stall_threshold
+        self.smoothing = smoothing
+        self._clock = clock
+
+        self.height = None
+        self.blocks_per_second = 0.0
+        self.stalled = False
+        self.interval = min_interval
+        self._last_poll_at = None
+        self._last_change_at = None
+
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback: Callable[[HeightEvent], None]) -> Callable:
+        """
+        Registers callback to be called with a HeightEvent on changes and
+        starts polling if needed. Returns a function that unsubscribes;
+        polling stops once the last subscriber is gone.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        self.start()
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+                last = not self._subscribers
+            if last:
+                self.stop()
+
+        return unsubscribe
+
+    def seconds_since_change(self) -> float:
+        if self._last_change_at is None:
+            return 0.0
+        return self._clock() - self._last_change_at
+
+    def eta(self, target_height: int) -> Optional[float]:
+        """
+        Seconds until target_height is reached at the current rate,
+        or None if unknown.
+        """
+        if self.height is None:
+            return None
+        if self.height >= target_height:
+            return 0.0
+        if self.blocks_per_second <= 0:
+            return None
+        return (target_height - self.height) / self.blocks_per_second
+
+    def poll_once(self) -> float:
+        """
+        Fetches the height once, notifies subscribers if needed and
+        returns the seconds to wait until the next poll.
+        """
+        now = self._clock()
+        try:
+            height = self.client.get_height()['height']
+        except MinerJSONRPCException as e:
+            LOGGER.warning(f"Unable to fetch miner height: {e}")
+            height = self.height
+        except Exception:
+            # eg. HTTP errors or a malformed result, keep polling so
+            # stalls are still reported
+            LOGGER.exception("Unexpected error fetching miner height")
+            height = self.height
+
+        event = self._update(height, now)
+        if event is not None:
+            self._notify(event)
+        return self.interval
+
+    def _update(self, height, now) -> Optional[HeightEvent]:
+        previous_height = self.height
+        delta = 0
+        if height is not None and previous_height is not None:
+            delta = max(0, height - previous_height)
+        if self._last_poll_at is not None and now > self._last_poll_at:
+            sample = delta / (now - self._last_poll_at)
+            self.blocks_per_second += \
+                self.smoothing * (sample - self.blocks_per_second)
+        self._last_poll_at = now
+
+        if delta > 1:
+            # catching up
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+
+        if height != previous_height:
+            self.height = height
+            self._last_change_at = now
+            self.stalled = False
+        elif not self.stalled and \
+                self.seconds_since_change() >= self.stall_threshold:
+            self.stalled = True
+        else:
+            return None
+
+        return HeightEvent(self.height, previous_height,
+                           self.blocks_per_second, self.stalled,
+                           self.seconds_since_change())
+
+    def _notify(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                LOGGER.exception("Height subscriber failed")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._stop_event.wait(self.poll_once())
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name='miner-height-follower')
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+_followers = {}
+_followers_lock = threading.Lock()
+
+
+def get_height_follower(url='http://helium-miner:4467', **kwargs) -> HeightFollower:
+    """
+    Returns the HeightFollower shared by all consumers of the miner at
+    url in this process. kwargs are only used when it is first created.
+    """
+    with _followers_lock:
+        if url not in _followers:
+            _followers[url] = HeightFollower(Client(url), **kwargs)
+        return _followers[url]
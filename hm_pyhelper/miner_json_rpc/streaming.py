@@ -0,0 +1,137 @@
+"""
+Incremental parsing of JSON-RPC responses whose result is a large array,
+such as peer_book. Only the array element being decoded is kept in
+memory, instead of the whole response document.
+"""
+import codecs
+import json
+from typing import Iterable, Iterator
+
+from hm_pyhelper.miner_json_rpc.exceptions import MinerFailedFetchData
+
+STREAM_CHUNK_SIZE = 16 * 1024  # bytes
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CONTINUATION = '0123456789.eE+-'
+_DECODER = json.JSONDecoder()
+
+
+class _JSONStream(object):
+    """
+    Text buffer over an iterable of byte chunks. Values are decoded
+    with the C accelerated JSONDecoder.raw_decode, reading more chunks
+    whenever the buffered text ends before the value does.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        # Drop consumed text so the buffer stays bounded
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer += self._utf8.decode(chunk)
+                return True
+        self._buffer += self._utf8.decode(b'', final=True)
+        self._eof = True
+        return False
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character, or '' at the end.
+        """
+        while True:
+            while self._pos < len(self._buffer) and \
+                    self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise MinerFailedFetchData(
+                "Malformed JSON-RPC response, expected one of %r but got %r"
+                % (chars, char))
+        self._pos += 1
+        return char
+
+    def _may_continue(self, end: int) -> bool:
+        return end == len(self._buffer) or \
+            self._buffer[end] in _NUMBER_CONTINUATION
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise MinerFailedFetchData("Malformed JSON-RPC response")
+            # A number at the end of the buffer may continue in the next chunk
+            if self._may_continue(end) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def iter_result_items(chunks: Iterable[bytes], method: str = '') -> Iterator:
+    """
+    Yields the elements of the 'result' array of a JSON-RPC response
+    read from chunks, one at a time. Other members of the response are
+    decoded whole, they are expected to be small.
+
+    Raises:
+        - MinerFailedFetchData if the response carries an error or is
+          not valid JSON.
+    """
+    stream = _JSONStream(chunks)
+    stream.expect('{')
+    error = None
+    if stream.peek() == '}':
+        stream.expect('}')
+        return
+
+    while True:
+        key = stream.decode_value()
+        stream.expect(':')
+        if key == 'result' and stream.peek() == '[':
+            yield from _iter_array(stream)
+        elif key == 'result':
+            result = stream.decode_value()
+            if isinstance(result, list):
+                yield from result
+        elif key == 'error':
+            error = stream.decode_value()
+        else:
+            stream.decode_value()
+
+        if stream.expect(',}') == '}':
+            break
+
+    if error is not None:
+        raise MinerFailedFetchData(
+            "Miner %s call failed: %s (%s)"
+            % (method, error.get('message'), error.get('code')))
+
+
+def _iter_array(stream: _JSONStream) -> Iterator:
+    stream.expect('[')
+    if stream.peek() == ']':
+        stream.expect(']')
+        return
+    while True:
+        yield stream.decode_value()
+        if stream.expect(',]') == ']':
+            return
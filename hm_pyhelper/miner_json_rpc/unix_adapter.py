@@ -0,0 +1,92 @@
+"""
+requests transport adapter speaking HTTP over a unix domain socket, used
+by Client for 'unix://' miner URLs. Avoids the Docker network and DNS
+lookups when the miner shares a volume with the caller.
+"""
+import socket
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+UNIX_SCHEME = 'unix://'
+# requests needs a http URL to route a request to UnixHTTPAdapter. The
+# host part is ignored, the adapter always connects to its socket.
+UNIX_REQUEST_URL = 'http+unix://localhost/'
+
+
+def is_unix_url(url: str) -> bool:
+    return url.startswith(UNIX_SCHEME)
+
+
+def get_socket_path(url: str) -> str:
+    """
+    Returns the socket path of a unix URL,
+    eg. 'unix:///var/run/miner.sock' -> '/var/run/miner.sock'
+    """
+    return url[len(UNIX_SCHEME):]
+
+
+class UnixHTTPConnection(HTTPConnection):
+
+    def __init__(self, *args, socket_path=None, **kwargs):
+        super(UnixHTTPConnection, self).__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except socket.timeout as e:
+            sock.close()
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.socket_path} timed out") from e
+        except OSError as e:
+            sock.close()
+            raise NewConnectionError(
+                self, f"Failed to connect to {self.socket_path}: {e}") from e
+        return sock
+
+
+class UnixHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = UnixHTTPConnection
+
+
+class UnixHTTPAdapter(HTTPAdapter):
+    """
+    Sends every request through a keep-alive connection pool to
+    socket_path, whatever the request URL.
+    """
+
+    def __init__(self, socket_path, pool_maxsize=1, **kwargs):
+        self.socket_path = socket_path
+        self._unix_pool = None
+        super(UnixHTTPAdapter, self).__init__(pool_connections=1,
+                                              pool_maxsize=pool_maxsize,
+                                              **kwargs)
+
+    def _get_unix_pool(self):
+        if self._unix_pool is None:
+            self._unix_pool = UnixHTTPConnectionPool(
+                'localhost', maxsize=self._pool_maxsize,
+                block=self._pool_block, socket_path=self.socket_path)
+        return self._unix_pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None,
+                                        cert=None):
+        return self._get_unix_pool()
+
+    def get_connection(self, url, proxies=None):
+        return self._get_unix_pool()
+
+    def request_url(self, request, proxies):
+        return request.path_url
+
+    def close(self):
+        super(UnixHTTPAdapter, self).close()
+        if self._unix_pool is not None:
+            self._unix_pool.close()
+            self._unix_pool = None
@@ -0,0 +1,71 @@
+"""
+Benchmark of hm_pyhelper.util.address against calling base58 directly.
+
+Run with:
+    python -m hm_pyhelper.tests.benchmark_address --addresses 16 --calls 20000
+"""
+import argparse
+import os
+import timeit
+
+import base58
+
+from hm_pyhelper.util.address import VERSION_BYTE, clear_address_cache, \
+    decode_addresses, encode_addresses
+
+
+def make_addresses(count):
+    # 33 byte ed25519 keys, like the ones returned by gateway-rs
+    return [b'\x01' + os.urandom(32) for _ in range(count)]
+
+
+def run_benchmarks(addresses=16, calls=20000, repeat=3):
+    """
+    Converts calls addresses, cycling through a working set of size
+    addresses. Returns best-of-repeat seconds per mode.
+    """
+    working_set = make_addresses(addresses)
+    binary = [working_set[i % addresses] for i in range(calls)]
+    encoded = [base58.b58encode_check(VERSION_BYTE + key).decode()
+               for key in binary]
+
+    def base58_encode():
+        return [base58.b58encode_check(VERSION_BYTE + key).decode()
+                for key in binary]
+
+    def base58_decode():
+        return [base58.b58decode_check(address)[1:] for address in encoded]
+
+    def codec_encode():
+        return encode_addresses(binary)
+
+    def codec_decode():
+        return decode_addresses(encoded)
+
+    clear_address_cache()
+    assert codec_encode() == base58_encode()  # nosec
+    assert codec_decode() == base58_decode()  # nosec
+
+    results = {}
+    for name, func in (('base58 encode', base58_encode),
+                       ('codec encode', codec_encode),
+                       ('base58 decode', base58_decode),
+                       ('codec decode', codec_decode)):
+        results[name] = min(timeit.repeat(func, number=1, repeat=repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--addresses', type=int, default=16,
+                        help='number of distinct addresses')
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.addresses, args.calls)
+    for name, seconds in results.items():
+        print(f"{name:<16}{seconds * 1e6 / args.calls:>10.2f} us/address")
+
+
+if __name__ == '__main__':
+    main()
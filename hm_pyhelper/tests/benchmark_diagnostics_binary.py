@@ -0,0 +1,93 @@
+"""
+Benchmark of hm_pyhelper.diagnostics.binary against JSON.
+
+Run with:
+    python -m hm_pyhelper.tests.benchmark_diagnostics_binary --calls 20000
+"""
+import argparse
+import json
+import timeit
+
+from hm_pyhelper.diagnostics.binary import decode_report, encode_report
+from hm_pyhelper.diagnostics.diagnostics_report import DiagnosticsReport
+
+
+def make_report():
+    # Typical report of a hotspot with a failing ECC
+    return {
+        'diagnostics_passed': False,
+        'errors': ['ECC', 'onboarding_key', 'public_key'],
+        'BALENA_DEVICE_UUID': '2b3c4d5e6f708192a3b4c5d6e7f80912',
+        'BALENA_DEVICE_NAME_AT_INIT': 'misty-forest',
+        'bluetooth': True,
+        'ECC': 'gateway_mfr test finished with error',
+        'onboarding_key': 'gateway_mfr exited with a non-zero status',
+        'public_key': 'gateway_mfr exited with a non-zero status',
+        'eth_mac_address': '00:1b:44:11:3a:b7',
+        'wifi_mac_address': '00:1b:44:11:3a:b8',
+        'firmware_short_hash': '1a2b3c4',
+        'FIRMWARE_VERSION': '2022.11.01.0',
+        'FREQ': '868',
+        'lora': True,
+        'lte': False,
+        'legacy_pass_fail': False,
+        'serial_number': '0000000021aabbcc',
+        'VARIANT': 'NEBHNT-OUT1',
+        'validator_height': 1583251,
+        'MH': 1583251,
+        'gateway_region': 'EU868',
+        'RE': 'EU868'
+    }
+
+
+def run_benchmarks(calls=20000, repeat=3):
+    """
+    Encodes and decodes a typical report calls times. Returns the encoded
+    size in bytes and best-of-repeat seconds per mode.
+    """
+    report = make_report()
+    encoded_json = json.dumps(report)
+    encoded_binary = encode_report(report)
+    assert decode_report(encoded_binary) == report  # nosec
+
+    def json_encode():
+        for _ in range(calls):
+            json.dumps(report)
+
+    def json_decode():
+        for _ in range(calls):
+            DiagnosticsReport.from_json_dict(json.loads(encoded_json))
+
+    def binary_encode():
+        for _ in range(calls):
+            encode_report(report)
+
+    def binary_decode():
+        for _ in range(calls):
+            decode_report(encoded_binary)
+
+    sizes = {'json': len(encoded_json.encode('utf-8')),
+             'binary': len(encoded_binary)}
+    results = {}
+    for name, func in (('json encode', json_encode),
+                       ('binary encode', binary_encode),
+                       ('json decode', json_decode),
+                       ('binary decode', binary_decode)):
+        results[name] = min(timeit.repeat(func, number=1, repeat=repeat))
+    return sizes, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    sizes, results = run_benchmarks(args.calls)
+    for name, size in sizes.items():
+        print(f"{name + ' size':<16}{size:>10d} bytes")
+    for name, seconds in results.items():
+        print(f"{name:<16}{seconds * 1e6 / args.calls:>10.2f} us/report")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Load and latency benchmark for GatewayClient against FakeGatewayServer.
+
+Run with:
+    python -m hm_pyhelper.tests.benchmark_gateway_grpc --calls 2000 \
+        --concurrency 16 --latency 0.002
+"""
+import argparse
+import asyncio
+import math
+import time
+from concurrent import futures
+
+import grpc
+
+from hm_pyhelper.gateway_grpc.client import GatewayClient
+from hm_pyhelper.protos import local_pb2, local_pb2_grpc
+from hm_pyhelper.tests.fake_gateway import FakeGatewayServer
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(name, latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'calls': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'throughput_per_s': (len(latencies) + errors) / elapsed if elapsed else 0.0
+    }
+
+
+def run_sync_benchmark(address, calls, concurrency):
+    """
+    Calls GatewayClient.get_pubkey() calls times from concurrency
+    threads sharing one client.
+    """
+    def timed_call(client):
+        start = time.perf_counter()
+        try:
+            client.get_pubkey()
+        except grpc.RpcError:
+            return None
+        return time.perf_counter() - start
+
+    with GatewayClient(address) as client:
+        start = time.perf_counter()
+        with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda _: timed_call(client),
+                                        range(calls)))
+        elapsed = time.perf_counter() - start
+
+    latencies = [result for result in results if result is not None]
+    return summarize(f'sync x{concurrency}', latencies,
+                     len(results) - len(latencies), elapsed)
+
+
+def run_async_benchmark(address, calls, concurrency):
+    """
+    Calls the pubkey rpc calls times through a grpc.aio channel with at
+    most concurrency calls outstanding.
+    """
+    async def run():
+        latencies = []
+        errors = 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with grpc.aio.insecure_channel(address) as channel:
+            stub = local_pb2_grpc.apiStub(channel)
+
+            async def timed_call():
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        await stub.pubkey(local_pb2.pubkey_req())
+                    except grpc.RpcError:
+                        errors += 1
+                        return
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(timed_call() for _ in range(calls)))
+            elapsed = time.perf_counter() - start
+
+        return summarize(f'async x{concurrency}', latencies, errors, elapsed)
+
+    return asyncio.run(run())
+
+
+def run_benchmarks(calls=1000, concurrency=16, latency=0.0, error_rate=0.0):
+    with FakeGatewayServer(max_workers=concurrency, latency=latency,
+                           error_rate=error_rate, seed=0) as server:
+        return [
+            run_sync_benchmark(server.address, calls, 1),
+            run_sync_benchmark(server.address, calls, concurrency),
+            run_async_benchmark(server.address, calls, concurrency)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='server side latency per call in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'calls':>8}{'errors':>8}{'p50 ms':>10}"
+          f"{'p99 ms':>10}{'calls/s':>12}")
+    for result in run_benchmarks(args.calls, args.concurrency,
+                                 args.latency, args.error_rate):
+        print(f"{result['name']:<12}{result['calls']:>8}{result['errors']:>8}"
+              f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['throughput_per_s']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""
+Clock for tests of classes taking a clock callable, eg. time.monotonic.
+Time only moves when the test sets now.
+"""
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
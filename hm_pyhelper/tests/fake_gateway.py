@@ -0,0 +1,150 @@
+"""
+In-process fake of the gateway-rs local gRPC api, used to exercise
+GatewayClient against a real grpc server instead of a mocked stub.
+
+Usage:
+    with FakeGatewayServer(latency=0.005, error_rate=0.01) as server:
+        with GatewayClient(server.address) as client:
+            client.get_pubkey()
+"""
+import random
+import threading
+import time
+from collections import Counter
+from concurrent import futures
+
+import grpc
+
+from hm_pyhelper.protos import local_pb2, local_pb2_grpc
+
+DEFAULT_PUBKEY = b"\x01\xc3\x06\x7f\xb9\x19}\xd1n2\xe2M\xeb\xb5\x11\x7f" \
+                 b"\xbc\x12\xebT\xb9\x84R\xc7\xca\xf8o\xdddx\xea~\xab"
+DEFAULT_ROUTER_URI = "http://mainnet-router.helium.io:8080"
+
+
+class FakeGatewayServicer(local_pb2_grpc.apiServicer):
+    """
+    Implements pubkey, region, router and add_gateway with configurable
+    latency and error injection. All settings can be changed while the
+    server is running.
+
+    latency - seconds added to every call.
+    jitter - extra random latency in seconds, uniform in [0, jitter].
+    error_rate - probability in [0, 1] that a call aborts with error_code.
+    """
+
+    def __init__(self, pubkey=DEFAULT_PUBKEY, region=0,
+                 router_uri=DEFAULT_ROUTER_URI, router_connected=True,
+                 latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_code=grpc.StatusCode.UNAVAILABLE, seed=None):
+        self.pubkey_address = pubkey
+        self.region_id = region
+        self.router_uri = router_uri
+        self.router_connected = router_connected
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.calls = Counter()
+        self.errors = Counter()
+        self._forced_errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fail_next(self, count=1):
+        """
+        Make the next count calls abort with error_code regardless
+        of error_rate.
+        """
+        with self._lock:
+            self._forced_errors += count
+
+    def _handle(self, method, context):
+        with self._lock:
+            self.calls[method] += 1
+            fail = self._forced_errors > 0 or \
+                self._random.random() < self.error_rate
+            if self._forced_errors > 0:
+                self._forced_errors -= 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            if fail:
+                self.errors[method] += 1
+
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            context.abort(self.error_code, f"injected {method} failure")
+
+    def pubkey(self, request, context):
+        self._handle('pubkey', context)
+        return local_pb2.pubkey_res(address=self.pubkey_address)
+
+    def region(self, request, context):
+        self._handle('region', context)
+        return local_pb2.region_res(region=self.region_id)
+
+    def router(self, request, context):
+        self._handle('router', context)
+        return local_pb2.router_res(uri=self.router_uri,
+                                    connected=self.router_connected)
+
+    def add_gateway(self, request, context):
+        self._handle('add_gateway', context)
+        # Not a real transaction, but deterministic and unique per request
+        txn = request.owner + request.payer + bytes([request.staking_mode])
+        return local_pb2.add_gateway_res(add_gateway_txn=txn)
+
+
+class FakeGatewayServer(object):
+    """
+    Runs a FakeGatewayServicer on localhost. port=0 picks a free port,
+    which is kept across restart() so connected clients can reconnect.
+    If socket_path is given it listens on that unix domain socket instead.
+    Extra keyword arguments are passed to FakeGatewayServicer.
+    """
+
+    def __init__(self, port=0, max_workers=10, socket_path=None,
+                 **servicer_kwargs):
+        self.port = port
+        self.socket_path = socket_path
+        self.max_workers = max_workers
+        self.servicer = FakeGatewayServicer(**servicer_kwargs)
+        self._server = None
+
+    @property
+    def address(self):
+        if self.socket_path is not None:
+            return f'unix://{self.socket_path}'
+        return f'localhost:{self.port}'
+
+    def start(self):
+        self._server = grpc.server(
+            futures.ThreadPoolExecutor(max_workers=self.max_workers))
+        local_pb2_grpc.add_apiServicer_to_server(self.servicer, self._server)
+        if self.socket_path is not None:
+            self._server.add_insecure_port(f'unix:{self.socket_path}')
+        else:
+            self.port = self._server.add_insecure_port(f'localhost:{self.port}')
+        self._server.start()
+        return self
+
+    def stop(self, grace=None):
+        if self._server is not None:
+            self._server.stop(grace).wait()
+            self._server = None
+
+    def restart(self, downtime=0.0):
+        """
+        Simulates a gateway-rs restart. Calls made during downtime fail
+        with UNAVAILABLE.
+        """
+        self.stop()
+        if downtime > 0:
+            time.sleep(downtime)
+        self.start()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, _, _2, _3):
+        self.stop()
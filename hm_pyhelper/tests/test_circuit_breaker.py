@@ -0,0 +1,132 @@
+import unittest
+
+import mock
+import requests
+import responses
+
+from hm_pyhelper.miner_json_rpc import MinerClient
+from hm_pyhelper.miner_json_rpc.circuit_breaker import CircuitBreaker, \
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+from hm_pyhelper.miner_json_rpc.exceptions import MinerCircuitOpen, \
+    MinerConnectionError
+from hm_pyhelper.tests.fake_clock import FakeClock
+
+BASE_URL = 'http://helium-miner:4467'
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10,
+                                      clock=self.clock)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.fail(2)
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+
+        self.fail(1)
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+        with self.assertRaisesRegex(MinerCircuitOpen, 'retry in 10.0s'):
+            self.breaker.before_call('url')
+
+    def test_half_open_probe(self):
+        self.fail(3)
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+
+        # only one probe at a time
+        self.breaker.before_call()
+        with self.assertRaises(MinerCircuitOpen):
+            self.breaker.before_call()
+
+        # failed probe re-opens for another reset_timeout
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+        self.clock.now = 19
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+        self.clock.now = 20
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+
+    def test_release_probe(self):
+        self.fail(3)
+        self.clock.now = 10
+        self.breaker.before_call()
+        # cancelled probe, neither closes nor re-opens the circuit
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+
+    def test_metrics(self):
+        self.fail(3)
+        with self.assertRaises(MinerCircuitOpen):
+            self.breaker.before_call()
+
+        self.assertEqual(self.breaker.get_metrics(), {
+            'state': STATE_OPEN,
+            'consecutive_failures': 3,
+            'calls': 3,
+            'failures': 3,
+            'rejected': 1,
+            'times_opened': 1
+        })
+        self.breaker.reset()
+        self.assertEqual(self.breaker.get_metrics()['state'], STATE_CLOSED)
+
+    def test_invalid_threshold(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+
+
+class TestMinerClientCircuitBreaker(unittest.TestCase):
+
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
+                side_effect=requests.exceptions.ReadTimeout())
+    def test_fails_fast_when_open(self, mock_post):
+        breaker = CircuitBreaker(failure_threshold=2)
+        client = MinerClient(connect_timeout=1, read_timeout=2,
+                             circuit_breaker=breaker)
+
+        for _ in range(2):
+            with self.assertRaisesRegex(MinerConnectionError, 'Timed out'):
+                client.get_height()
+        with self.assertRaises(MinerCircuitOpen):
+            client.get_height()
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_post.call_args.kwargs['timeout'], (1, 2))
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
+                side_effect=KeyboardInterrupt())
+    def test_interrupted_probe(self, _):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.before_call()
+        breaker.record_failure()
+        client = MinerClient(circuit_breaker=breaker)
+
+        with self.assertRaises(KeyboardInterrupt):
+            client.get_height()
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+
+    @responses.activate
+    def test_http_errors_are_not_failures(self):
+        responses.add(responses.POST, BASE_URL, status=500)
+        breaker = CircuitBreaker(failure_threshold=1)
+        client = MinerClient(circuit_breaker=breaker)
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.get_height()
+        self.assertEqual(breaker.state, STATE_CLOSED)
@@ -1,11 +1,72 @@
+import asyncio
+import threading
+import time
+import copy
+import pickle
 import unittest
 import json
 from hm_pyhelper.constants.diagnostics import ERRORS_KEY
 
-from hm_pyhelper.diagnostics import Diagnostic, DiagnosticsReport
+from hm_pyhelper.diagnostics import AsyncDiagnostic, \
+    CompactDiagnosticsReport, Diagnostic, DiagnosticsReport, ErrorKeyGroup
+from hm_pyhelper.diagnostics.delta import apply_delta
+from hm_pyhelper.diagnostics.error_index import ErrorIndex
 from hm_pyhelper.diagnostics.diagnostics_report import \
                                     DIAGNOSTICS_PASSED_KEY, \
-                                    DIAGNOSTICS_ERRORS_KEY
+                                    DIAGNOSTICS_ERRORS_KEY, \
+                                    DiagnosticEvent, \
+                                    SERIALIZATION_FRIENDLY, \
+                                    SERIALIZATION_LEGACY, \
+                                    SERIALIZATION_TERSE
+from hm_pyhelper.diagnostics.timings import DIAGNOSTICS_TIMINGS_KEY
+
+
+class SleepDiagnostic(Diagnostic):
+    def __init__(self, key, seconds, result=True, error=None,
+                 depends_on=None, log=None):
+        super(SleepDiagnostic, self).__init__(key, key + '_friendly',
+                                              depends_on)
+        self.seconds = seconds
+        self.result = result
+        self.error = error
+        self.thread_name = None
+        self.log = log
+
+    def perform_test(self, diagnostics_report):
+        self.thread_name = threading.current_thread().name
+        if self.log is not None:
+            self.log.append(self.key)
+        time.sleep(self.seconds)
+        if self.result is False:
+            diagnostics_report.record_failure(False, self)
+            return
+        if self.error is not None:
+            raise self.error
+        diagnostics_report.record_result(self.result, self)
+
+
+class AsyncSleepDiagnostic(AsyncDiagnostic):
+    def __init__(self, key, seconds, result=True, error=None,
+                 depends_on=None, log=None):
+        super(AsyncSleepDiagnostic, self).__init__(key, key + '_friendly',
+                                                   depends_on)
+        self.seconds = seconds
+        self.result = result
+        self.error = error
+        self.log = log
+        self.cancelled = False
+
+    async def perform_test(self, diagnostics_report):
+        if self.log is not None:
+            self.log.append(self.key)
+        try:
+            await asyncio.sleep(self.seconds)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        diagnostics_report.record_result(self.result, self)
 
 
 class TestDiagnostic(unittest.TestCase):
@@ -44,6 +105,29 @@ class TestDiagnostic(unittest.TestCase):
             'foo': 'bar'
         })
 
+    def test_from_json_str(self):
+        report = DiagnosticsReport.from_json_str(
+            '{"diagnostics_passed": false, "errors": ["ECC"], "ECC": false}')
+        self.assertDictEqual(report, {
+            DIAGNOSTICS_PASSED_KEY: False,
+            DIAGNOSTICS_ERRORS_KEY: ['ECC'],
+            'ECC': False
+        })
+        self.assertTrue(report.has_any_error(['ECC']))
+
+        diagnostic = Diagnostic('ECC', 'ecc')
+        report = DiagnosticsReport([diagnostic])
+        report.record_failure('gateway_mfr failed', diagnostic)
+        self.assertDictEqual(
+            DiagnosticsReport.from_json_str(report.to_json()), report)
+
+    def test_init_ignores_non_diagnostics(self):
+        report = DiagnosticsReport({'ECC': False})
+        self.assertDictEqual(report, {
+            DIAGNOSTICS_PASSED_KEY: False,
+            DIAGNOSTICS_ERRORS_KEY: []
+        })
+
     def test_get_error_messages(self):
         diagnostic1 = Diagnostic('key1', 'friendly_name1')
         diagnostic2 = Diagnostic('key2', 'friendly_name2')
@@ -130,3 +214,621 @@ class TestDiagnostic(unittest.TestCase):
 
         missing_keys = diagnostics_report.get_missing_keys({'missing_key'})
         self.assertEqual(missing_keys, {'missing_key'})
+
+    def test_perform_diagnostics_sequential(self):
+        diagnostics = [SleepDiagnostic('a', 0), SleepDiagnostic('b', 0)]
+        report = DiagnosticsReport(diagnostics)
+        report.perform_diagnostics()
+
+        self.assertTrue(report.passed())
+        self.assertEqual(report['a'], True)
+        self.assertEqual(diagnostics[0].thread_name,
+                         threading.current_thread().name)
+
+    def test_perform_diagnostics_parallel(self):
+        diagnostics = [SleepDiagnostic(str(i), 0.1, result=i)
+                       for i in range(8)]
+        report = DiagnosticsReport(diagnostics)
+        started = time.monotonic()
+        report.perform_diagnostics(max_workers=8)
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertTrue(report.passed())
+        for i in range(8):
+            self.assertEqual(report[str(i)], i)
+            self.assertEqual(report[str(i) + '_friendly'], i)
+
+    def test_perform_diagnostics_parallel_exception(self):
+        diagnostics = [SleepDiagnostic('a', 0),
+                       SleepDiagnostic('b', 0, error=ValueError('boom'))]
+        report = DiagnosticsReport(diagnostics)
+        report.perform_diagnostics(max_workers=2)
+
+        self.assertFalse(report.passed())
+        self.assertEqual(report['a'], True)
+        self.assertEqual(report['b'], 'boom')
+        self.assertEqual(report.has_errors(), ['b', 'b_friendly'])
+
+    def test_perform_diagnostics_timeout(self):
+        slow = SleepDiagnostic('slow', 0.5)
+        diagnostics = [slow, SleepDiagnostic('fast', 0)]
+        report = DiagnosticsReport(diagnostics)
+        started = time.monotonic()
+        report.perform_diagnostics(max_workers=1, timeout=0.1)
+
+        # The slow diagnostic's slot is freed for the fast one
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertFalse(report.passed())
+        self.assertEqual(report['fast'], True)
+        self.assertEqual(report['slow'], 'Diagnostic timed out after 0.1s')
+        self.assertEqual(report.has_errors(), ['slow', 'slow_friendly'])
+
+        # Late results of the timed out diagnostic are dropped
+        time.sleep(0.5)
+        self.assertEqual(report['slow'], 'Diagnostic timed out after 0.1s')
+
+    def test_dependencies_order(self):
+        log = []
+        diagnostics = [
+            SleepDiagnostic('onboarding', 0, depends_on=['ECC'], log=log),
+            SleepDiagnostic('ECC', 0, log=log),
+            SleepDiagnostic('serial', 0, log=log)
+        ]
+        report = DiagnosticsReport(diagnostics)
+        report.perform_diagnostics()
+
+        self.assertEqual(log, ['ECC', 'onboarding', 'serial'])
+        self.assertTrue(report.passed())
+
+    def test_dependencies_short_circuit(self):
+        for max_workers in (None, 4):
+            log = []
+            diagnostics = [
+                SleepDiagnostic('ECC', 0, result=False, log=log),
+                # Depends on the friendly key
+                SleepDiagnostic('onboarding', 0, depends_on=['ECC_friendly'],
+                                log=log),
+                SleepDiagnostic('public_key', 0, depends_on=['onboarding'],
+                                log=log),
+                SleepDiagnostic('serial', 0, log=log)
+            ]
+            report = DiagnosticsReport(diagnostics)
+            report.perform_diagnostics(max_workers=max_workers)
+
+            self.assertEqual(sorted(log), ['ECC', 'serial'])
+            self.assertFalse(report.passed())
+            self.assertEqual(report['onboarding'],
+                             'Skipped, depends on failed ECC_friendly')
+            self.assertEqual(report['public_key'],
+                             'Skipped, depends on failed onboarding')
+            self.assertEqual(report['serial'], True)
+            self.assertEqual(
+                set(report.has_errors()),
+                {'ECC', 'ECC_friendly', 'onboarding', 'onboarding_friendly',
+                 'public_key', 'public_key_friendly'})
+
+    def test_dependencies_parallel_branches(self):
+        diagnostics = [
+            SleepDiagnostic('miner', 0.1),
+            SleepDiagnostic('height', 0.1, depends_on=['miner']),
+            SleepDiagnostic('ECC', 0.1),
+            SleepDiagnostic('onboarding', 0.1, depends_on=['ECC'])
+        ]
+        report = DiagnosticsReport(diagnostics)
+        started = time.monotonic()
+        report.perform_diagnostics(max_workers=4)
+
+        # Two branches of two diagnostics each
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertTrue(report.passed())
+        self.assertEqual(report['height'], True)
+        self.assertEqual(report['onboarding'], True)
+
+    def test_dependencies_timeout(self):
+        diagnostics = [
+            SleepDiagnostic('miner', 0.5),
+            SleepDiagnostic('height', 0, depends_on=['miner'])
+        ]
+        report = DiagnosticsReport(diagnostics)
+        report.perform_diagnostics(timeout=0.1)
+
+        self.assertEqual(report['height'], 'Skipped, depends on failed miner')
+
+    def test_dependencies_cycle(self):
+        diagnostics = [
+            SleepDiagnostic('a', 0, depends_on=['b']),
+            SleepDiagnostic('b', 0, depends_on=['a'])
+        ]
+        report = DiagnosticsReport(diagnostics)
+        with self.assertRaises(ValueError):
+            report.perform_diagnostics()
+
+    def test_ttl_incremental(self):
+        log = []
+        serial = SleepDiagnostic('serial', 0, result='0000000021aabbcc', log=log)
+        serial.ttl = 60
+        lora = SleepDiagnostic('lora', 0, log=log)
+        report = DiagnosticsReport([serial, lora])
+
+        report.perform_diagnostics()
+        report.perform_diagnostics()
+        self.assertEqual(log, ['serial', 'lora', 'lora'])
+        self.assertTrue(report.passed())
+        self.assertEqual(report['serial'], '0000000021aabbcc')
+        self.assertFalse(report.is_stale(serial))
+        self.assertTrue(report.is_stale(lora))
+
+        report.perform_diagnostics(force=True)
+        self.assertEqual(log, ['serial', 'lora', 'lora', 'serial', 'lora'])
+
+    def test_ttl_expiry(self):
+        log = []
+        serial = SleepDiagnostic('serial', 0, log=log)
+        serial.ttl = 0.05
+        report = DiagnosticsReport([serial])
+
+        report.perform_diagnostics()
+        time.sleep(0.06)
+        report.perform_diagnostics(max_workers=2)
+        self.assertEqual(log, ['serial', 'serial'])
+
+    def test_ttl_failures_rerun(self):
+        log = []
+        ecc = SleepDiagnostic('ECC', 0, result=False, log=log)
+        ecc.ttl = 60
+        report = DiagnosticsReport([ecc])
+
+        report.perform_diagnostics()
+        self.assertFalse(report.passed())
+        ecc.result = True
+        report.perform_diagnostics()
+
+        self.assertEqual(log, ['ECC', 'ECC'])
+        self.assertTrue(report.passed())
+        self.assertEqual(report.has_errors(), [])
+
+    def test_ttl_stale_prerequisite(self):
+        log = []
+        ecc = SleepDiagnostic('ECC', 0, log=log)
+        onboarding = SleepDiagnostic('onboarding', 0, depends_on=['ECC'],
+                                     log=log)
+        onboarding.ttl = 60
+        report = DiagnosticsReport([onboarding, ecc])
+
+        report.perform_diagnostics()
+        ecc.result = False
+        report.perform_diagnostics()
+
+        # onboarding is still fresh, but ECC runs again and fails
+        self.assertEqual(log, ['ECC', 'onboarding', 'ECC'])
+        self.assertEqual(report['onboarding'], 'Skipped, depends on failed ECC')
+        self.assertFalse(report.passed())
+
+    def test_unrelated_errors_dont_fail(self):
+        report = DiagnosticsReport([SleepDiagnostic('ECC', 0)],
+                                   errors=['stale_from_upload'])
+        report.perform_diagnostics()
+        self.assertTrue(report.passed())
+
+        # fresh results keep their errors
+        report['errors'].append('ECC')
+        report.diagnostics[0].ttl = 60
+        report.perform_diagnostics()
+        self.assertFalse(report.passed())
+
+    def test_async_diagnostic_in_sync_report(self):
+        diagnostics = [AsyncSleepDiagnostic('a', 0, result='x')]
+        report = DiagnosticsReport(diagnostics)
+        report.perform_diagnostics()
+        self.assertEqual(report['a'], 'x')
+
+    def test_timings(self):
+        diagnostics = [
+            SleepDiagnostic('ECC', 0.05, result=False),
+            SleepDiagnostic('onboarding', 0, depends_on=['ECC']),
+            SleepDiagnostic('lora', 0.02),
+            SleepDiagnostic('lte', 0, error=ValueError('boom'))
+        ]
+        report = DiagnosticsReport(diagnostics)
+        with self.assertRaises(ValueError):
+            report.perform_diagnostics(timings=True)
+
+        timings = report[DIAGNOSTICS_TIMINGS_KEY]
+        ecc = timings['diagnostics']['ECC']
+        self.assertEqual(ecc['outcome'], 'failed')
+        self.assertGreaterEqual(ecc['wall_time'], 0.05)
+        self.assertLess(ecc['cpu_time'], ecc['wall_time'])
+        self.assertGreaterEqual(timings['diagnostics']['lora']['start_offset'],
+                                0.05)
+        self.assertEqual(timings['diagnostics']['onboarding']['outcome'],
+                         'skipped')
+        self.assertEqual(timings['diagnostics']['lte']['outcome'], 'error')
+
+        summary = timings['summary']
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['outcomes'], {'failed': 1, 'skipped': 1,
+                                               'passed': 1, 'error': 1})
+        self.assertEqual(summary['slowest'][:2], ['ECC', 'lora'])
+        self.assertGreaterEqual(summary['wall_time'], 0.07)
+
+        # Timings are only kept when requested
+        report.perform_diagnostics(max_workers=2)
+        self.assertNotIn(DIAGNOSTICS_TIMINGS_KEY, report)
+
+    def test_timings_threads(self):
+        serial = SleepDiagnostic('serial', 0)
+        serial.ttl = 60
+        diagnostics = [serial, SleepDiagnostic('slow', 0.5),
+                       SleepDiagnostic('fast', 0)]
+        report = DiagnosticsReport(diagnostics)
+        report.perform_diagnostics()
+        report.perform_diagnostics(max_workers=2, timeout=0.1, timings=True)
+
+        timings = report[DIAGNOSTICS_TIMINGS_KEY]
+        self.assertNotIn('serial', timings['diagnostics'])
+        self.assertEqual(timings['summary']['fresh'], 1)
+        slow = timings['diagnostics']['slow']
+        self.assertEqual(slow['outcome'], 'timeout')
+        self.assertIsNone(slow['cpu_time'])
+        self.assertGreaterEqual(slow['wall_time'], 0.1)
+        self.assertEqual(timings['diagnostics']['fast']['outcome'], 'passed')
+        self.assertIsNotNone(timings['diagnostics']['fast']['cpu_time'])
+
+    def test_subscribe(self):
+        diagnostic = Diagnostic('key', 'friendly_name')
+        report = DiagnosticsReport()
+        events = []
+        unsubscribe = report.subscribe(events.append)
+        report.record_result('foo', diagnostic)
+        report.record_failure(ValueError('bar'), diagnostic)
+        unsubscribe()
+        report.record_result('baz', diagnostic)
+
+        self.assertEqual(events, [DiagnosticEvent(diagnostic, 'foo', True),
+                                  DiagnosticEvent(diagnostic, 'bar', False)])
+
+    def test_iter_diagnostics(self):
+        def make_diagnostics():
+            return [SleepDiagnostic('slow', 0.1, result='s'),
+                    SleepDiagnostic('fast', 0, result='f'),
+                    SleepDiagnostic('ECC', 0, result=False),
+                    SleepDiagnostic('onboarding', 0, depends_on=['ECC'])]
+
+        report = DiagnosticsReport(make_diagnostics())
+        events = []
+        started = time.monotonic()
+        for diagnostic, result, passed in report.iter_diagnostics(max_workers=4):
+            events.append((diagnostic.key, result, passed,
+                           time.monotonic() - started))
+
+        self.assertEqual(sorted(event[:3] for event in events), [
+            ('ECC', False, False),
+            ('fast', 'f', True),
+            ('onboarding', 'Skipped, depends on failed ECC', False),
+            ('slow', 's', True)])
+        # Results arrive before the slowest diagnostic finished
+        self.assertEqual(events[-1][0], 'slow')
+        self.assertLess(events[0][3], 0.1)
+
+        expected = DiagnosticsReport(make_diagnostics())
+        expected.perform_diagnostics()
+        self.assertDictEqual(report, expected)
+
+    def test_iter_diagnostics_early_exit(self):
+        for kwargs in ({}, {'max_workers': 1}):
+            log = []
+            report = DiagnosticsReport(
+                [SleepDiagnostic(key, 0.02, log=log) for key in 'abcd'])
+            for event in report.iter_diagnostics(**kwargs):
+                break
+            # b may have started before the consumer stopped
+            self.assertLessEqual(len(log), 2)
+            time.sleep(0.05)
+            self.assertLessEqual(len(log), 2)
+            self.assertNotIn('d', report)
+
+    def test_iter_diagnostics_exception(self):
+        report = DiagnosticsReport([SleepDiagnostic('a', 0),
+                                    SleepDiagnostic('b', 0, error=ValueError('boom'))])
+        events = []
+        with self.assertRaises(ValueError):
+            for event in report.iter_diagnostics():
+                events.append(event)
+        self.assertEqual(len(events), 1)
+
+    def make_serialization_report(self, report_class):
+        ecc = Diagnostic('ECC', 'ecc')
+        onboarding = Diagnostic('OK', 'onboarding_key')
+        report = report_class([ecc, onboarding])
+        report.record_result(True, ecc)
+        report.record_failure('gateway_mfr failed', onboarding)
+        report['BALENA_DEVICE_UUID'] = 'abc'
+        return report
+
+    def test_to_dict_modes(self):
+        report = self.make_serialization_report(DiagnosticsReport)
+
+        self.assertDictEqual(report.to_dict(SERIALIZATION_LEGACY), report)
+        self.assertDictEqual(report.to_dict(SERIALIZATION_TERSE), {
+            DIAGNOSTICS_PASSED_KEY: False,
+            DIAGNOSTICS_ERRORS_KEY: ['OK'],
+            'ECC': True,
+            'OK': 'gateway_mfr failed',
+            'BALENA_DEVICE_UUID': 'abc'
+        })
+        self.assertDictEqual(report.to_dict(SERIALIZATION_FRIENDLY), {
+            DIAGNOSTICS_PASSED_KEY: False,
+            DIAGNOSTICS_ERRORS_KEY: ['onboarding_key'],
+            'ecc': True,
+            'onboarding_key': 'gateway_mfr failed',
+            'BALENA_DEVICE_UUID': 'abc'
+        })
+        self.assertEqual(json.loads(report.to_json()), report)
+        with self.assertRaises(ValueError):
+            report.to_dict('verbose')
+
+    def test_compact_report(self):
+        report = self.make_serialization_report(CompactDiagnosticsReport)
+        legacy = self.make_serialization_report(DiagnosticsReport)
+
+        # Stored once
+        self.assertDictEqual(dict(report), {
+            DIAGNOSTICS_PASSED_KEY: False,
+            DIAGNOSTICS_ERRORS_KEY: ['OK'],
+            'ECC': True,
+            'OK': 'gateway_mfr failed',
+            'BALENA_DEVICE_UUID': 'abc'
+        })
+        # Resolved under both names
+        self.assertEqual(report['ecc'], True)
+        self.assertEqual(report.get('onboarding_key'), 'gateway_mfr failed')
+        self.assertIn('onboarding_key', report)
+        self.assertEqual(report.get_report_subset(['ecc', 'OK']),
+                         {'ecc': True, 'OK': 'gateway_mfr failed'})
+        self.assertEqual(report.has_errors(['onboarding_key', 'ecc']),
+                         {'onboarding_key'})
+        self.assertEqual(report.get_missing_keys({'ecc', 'foo'}), {'foo'})
+        report['ecc'] = False
+        self.assertEqual(report['ECC'], False)
+        report['ecc'] = True
+
+        for mode in (SERIALIZATION_LEGACY, SERIALIZATION_FRIENDLY,
+                     SERIALIZATION_TERSE):
+            self.assertDictEqual(report.to_dict(mode), legacy.to_dict(mode))
+        self.assertLess(len(report.to_json(SERIALIZATION_TERSE)),
+                        len(legacy.to_json()))
+
+    def test_compact_report_update(self):
+        report = self.make_serialization_report(CompactDiagnosticsReport)
+        report.update({'ecc': False}, onboarding_key='retried')
+        self.assertEqual(report['ECC'], False)
+        self.assertEqual(report['OK'], 'retried')
+        self.assertNotIn('ecc', dict(report))
+
+        report |= {'ecc': True}
+        self.assertEqual(report['ecc'], True)
+        self.assertIsInstance(report, CompactDiagnosticsReport)
+
+        self.assertEqual(report.setdefault('ecc', 1), True)
+        del report['ecc']
+        self.assertEqual(report.setdefault('ecc', 1), 1)
+        self.assertIn('ecc', report)
+        self.assertEqual(dict(report)['ECC'], 1)
+        self.assertNotIn('ecc', dict(report))
+
+    def test_compact_report_from_legacy(self):
+        legacy = self.make_serialization_report(DiagnosticsReport)
+        report = CompactDiagnosticsReport(legacy.diagnostics, **legacy)
+
+        self.assertEqual(report[DIAGNOSTICS_ERRORS_KEY], ['OK'])
+        self.assertNotIn('onboarding_key', dict(report))
+        self.assertDictEqual(report.to_dict(), legacy)
+
+    def test_compact_report_perform_diagnostics(self):
+        diagnostics = [SleepDiagnostic('ECC', 0, result=False),
+                       SleepDiagnostic('OK', 0, depends_on=['ECC_friendly'])]
+        report = CompactDiagnosticsReport(diagnostics)
+        report.perform_diagnostics(max_workers=2)
+
+        self.assertEqual(report[DIAGNOSTICS_ERRORS_KEY], ['ECC', 'OK'])
+        self.assertEqual(report['OK_friendly'],
+                         'Skipped, depends on failed ECC_friendly')
+        report.perform_diagnostics()
+        self.assertEqual(report[DIAGNOSTICS_ERRORS_KEY], ['ECC', 'OK'])
+
+    def test_error_index(self):
+        errors = ErrorIndex(['ECC', 'OK'])
+        errors.append('ECC')
+        errors.append('PK')
+
+        self.assertEqual(errors, ['ECC', 'OK', 'PK'])
+        self.assertIn('OK', errors)
+        self.assertNotIn('BT', errors)
+        self.assertEqual(errors.get_count('ECC'), 2)
+        self.assertEqual(errors.get_count('BT'), 0)
+        self.assertEqual(json.dumps(errors), '["ECC", "OK", "PK"]')
+
+        errors.remove('OK')
+        self.assertNotIn('OK', errors)
+        errors[:] = ['PK', 'ECC', 'PK']
+        self.assertEqual(errors, ['PK', 'ECC'])
+        self.assertEqual(errors.get_count('ECC'), 2)
+
+        for copied in (copy.deepcopy(errors),
+                       pickle.loads(pickle.dumps(errors))):
+            self.assertEqual(copied, ['PK', 'ECC'])
+            self.assertEqual(copied.get_count('ECC'), 2)
+
+    def test_copy_and_pickle(self):
+        diagnostic = SleepDiagnostic('ECC', 0)
+        for cls in (DiagnosticsReport, CompactDiagnosticsReport):
+            report = cls([diagnostic])
+            report.record_failure('gateway_mfr failed', diagnostic)
+            report.subscribe(lambda event: None)
+
+            for copied in (copy.deepcopy(report),
+                           pickle.loads(pickle.dumps(report))):
+                self.assertIsInstance(copied, cls)
+                self.assertDictEqual(copied, report)
+                self.assertEqual(copied['ECC_friendly'], 'gateway_mfr failed')
+                self.assertEqual(copied.get_error_count('ECC'), 1)
+                self.assertEqual(copied._subscribers, [])
+                copied.perform_diagnostics()
+                self.assertTrue(copied.passed())
+            self.assertFalse(report.passed())
+
+        report = DiagnosticsReport(ECC=False)
+        self.assertDictEqual(apply_delta(report, {'changed': {'ECC': True}}),
+                             dict(report, ECC=True))
+
+    def test_append_error_dedup(self):
+        diagnostic = Diagnostic('key', 'friendly_name')
+        report = DiagnosticsReport()
+        report.record_failure('foo', diagnostic)
+        report.record_failure('bar', diagnostic)
+
+        self.assertEqual(report[DIAGNOSTICS_ERRORS_KEY],
+                         ['key', 'friendly_name'])
+        self.assertEqual(report.get_error_count('key'), 2)
+        self.assertEqual(json.loads(json.dumps(report))[DIAGNOSTICS_ERRORS_KEY],
+                         ['key', 'friendly_name'])
+
+    def test_errors_replaced_by_list(self):
+        report = DiagnosticsReport()
+        report[DIAGNOSTICS_ERRORS_KEY] = ['ECC']
+        self.assertEqual(report.has_errors(['ECC', 'BT']), {'ECC'})
+        report.append_error('ECC')
+        self.assertEqual(report.get_error_count('ECC'), 2)
+
+    def test_error_key_group(self):
+        group = ErrorKeyGroup(['ECC', 'onboarding_key', 'ECC'])
+        self.assertEqual(group.keys, ('ECC', 'onboarding_key'))
+
+        report = DiagnosticsReport.from_json_dict({'errors': ['onboarding_key']})
+        self.assertEqual(group.errors(report), {'onboarding_key'})
+        self.assertTrue(group.any(report))
+        self.assertFalse(ErrorKeyGroup(['BT']).any(report))
+
+        compact = CompactDiagnosticsReport([Diagnostic('OK', 'onboarding_key')])
+        compact.append_error('OK')
+        self.assertEqual(group.errors(compact), {'onboarding_key'})
+        self.assertTrue(group.any(compact))
+
+
+class TestDiagnosticAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_perform_diagnostics_async(self):
+        diagnostics = [AsyncSleepDiagnostic('miner', 0.1, result=1),
+                       SleepDiagnostic('ecc', 0.1, result=2),
+                       AsyncSleepDiagnostic('lte', 0.1, result=3)]
+        report = DiagnosticsReport(diagnostics)
+        started = time.monotonic()
+        await report.perform_diagnostics_async()
+
+        self.assertLess(time.monotonic() - started, 0.25)
+        self.assertTrue(report.passed())
+        self.assertEqual([report['miner'], report['ecc'], report['lte']],
+                         [1, 2, 3])
+
+    async def test_sync_perform_in_running_loop(self):
+        diagnostics = [AsyncSleepDiagnostic('a', 0, result='x'),
+                       AsyncSleepDiagnostic('b', 0, error=ValueError('b'))]
+        report = DiagnosticsReport(diagnostics[:1])
+        report.perform_diagnostics()
+        self.assertEqual(report['a'], 'x')
+
+        with self.assertRaises(ValueError):
+            DiagnosticsReport(diagnostics[1:]).perform_diagnostics()
+
+    async def test_max_concurrency(self):
+        diagnostics = [AsyncSleepDiagnostic(str(i), 0.05) for i in range(4)]
+        report = DiagnosticsReport(diagnostics)
+        started = time.monotonic()
+        await report.perform_diagnostics_async(max_concurrency=2)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertTrue(report.passed())
+
+    async def test_timeout(self):
+        slow_async = AsyncSleepDiagnostic('slow_async', 1)
+        slow_sync = SleepDiagnostic('slow_sync', 0.3)
+        diagnostics = [slow_async, slow_sync,
+                       AsyncSleepDiagnostic('after', 0, depends_on=['slow_async'])]
+        report = DiagnosticsReport(diagnostics)
+        await report.perform_diagnostics_async(timeout=0.1)
+
+        self.assertTrue(slow_async.cancelled)
+        self.assertFalse(report.passed())
+        self.assertEqual(report['slow_async'], 'Diagnostic timed out after 0.1s')
+        self.assertEqual(report['slow_sync'], 'Diagnostic timed out after 0.1s')
+        self.assertEqual(report['after'], 'Skipped, depends on failed slow_async')
+
+        # Late results of the abandoned thread are dropped
+        await asyncio.sleep(0.3)
+        self.assertEqual(report['slow_sync'], 'Diagnostic timed out after 0.1s')
+
+    async def test_exceptions(self):
+        diagnostics = [AsyncSleepDiagnostic('a', 0, error=ValueError('boom')),
+                       SleepDiagnostic('b', 0, error=ValueError('bang'))]
+        report = DiagnosticsReport(diagnostics)
+        await report.perform_diagnostics_async()
+
+        self.assertEqual(report['a'], 'boom')
+        self.assertEqual(report['b'], 'bang')
+        self.assertFalse(report.passed())
+
+    async def test_cancel(self):
+        log = []
+        slow = AsyncSleepDiagnostic('slow', 10, log=log)
+        diagnostics = [slow, AsyncSleepDiagnostic('after', 0, depends_on=['slow'],
+                                                  log=log)]
+        report = DiagnosticsReport(diagnostics)
+        task = asyncio.ensure_future(report.perform_diagnostics_async())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        self.assertTrue(slow.cancelled)
+        self.assertEqual(log, ['slow'])
+
+    async def test_timings(self):
+        diagnostics = [AsyncSleepDiagnostic('miner', 0.1),
+                       SleepDiagnostic('ecc', 0.05),
+                       AsyncSleepDiagnostic('lte', 1)]
+        report = DiagnosticsReport(diagnostics)
+        await report.perform_diagnostics_async(timeout=0.2, timings=True)
+
+        timings = report[DIAGNOSTICS_TIMINGS_KEY]['diagnostics']
+        self.assertEqual(timings['miner']['outcome'], 'passed')
+        self.assertGreaterEqual(timings['miner']['wall_time'], 0.1)
+        # Time spent awaiting isn't CPU time
+        self.assertLess(timings['miner']['cpu_time'], 0.05)
+        self.assertEqual(timings['ecc']['outcome'], 'passed')
+        self.assertIsNotNone(timings['ecc']['cpu_time'])
+        self.assertEqual(timings['lte']['outcome'], 'timeout')
+        self.assertEqual(report[DIAGNOSTICS_TIMINGS_KEY]['summary']['slowest'],
+                         ['lte', 'miner', 'ecc'])
+
+    async def test_aiter_diagnostics(self):
+        diagnostics = [AsyncSleepDiagnostic('slow', 0.1, result='s'),
+                       SleepDiagnostic('sync', 0, result='t'),
+                       AsyncSleepDiagnostic('fast', 0, error=ValueError('boom'))]
+        report = DiagnosticsReport(diagnostics)
+        events = [(diagnostic.key, result, passed) async for
+                  diagnostic, result, passed in report.aiter_diagnostics()]
+
+        self.assertEqual(sorted(events), [('fast', 'boom', False),
+                                          ('slow', 's', True),
+                                          ('sync', 't', True)])
+        self.assertEqual(events[-1], ('slow', 's', True))
+        self.assertFalse(report.passed())
+
+    async def test_aiter_diagnostics_close(self):
+        slow = AsyncSleepDiagnostic('slow', 10)
+        report = DiagnosticsReport([AsyncSleepDiagnostic('fast', 0), slow])
+        events = report.aiter_diagnostics()
+        event = await events.__anext__()
+        self.assertEqual(event.diagnostic.key, 'fast')
+        await events.aclose()
+        self.assertTrue(slow.cancelled)
@@ -0,0 +1,66 @@
+import json
+import unittest
+
+from hm_pyhelper.diagnostics import CompactDiagnosticsReport, Diagnostic, \
+    DiagnosticsReport
+from hm_pyhelper.diagnostics.binary import FIELD_KEYS, decode_report, \
+    encode_report
+from hm_pyhelper.diagnostics.diagnostics_report import SERIALIZATION_TERSE
+from hm_pyhelper.tests.benchmark_diagnostics_binary import make_report
+
+
+class TestDiagnosticsBinary(unittest.TestCase):
+
+    def test_round_trip(self):
+        report = make_report()
+        decoded = decode_report(encode_report(report))
+        self.assertIsInstance(decoded, DiagnosticsReport)
+        self.assertDictEqual(decoded, report)
+        self.assertEqual(decoded.get_error_count('ECC'), 1)
+
+    def test_smaller_than_json(self):
+        report = make_report()
+        self.assertLess(len(encode_report(report)),
+                        len(json.dumps(report)) / 2)
+
+    def test_values(self):
+        report = {
+            'diagnostics_passed': True,
+            'errors': [],
+            'custom key': 'custom value',
+            'unicode': 'hélium ✓',
+            'negative': -1583251,
+            'big': 2 ** 70,
+            'float': 0.125,
+            'none': None,
+            'nested': {'lora': [1, 'lte', {'ECC': False}]}
+        }
+        self.assertDictEqual(decode_report(encode_report(report)), report)
+
+    def test_encode_diagnostics_report(self):
+        diagnostic = Diagnostic('ECC', 'ecc')
+        report = CompactDiagnosticsReport([diagnostic])
+        report.record_failure('gateway_mfr failed', diagnostic)
+
+        self.assertDictEqual(decode_report(encode_report(report)),
+                             report.to_dict())
+        self.assertDictEqual(
+            decode_report(encode_report(report, SERIALIZATION_TERSE)),
+            report.to_dict(SERIALIZATION_TERSE))
+
+    def test_field_ids(self):
+        # Field ids are part of the format
+        self.assertEqual(encode_report({'errors': ['ECC']}),
+                         b'\xd1\x01\x08\x01\x02\x07\x01\x06\x08')
+        self.assertEqual(len(FIELD_KEYS), len(set(FIELD_KEYS)))
+
+    def test_invalid(self):
+        encoded = encode_report(make_report())
+        for data in (b'', b'{}', b'\xd1\x02\x08\x00', encoded[:-1],
+                     encoded + b'\x00', b'\xd1\x01\x07\x00',
+                     b'\xd1\x01\x08\x01\x7f\x00', b'\xd1\x01\x09'):
+            with self.assertRaises(ValueError):
+                decode_report(data)
+
+        with self.assertRaises(TypeError):
+            encode_report({'errors': [], 'set': {1}})
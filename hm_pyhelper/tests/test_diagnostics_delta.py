@@ -0,0 +1,120 @@
+import json
+import unittest
+
+from hm_pyhelper.diagnostics import Diagnostic, DiagnosticsReport
+from hm_pyhelper.diagnostics.delta import DeltaDecoder, DeltaEncoder, \
+    apply_delta, diff_reports
+from hm_pyhelper.diagnostics.diagnostics_report import SERIALIZATION_TERSE
+from hm_pyhelper.exceptions import DiagnosticsDeltaSequenceError
+
+OLD_REPORT = {
+    'diagnostics_passed': False,
+    'errors': ['ECC', 'OK'],
+    'ECC': 'gateway_mfr test finished with error',
+    'OK': 'gateway_mfr exited with a non-zero status',
+    'serial_number': '0000000021aabbcc',
+    'MH': 1000,
+    'LTE': False
+}
+
+NEW_REPORT = {
+    'diagnostics_passed': False,
+    'errors': ['OK', 'BT'],
+    'ECC': True,
+    'OK': 'gateway_mfr exited with a non-zero status',
+    'serial_number': '0000000021aabbcc',
+    'MH': 1010,
+    'BT': False
+}
+
+
+class TestDiagnosticsDelta(unittest.TestCase):
+
+    def test_diff_reports(self):
+        delta = diff_reports(OLD_REPORT, NEW_REPORT)
+        self.assertDictEqual(delta, {
+            'changed': {'ECC': True, 'MH': 1010},
+            'added': {'BT': False},
+            'removed': ['LTE'],
+            'errors_added': ['BT'],
+            'errors_removed': ['ECC']
+        })
+        self.assertDictEqual(apply_delta(OLD_REPORT, delta), NEW_REPORT)
+        self.assertEqual(diff_reports(NEW_REPORT, NEW_REPORT), {})
+        self.assertLess(len(json.dumps(delta)), len(json.dumps(NEW_REPORT)))
+
+    def test_diff_reports_reordered_errors(self):
+        new_report = dict(OLD_REPORT, errors=['OK', 'ECC'])
+        delta = diff_reports(OLD_REPORT, new_report)
+        self.assertDictEqual(delta, {'changed': {'errors': ['OK', 'ECC']}})
+        self.assertDictEqual(apply_delta(OLD_REPORT, delta), new_report)
+
+    def test_apply_delta_copies(self):
+        delta = diff_reports(OLD_REPORT, NEW_REPORT)
+        result = apply_delta(OLD_REPORT, delta)
+        result['errors'].append('PK')
+        self.assertEqual(OLD_REPORT['errors'], ['ECC', 'OK'])
+
+    def test_encoder_decoder(self):
+        encoder = DeltaEncoder(full_snapshot_interval=3)
+        decoder = DeltaDecoder()
+        reports = [OLD_REPORT, NEW_REPORT, OLD_REPORT, NEW_REPORT, NEW_REPORT]
+        messages = [encoder.encode(report) for report in reports]
+
+        self.assertEqual([message['seq'] for message in messages],
+                         [1, 2, 3, 4, 5])
+        self.assertEqual(['snapshot' in message for message in messages],
+                         [True, False, False, True, False])
+        self.assertEqual(messages[4]['delta'], {})
+        for report, message in zip(reports, messages):
+            self.assertDictEqual(decoder.decode(message), report)
+
+    def test_encoder_reset(self):
+        encoder = DeltaEncoder()
+        encoder.encode(OLD_REPORT)
+        encoder.reset()
+        self.assertIn('snapshot', encoder.encode(NEW_REPORT))
+
+    def test_decoder_gap(self):
+        encoder = DeltaEncoder(full_snapshot_interval=3)
+        decoder = DeltaDecoder()
+        messages = [encoder.encode(report) for report in
+                    [OLD_REPORT, NEW_REPORT, OLD_REPORT, NEW_REPORT]]
+
+        decoder.decode(messages[0])
+        with self.assertRaises(DiagnosticsDeltaSequenceError):
+            decoder.decode(messages[2])
+        # Recovers with the next snapshot
+        self.assertDictEqual(decoder.decode(messages[3]), NEW_REPORT)
+
+        with self.assertRaises(DiagnosticsDeltaSequenceError):
+            DeltaDecoder().decode(messages[1])
+
+    def test_encode_diagnostics_report(self):
+        diagnostic = Diagnostic('ECC', 'ecc')
+        report = DiagnosticsReport([diagnostic])
+        report.record_failure('gateway_mfr failed', diagnostic)
+        encoder = DeltaEncoder(mode=SERIALIZATION_TERSE)
+
+        message = encoder.encode(report)
+        self.assertDictEqual(message['snapshot'], {
+            'diagnostics_passed': False,
+            'errors': ['ECC'],
+            'ECC': 'gateway_mfr failed'
+        })
+
+        report.record_result(True, diagnostic)
+        report['errors'].clear()
+        message = encoder.encode(report)
+        self.assertDictEqual(message['delta'], {
+            'changed': {'ECC': True},
+            'errors_removed': ['ECC']
+        })
+
+    def test_for_variant(self):
+        self.assertEqual(
+            DeltaEncoder.for_variant('nebra-outdoor1').full_snapshot_interval,
+            DeltaEncoder().full_snapshot_interval)
+        encoder = DeltaEncoder.for_variant('nebra-indoor1')
+        self.assertIn('snapshot', encoder.encode(OLD_REPORT))
+        self.assertIn('snapshot', encoder.encode(NEW_REPORT))
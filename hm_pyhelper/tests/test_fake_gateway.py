@@ -0,0 +1,77 @@
+import time
+import unittest
+
+import grpc
+
+from hm_pyhelper.gateway_grpc.client import GatewayClient
+from hm_pyhelper.tests.benchmark_gateway_grpc import percentile, \
+    run_benchmarks
+from hm_pyhelper.tests.fake_gateway import FakeGatewayServer
+
+PUBKEY_DECODED = "14RdqcZC2rbdTBwNaTsj5EVWYaM7BKGJ44ycq6wWJy9Hg7RKCii"
+
+
+class TestFakeGateway(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeGatewayServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_api(self):
+        with GatewayClient(self.server.address) as client:
+            self.assertEqual(client.get_pubkey(), PUBKEY_DECODED)
+            self.assertEqual(client.get_region(), 'US915')
+            self.assertTrue(client.get_router()['connected'])
+            result = next(client.create_add_gateway_txns([
+                ('14QjC3A5DEH2uFwhDxyBHdFir7YWGG23Fic1wGvkCr6qrWC7Q47',
+                 '13Zni1he7KY9pUmkXMhEhTwfUpL9AcEV1m2UbbvFsrU9QPTMgE3')
+            ]))
+            self.assertIsNone(result.error)
+
+        self.assertEqual(self.server.servicer.calls['pubkey'], 1)
+        self.assertEqual(self.server.servicer.calls['add_gateway'], 1)
+
+    def test_latency(self):
+        self.server.servicer.latency = 0.05
+        with GatewayClient(self.server.address) as client:
+            start = time.monotonic()
+            client.get_region()
+            self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_error_injection(self):
+        self.server.servicer.fail_next(2)
+        with GatewayClient(self.server.address) as client:
+            for _ in range(2):
+                with self.assertRaises(grpc.RpcError) as context:
+                    client.get_pubkey()
+                self.assertEqual(context.exception.code(),
+                                 grpc.StatusCode.UNAVAILABLE)
+            self.assertEqual(client.get_pubkey(), PUBKEY_DECODED)
+
+            self.server.servicer.error_rate = 1.0
+            with self.assertRaises(grpc.RpcError):
+                client.get_region()
+
+        self.assertEqual(self.server.servicer.errors['pubkey'], 2)
+
+    def test_restart(self):
+        port = self.server.port
+        with GatewayClient(self.server.address) as client:
+            client.get_pubkey()
+            self.server.restart()
+            self.assertEqual(self.server.port, port)
+            self.assertEqual(client.get_pubkey(), PUBKEY_DECODED)
+
+    def test_benchmark(self):
+        results = run_benchmarks(calls=20, concurrency=4)
+        self.assertEqual([result['calls'] for result in results], [20] * 3)
+        for result in results:
+            self.assertEqual(result['errors'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_percentile(self):
+        self.assertEqual(percentile([], 0.5), 0.0)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
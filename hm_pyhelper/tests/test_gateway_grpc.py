@@ -1,7 +1,12 @@
+import asyncio
+import threading
+import time
 import unittest
+import base58
 import grpc
 from concurrent import futures
 from hm_pyhelper.gateway_grpc.client import GatewayClient
+from hm_pyhelper.gateway_grpc.exceptions import MinerMalformedAddGatewayTxn
 
 from hm_pyhelper.protos import local_pb2
 from hm_pyhelper.protos import local_pb2_grpc
@@ -15,6 +20,17 @@ class TestData:
     pubkey_decoded = "14RdqcZC2rbdTBwNaTsj5EVWYaM7BKGJ44ycq6wWJy9Hg7RKCii"
     region_enum = 0
     region_name = "US915"
+    router_uri = "http://mainnet-router.helium.io:8080"
+    router_states = [
+        (router_uri, False),
+        (router_uri, False),
+        (router_uri, True),
+        (router_uri, True),
+        (router_uri, True),
+        (router_uri, False)
+    ]
+    owner_address = "14QjC3A5DEH2uFwhDxyBHdFir7YWGG23Fic1wGvkCr6qrWC7Q47"
+    payer_address = "13Zni1he7KY9pUmkXMhEhTwfUpL9AcEV1m2UbbvFsrU9QPTMgE3"
     expected_summary = {
         'region': region_name,
         'key': pubkey_decoded
@@ -31,6 +47,33 @@ class MockServicer(local_pb2_grpc.apiServicer):
     def pubkey(self, request, context):
         return local_pb2.pubkey_res(address=TestData.pubkey_encoded)
 
+    def __init__(self):
+        self.router_calls = 0
+        self.router_delay = 0
+        self.add_gateway_lock = threading.Lock()
+        self.add_gateway_in_flight = 0
+        self.add_gateway_max_in_flight = 0
+
+    def add_gateway(self, request, context):
+        with self.add_gateway_lock:
+            self.add_gateway_in_flight += 1
+            self.add_gateway_max_in_flight = max(self.add_gateway_max_in_flight,
+                                                 self.add_gateway_in_flight)
+        time.sleep(0.01)
+        with self.add_gateway_lock:
+            self.add_gateway_in_flight -= 1
+        if request.owner == request.payer:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, 'owner is payer')
+        return local_pb2.add_gateway_res(
+            add_gateway_txn=request.owner + request.payer + bytes([request.staking_mode]))
+
+    def router(self, request, context):
+        index = min(self.router_calls, len(TestData.router_states) - 1)
+        self.router_calls += 1
+        time.sleep(self.router_delay)
+        uri, connected = TestData.router_states[index]
+        return local_pb2.router_res(uri=uri, connected=connected)
+
     def config(self, request, context):
         result = local_pb2.config_res()
         for key in request.keys:
@@ -47,7 +90,8 @@ class TestGatewayGRPCClient(unittest.TestCase):
     # our testing methods, real service exposes us to random failures
     def setUp(self):
         self.mock_server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-        local_pb2_grpc.add_apiServicer_to_server(MockServicer(), self.mock_server)
+        self.servicer = MockServicer()
+        local_pb2_grpc.add_apiServicer_to_server(self.servicer, self.mock_server)
         self.mock_server.add_insecure_port(f'[::]:{TestData.server_port}')
         self.mock_server.start()
 
@@ -74,3 +118,116 @@ class TestGatewayGRPCClient(unittest.TestCase):
         with self.assertRaises(grpc.RpcError):
             with GatewayClient('localhost:1234') as client:
                 client.get_pubkey()
+
+    def test_get_router(self):
+        with GatewayClient(f'localhost:{TestData.server_port}') as client:
+            self.assertEqual(client.get_router(), {
+                'uri': TestData.router_uri,
+                'connected': False
+            })
+
+    def test_watch_router_yields_transitions(self):
+        with GatewayClient(f'localhost:{TestData.server_port}') as client:
+            watcher = client.watch_router(min_interval=0.001,
+                                          max_interval=0.004)
+            transitions = []
+            for state in watcher:
+                transitions.append(state['connected'])
+                if len(transitions) == 3:
+                    watcher.stop()
+
+        self.assertEqual(transitions, [False, True, False])
+        self.assertGreaterEqual(self.servicer.router_calls,
+                                len(TestData.router_states))
+
+    def test_watch_router_async(self):
+        async def collect(watcher):
+            transitions = []
+            async for state in watcher:
+                transitions.append(state['connected'])
+                if len(transitions) == 3:
+                    watcher.stop()
+            return transitions
+
+        with GatewayClient(f'localhost:{TestData.server_port}') as client:
+            watcher = client.watch_router(min_interval=0.001,
+                                          max_interval=0.004)
+            transitions = asyncio.run(collect(watcher))
+
+        self.assertEqual(transitions, [False, True, False])
+
+    def test_watch_router_async_stop(self):
+        async def first_state(watcher):
+            async for state in watcher:
+                watcher.stop()
+                started = time.monotonic()
+            return state, time.monotonic() - started
+
+        with GatewayClient(f'localhost:{TestData.server_port}') as client:
+            watcher = client.watch_router(min_interval=10, max_interval=10)
+            state, elapsed = asyncio.run(first_state(watcher))
+
+        self.assertFalse(state['connected'])
+        self.assertLess(elapsed, 1)
+
+    def test_watch_router_timeout(self):
+        self.servicer.router_delay = 1
+        try:
+            with GatewayClient(f'localhost:{TestData.server_port}') as client:
+                watcher = client.watch_router(timeout=0.05)
+                started = time.monotonic()
+                state = watcher.poll()
+                elapsed = time.monotonic() - started
+        finally:
+            self.servicer.router_delay = 0
+
+        self.assertEqual(state, {'uri': None, 'connected': False})
+        self.assertLess(elapsed, 0.5)
+
+    def test_watch_router_unreachable(self):
+        with GatewayClient('localhost:1234') as client:
+            watcher = client.watch_router(min_interval=0.001)
+            self.assertEqual(next(iter(watcher)),
+                             {'uri': None, 'connected': False})
+
+    def test_watch_router_backoff(self):
+        watcher = GatewayClient('localhost:1234').watch_router(
+            min_interval=1, max_interval=5, backoff=2)
+        self.assertEqual(watcher._next_interval(1, False), 2)
+        self.assertEqual(watcher._next_interval(4, False), 5)
+        self.assertEqual(watcher._next_interval(5, True), 1)
+
+        with self.assertRaises(ValueError):
+            GatewayClient('localhost:1234').watch_router(min_interval=0)
+
+    def test_create_add_gateway_txns(self):
+        owner = TestData.owner_address
+        payer = TestData.payer_address
+        txn_requests = [(owner, payer)] * 6 + [
+            (owner, owner),
+            ('not-an-address', payer),
+            (owner, payer, 1)
+        ]
+        with GatewayClient(f'localhost:{TestData.server_port}') as client:
+            results = list(client.create_add_gateway_txns(txn_requests,
+                                                          max_in_flight=3))
+
+        owner_bytes = base58.b58decode_check(owner)[1:]
+        payer_bytes = base58.b58decode_check(payer)[1:]
+        self.assertEqual(len(results), len(txn_requests))
+        for result in results[:6]:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.txn, owner_bytes + payer_bytes + b'\x02')
+        self.assertIsInstance(results[6].error, grpc.RpcError)
+        self.assertEqual(results[6].error.code(),
+                         grpc.StatusCode.INVALID_ARGUMENT)
+        self.assertIsInstance(results[7].error, MinerMalformedAddGatewayTxn)
+        self.assertEqual(results[8].staking_mode, 1)
+        self.assertEqual(results[8].txn, owner_bytes + payer_bytes + b'\x01')
+        self.assertLessEqual(self.servicer.add_gateway_max_in_flight, 3)
+        self.assertGreater(self.servicer.add_gateway_max_in_flight, 1)
+
+    def test_create_add_gateway_txns_invalid_limit(self):
+        with GatewayClient(f'localhost:{TestData.server_port}') as client:
+            with self.assertRaises(ValueError):
+                list(client.create_add_gateway_txns([], max_in_flight=0))
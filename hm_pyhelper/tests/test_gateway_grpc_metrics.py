@@ -0,0 +1,81 @@
+import unittest
+
+import grpc
+
+from hm_pyhelper.gateway_grpc.client import GatewayClient
+from hm_pyhelper.gateway_grpc.metrics import MetricsInterceptor, \
+    MethodMetrics
+from hm_pyhelper.protos import local_pb2
+from hm_pyhelper.tests.fake_gateway import FakeGatewayServer
+
+PUBKEY_METHOD = '/helium.local.api/pubkey'
+
+
+class TestGatewayGRPCMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeGatewayServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_metrics_disabled_by_default(self):
+        with GatewayClient(self.server.address) as client:
+            client.get_pubkey()
+            self.assertIsNone(client.metrics)
+
+    def test_records_calls(self):
+        with GatewayClient(self.server.address, metrics=True) as client:
+            client.get_pubkey()
+            client.get_pubkey()
+            client.get_region()
+            # direct stub users are covered as well
+            client.api_stub().router(local_pb2.router_req())
+
+            self.assertEqual(set(client.metrics.methods()), {
+                PUBKEY_METHOD,
+                '/helium.local.api/region',
+                '/helium.local.api/router'
+            })
+            pubkey = client.metrics.get_metrics('pubkey')
+
+        self.assertEqual(pubkey, client.metrics.get_metrics()[PUBKEY_METHOD])
+        self.assertEqual(pubkey['count'], 2)
+        self.assertEqual(pubkey['errors'], 0)
+        self.assertEqual(pubkey['status_codes'], {'OK': 2})
+        self.assertEqual(pubkey['request_bytes'], 0)
+        self.assertEqual(pubkey['response_bytes'], 2 * 35)
+        self.assertEqual(sum(pubkey['latency']['buckets'].values()), 2)
+        self.assertLessEqual(pubkey['latency']['p50'], pubkey['latency']['max'])
+
+    def test_records_errors_and_futures(self):
+        self.server.servicer.fail_next(1)
+        interceptor = MetricsInterceptor()
+        with GatewayClient(self.server.address, metrics=interceptor) as client:
+            self.assertIs(client.metrics, interceptor)
+            with self.assertRaises(grpc.RpcError):
+                client.get_pubkey()
+            client.stub.pubkey.future(local_pb2.pubkey_req()).result()
+
+        pubkey = interceptor.get_metrics(PUBKEY_METHOD)
+        self.assertEqual(pubkey['count'], 2)
+        self.assertEqual(pubkey['errors'], 1)
+        self.assertEqual(pubkey['status_codes'], {'OK': 1, 'UNAVAILABLE': 1})
+
+        interceptor.reset()
+        self.assertIsNone(interceptor.get_metrics('pubkey'))
+        self.assertEqual(interceptor.get_metrics(), {})
+
+    def test_latency_histogram(self):
+        metrics = MethodMetrics((0.01, 0.1))
+        self.assertEqual(metrics.latency_quantile(0.5), 0.0)
+        for latency in (0.005, 0.005, 0.05, 0.5):
+            metrics.record(latency, grpc.StatusCode.OK, 1, 2)
+
+        self.assertEqual(metrics.bucket_counts, [2, 1, 1])
+        self.assertEqual(metrics.latency_quantile(0.5), 0.01)
+        self.assertEqual(metrics.latency_quantile(0.75), 0.1)
+        self.assertEqual(metrics.latency_quantile(0.99), 0.5)
+        self.assertEqual(metrics.to_dict()['latency']['buckets'], {
+            0.01: 2, 0.1: 1, float('inf'): 1
+        })
@@ -0,0 +1,111 @@
+import threading
+import unittest
+
+import mock
+import requests
+
+from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError
+from hm_pyhelper.miner_json_rpc.height_follower import HeightFollower, \
+    get_height_follower
+from hm_pyhelper.tests.fake_clock import FakeClock
+
+
+class TestHeightFollower(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = mock.Mock()
+        self.follower = HeightFollower(self.client, min_interval=1,
+                                       max_interval=8, stall_threshold=60,
+                                       smoothing=1.0, clock=self.clock)
+        self.events = []
+        self.follower._subscribers.append(self.events.append)
+
+    def poll(self, height, at):
+        self.clock.now = at
+        if isinstance(height, Exception):
+            self.client.get_height.side_effect = height
+        else:
+            self.client.get_height.side_effect = None
+            self.client.get_height.return_value = {'epoch': 1, 'height': height}
+        return self.follower.poll_once()
+
+    def test_notifies_on_change_only(self):
+        self.poll(100, 0)
+        self.poll(100, 1)
+        self.poll(101, 2)
+
+        self.assertEqual([(e.height, e.previous_height) for e in self.events],
+                         [(100, None), (101, 100)])
+        self.assertEqual(self.follower.height, 101)
+
+    def test_adaptive_interval(self):
+        self.assertEqual(self.poll(100, 0), 2)
+        # catching up
+        self.assertEqual(self.poll(150, 1), 1)
+        self.assertEqual(self.poll(200, 2), 1)
+        # at head
+        self.assertEqual(self.poll(201, 3), 2)
+        self.assertEqual(self.poll(201, 5), 4)
+        self.assertEqual(self.poll(201, 9), 8)
+        self.assertEqual(self.poll(201, 17), 8)
+
+    def test_rate_and_eta(self):
+        self.assertIsNone(self.follower.eta(1000))
+        self.poll(100, 0)
+        self.assertIsNone(self.follower.eta(1000))
+        self.poll(150, 10)
+
+        self.assertEqual(self.follower.blocks_per_second, 5)
+        self.assertEqual(self.events[-1].blocks_per_second, 5)
+        self.assertEqual(self.follower.eta(200), 10)
+        self.assertEqual(self.follower.eta(100), 0)
+
+    def test_stall(self):
+        self.poll(100, 0)
+        self.poll(100, 30)
+        self.poll(MinerConnectionError(), 60)
+        self.poll(100, 70)
+        self.poll(101, 80)
+
+        self.assertEqual([(e.height, e.stalled) for e in self.events],
+                         [(100, False), (100, True), (101, False)])
+        self.assertEqual(self.events[1].seconds_since_change, 60)
+
+    def test_unexpected_errors(self):
+        self.poll(100, 0)
+        self.poll(requests.exceptions.HTTPError('500 Server Error'), 30)
+        self.client.get_height.side_effect = None
+        self.client.get_height.return_value = {'error': 'malformed'}
+        self.clock.now = 60
+        self.follower.poll_once()
+
+        self.assertEqual([(e.height, e.stalled) for e in self.events],
+                         [(100, False), (100, True)])
+
+    def test_subscriber_errors_are_contained(self):
+        self.follower._subscribers.insert(0, mock.Mock(side_effect=Exception))
+        self.poll(100, 0)
+        self.assertEqual(len(self.events), 1)
+
+    def test_polling_thread(self):
+        notified = threading.Event()
+        client = mock.Mock()
+        client.get_height.return_value = {'height': 5}
+        follower = HeightFollower(client, min_interval=0.01, max_interval=0.01)
+
+        unsubscribe = follower.subscribe(lambda event: notified.set())
+        self.assertTrue(notified.wait(5))
+        unsubscribe()
+        self.assertIsNone(follower._thread)
+
+    def test_invalid_intervals(self):
+        with self.assertRaises(ValueError):
+            HeightFollower(self.client, min_interval=2, max_interval=1)
+
+    def test_shared_follower(self):
+        url = 'http://miner-under-test:4467'
+        follower = get_height_follower(url, max_interval=10)
+        self.assertIs(get_height_follower(url), follower)
+        self.assertEqual(follower.client.url, url)
+        self.assertIsNot(get_height_follower('http://other:4467'), follower)
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+import unittest
+
+import responses
+
+from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError
+from hm_pyhelper.miner_json_rpc.fleet import FleetClient
+
+URLS = ['http://miner-%d:4467' % i for i in range(8)]
+DEAD_URL = 'http://dead-miner:4467'
+
+
+class TestFleetClient(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delays = {}
+
+    def callback(self, request):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delays.get(request.url.rstrip('/'), 0.01))
+        with self.lock:
+            self.in_flight -= 1
+
+        req_body = json.loads(request.body)
+        height = int(request.url.split('-')[1].split(':')[0])
+        if isinstance(req_body, list):
+            body = [{'id': req['id'], 'result': {'method': req['method']}}
+                    for req in req_body]
+        else:
+            body = {'id': req_body['id'], 'result': {'height': height}}
+        return 200, {}, json.dumps(body)
+
+    def add_responses(self):
+        for url in URLS:
+            responses.add_callback(responses.POST, url, callback=self.callback)
+
+    @responses.activate
+    def test_run(self):
+        self.add_responses()
+        fleet = FleetClient(URLS + [DEAD_URL], max_workers=3)
+        sweep = fleet.run('info_height')
+        results = list(sweep)
+
+        self.assertEqual(len(results), 9)
+        by_url = {result.url: result for result in results}
+        for i, url in enumerate(URLS):
+            self.assertEqual(by_url[url].result, {'height': i})
+            self.assertIsNone(by_url[url].error)
+        self.assertIsInstance(by_url[DEAD_URL].error, MinerConnectionError)
+        self.assertLessEqual(self.max_in_flight, 3)
+
+        summary = sweep.summary()
+        self.assertEqual(summary['total'], 9)
+        self.assertEqual(summary['completed'], 9)
+        self.assertEqual(summary['succeeded'], 8)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(summary['errors_by_type'], {'MinerConnectionError': 1})
+        self.assertIn(DEAD_URL, summary['failures'])
+
+    @responses.activate
+    def test_run_batch_ordered_results(self):
+        self.add_responses()
+        fleet = FleetClient(URLS)
+        calls = (method for method in ['info_height', 'info_region'])
+        results = fleet.run_batch(calls).results()
+
+        self.assertEqual([result.url for result in results], URLS)
+        for result in results:
+            self.assertEqual(result.result, [{'method': 'info_height'},
+                                             {'method': 'info_region'}])
+
+    @responses.activate
+    def test_streaming_and_early_stop(self):
+        self.add_responses()
+        self.delays[URLS[1]] = 0.1
+        sweep = FleetClient(URLS, max_workers=1).run('info_height')
+        results = iter(sweep)
+        first = next(results)
+        results.close()
+        self.assertIsNone(first.error)
+        self.assertEqual(sweep.summary()['completed'], 1)
+        # let the call in flight finish within this test
+        sweep.results()
+
+    @responses.activate
+    def test_sweep_runs_once(self):
+        self.add_responses()
+        urls = URLS[:2] + URLS[:1]
+        sweep = FleetClient(urls).run('info_height')
+        self.assertEqual(len(list(sweep)), 3)
+        self.assertEqual(len(list(sweep)), 3)
+        results = sweep.results()
+
+        self.assertEqual([result.url for result in results], urls)
+        self.assertEqual([result.result for result in results],
+                         [{'height': 0}, {'height': 1}, {'height': 0}])
+        self.assertEqual(len(responses.calls), 3)
+        summary = sweep.summary()
+        self.assertEqual(summary['total'], 3)
+        self.assertEqual(summary['completed'], 3)
+        self.assertEqual(summary['succeeded'], 3)
+
+    @responses.activate
+    def test_resume_after_early_stop(self):
+        self.add_responses()
+        sweep = FleetClient(URLS, max_workers=1).run('info_height')
+        first = next(iter(sweep))
+        results = sweep.results()
+
+        self.assertIn(first, results)
+        self.assertEqual([result.url for result in results], URLS)
+        self.assertEqual(sweep.summary()['completed'], len(URLS))
+
+    @responses.activate
+    def test_early_stop_doesnt_block(self):
+        self.add_responses()
+        urls = URLS[:4]
+        for url in urls[1:]:
+            self.delays[url] = 0.3
+        sweep = FleetClient(urls).run('info_height')
+
+        started = time.monotonic()
+        for result in sweep:
+            break
+        self.assertEqual(result.url, urls[0])
+        self.assertLess(time.monotonic() - started, 0.25)
+
+        # calls in flight when stopping are not made again
+        results = sweep.results()
+        self.assertEqual([result.url for result in results], urls)
+        self.assertEqual(sorted(call.request.url.rstrip('/')
+                                for call in responses.calls), urls)
+
+    def test_empty_fleet(self):
+        sweep = FleetClient([]).run('info_height')
+        self.assertEqual(list(sweep), [])
+        self.assertEqual(sweep.summary()['total'], 0)
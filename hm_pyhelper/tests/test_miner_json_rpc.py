@@ -1,3 +1,4 @@
+import json
 import unittest
 import mock
 import responses
@@ -6,8 +7,11 @@ from hm_pyhelper.miner_json_rpc import MinerClient
 from hm_pyhelper.miner_json_rpc.exceptions import MinerRegionUnset
 from hm_pyhelper.miner_json_rpc.exceptions import MinerMalformedURL
 from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError
+from hm_pyhelper.miner_json_rpc.exceptions import MinerFailedFetchData
+from hm_pyhelper.miner_json_rpc.exceptions import MinerMalformedAddGatewayTxn
 
 BASE_URL = 'http://helium-miner:4467'
+TIMEOUT = (5.0, 30.0)
 
 
 @responses.activate
@@ -66,7 +70,7 @@ class TestMinerJSONRPC(unittest.TestCase):
         self.assertTrue(exception_raised)
         self.assertIsInstance(exception_type, MinerConnectionError)
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(
                     {"result": {'epoch': 25612, 'height': 993640}, "id": 1},
                     200))
@@ -74,11 +78,12 @@ class TestMinerJSONRPC(unittest.TestCase):
         client = MinerClient()
         result = client.get_height()
         mock_json_rpc_client.assert_called_with(
-            BASE_URL, json=return_payload_with_method('info_height'))
+            BASE_URL, json=return_payload_with_method('info_height'),
+            timeout=TIMEOUT)
 
         self.assertEqual(result, {'epoch': 25612, 'height': 993640})
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(
                     {"result": {'region': None}, "id": 1}, 200))
     def test_get_region_not_asserted(self, mock_json_rpc_client):
@@ -95,14 +100,15 @@ class TestMinerJSONRPC(unittest.TestCase):
         self.assertTrue(exception_raised)
         self.assertIsInstance(exception_type, MinerRegionUnset)
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(
                     {"result": {'region': "EU868"}, "id": 1}, 200))
     def test_get_region(self, mock_json_rpc_client):
         client = MinerClient()
         result = client.get_region()
         mock_json_rpc_client.assert_called_with(
-            BASE_URL, json=return_payload_with_method('info_region')
+            BASE_URL, json=return_payload_with_method('info_region'),
+            timeout=TIMEOUT
         )
         self.assertEqual(result, {'region': 'EU868'})
 
@@ -127,19 +133,20 @@ class TestMinerJSONRPC(unittest.TestCase):
 
     result_json = {"result": summary, "id": 1}
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(result_json, 200))
     def test_get_summary(self, mock_json_rpc_client):
         client = MinerClient()
         result = client.get_summary()
         mock_json_rpc_client.assert_called_with(
-            BASE_URL, json=return_payload_with_method('info_summary')
+            BASE_URL, json=return_payload_with_method('info_summary'),
+            timeout=TIMEOUT
         )
         self.assertEqual(result, self.summary)
 
     peer_addr = '/p2p/11jr2kMp1bZvSC6pd3XkNvs9Q43qCgEzxRwV6vpuqXanC5UcLEs'
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(
                     {"result": {'peer_addr': peer_addr}, "id": 1}, 200))
     def test_get_peer_addr(self, mock_json_rpc_client):
@@ -147,11 +154,12 @@ class TestMinerJSONRPC(unittest.TestCase):
         client = MinerClient()
         result = client.get_peer_addr()
         mock_json_rpc_client.assert_called_with(
-            BASE_URL, json=return_payload_with_method('peer_addr')
+            BASE_URL, json=return_payload_with_method('peer_addr'),
+            timeout=TIMEOUT
         )
         self.assertEqual(result, {'peer_addr': self.peer_addr})
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(
                     {"result": [], "id": 1},
                     200))
@@ -162,7 +170,8 @@ class TestMinerJSONRPC(unittest.TestCase):
         payload = return_payload_with_method('peer_book')
         payload["params"] = {'addr': 'self'}
         mock_json_rpc_client.assert_called_with(
-            BASE_URL, json=payload
+            BASE_URL, json=payload,
+            timeout=TIMEOUT
         )
         self.assertEqual(result, [])
 
@@ -188,14 +197,15 @@ class TestMinerJSONRPC(unittest.TestCase):
 
     result_response = {"result": data_response, "id": 1}
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(
                     result_response, 200))
     def test_get_firmware_version(self, mock_json_rpc_client):
         client = MinerClient()
         result = client.get_firmware_version()
         mock_json_rpc_client.assert_called_with(
-            BASE_URL, json=return_payload_with_method('info_summary')
+            BASE_URL, json=return_payload_with_method('info_summary'),
+            timeout=TIMEOUT
         )
         self.assertEqual(result, self.firmware_version)
 
@@ -211,7 +221,7 @@ class TestMinerJSONRPC(unittest.TestCase):
         "id": "1"
     }
 
-    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.post',
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
                 return_value=response_result(
                     add_gateway_response, 200))
     def test_create_add_gateway_txn(self, mock_json_rpc_client):
@@ -241,3 +251,97 @@ class TestMinerJSONRPC(unittest.TestCase):
         }
 
         self.assertDictEqual(actual_result, expected_result)
+
+    @mock.patch('hm_pyhelper.miner_json_rpc.client.requests.Session.post',
+                return_value=response_result(
+                    add_gateway_response, 200))
+    def test_create_add_gateway_txn_unexpected_gateway(self, mock_json_rpc_client):
+        client = MinerClient()
+        with self.assertRaises(MinerMalformedAddGatewayTxn):
+            client.create_add_gateway_txn(
+                '14QjC3A5DEH2uFwhDxyBHdFir7YWGG23Fic1wGvkCr6qrWC7Q47',
+                '13Zni1he7KY9pUmkXMhEhTwfUpL9AcEV1m2UbbvFsrU9QPTMgE3',
+                '14QjC3A5DEH2uFwhDxyBHdFir7YWGG23Fic1wGvkCr6qrWC7Q47')
+
+    @responses.activate
+    def test_session_reused(self):
+        responses.add(responses.POST, BASE_URL,
+                      json={"result": {'height': 1}, "id": 1})
+        with MinerClient() as client:
+            session = client.session
+            client.get_height()
+            client.get_height()
+            self.assertIs(client.session, session)
+            adapter = session.get_adapter(BASE_URL)
+            self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_close(self):
+        client = MinerClient(pool_maxsize=1)
+        with mock.patch.object(client.session, 'close') as mock_close:
+            client.close()
+        mock_close.assert_called_once()
+
+    @staticmethod
+    def batch_callback(request):
+        results = {
+            'info_height': {'epoch': 25612, 'height': 993640},
+            'info_region': {'region': 'EU868'},
+            'peer_book': []
+        }
+        responses_body = []
+        # reply out of order to check demultiplexing
+        for req_body in reversed(json.loads(request.body)):
+            response = {'jsonrpc': '2.0', 'id': req_body['id']}
+            if req_body['method'] in results:
+                response['result'] = results[req_body['method']]
+            else:
+                response['error'] = {'code': -32601,
+                                     'message': 'Method not found'}
+            responses_body.append(response)
+        return 200, {}, json.dumps(responses_body)
+
+    @responses.activate
+    def test_batch(self):
+        responses.add_callback(responses.POST, BASE_URL,
+                               callback=self.batch_callback)
+        client = MinerClient()
+        results = client.batch([
+            'info_height',
+            'info_region',
+            ('peer_book', {'addr': 'self'})
+        ])
+
+        self.assertEqual(results, [
+            {'epoch': 25612, 'height': 993640},
+            {'region': 'EU868'},
+            []
+        ])
+        self.assertEqual(len(responses.calls), 1)
+        sent = json.loads(responses.calls[0].request.body)
+        self.assertEqual([req['id'] for req in sent], [1, 2, 3])
+        self.assertEqual(sent[2]['params'], {'addr': 'self'})
+        self.assertNotIn('params', sent[0])
+
+    @responses.activate
+    def test_batch_errors(self):
+        responses.add_callback(responses.POST, BASE_URL,
+                               callback=self.batch_callback)
+        client = MinerClient()
+        with self.assertRaisesRegex(MinerFailedFetchData, 'Method not found'):
+            client.batch(['info_height', 'not_a_method'])
+
+        height, error = client.batch(['info_height', 'not_a_method'],
+                                     raise_on_error=False)
+        self.assertEqual(height['height'], 993640)
+        self.assertIsInstance(error, MinerFailedFetchData)
+        self.assertEqual(client.batch([]), [])
+
+    @responses.activate
+    def test_batch_rejected(self):
+        responses.add(responses.POST, BASE_URL, json={
+            'jsonrpc': '2.0', 'id': None,
+            'error': {'code': -32600, 'message': 'Invalid Request'}})
+        client = MinerClient()
+        results = client.batch(['info_height'], raise_on_error=False)
+        self.assertIsInstance(results[0], MinerFailedFetchData)
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from hm_pyhelper.miner_json_rpc import AsyncMinerClient
+from hm_pyhelper.miner_json_rpc.circuit_breaker import CircuitBreaker, \
+    STATE_HALF_OPEN
+from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError, \
+    MinerCircuitOpen, MinerFailedFetchData, MinerMalformedAddGatewayTxn, MinerMalformedURL, \
+    MinerRegionUnset
+
+OWNER_ADDRESS = '14QjC3A5DEH2uFwhDxyBHdFir7YWGG23Fic1wGvkCr6qrWC7Q47'
+PAYER_ADDRESS = '13Zni1he7KY9pUmkXMhEhTwfUpL9AcEV1m2UbbvFsrU9QPTMgE3'
+ADD_GATEWAY_TXN = "CroBCiEBwPbb63LQD8x/m/ZDLLyOLgtxypQIjh+xPPS+d8g/i24SIQB" \
+                  "8XdzWqrIF201DNKHpXKFtsMtgvZeqBBc1wOk9sV2j4SJGMEQCIGE82g" \
+                  "Hbn0z/AOyaDXsuQDptC/I15fHCF//QEgzoxodrAiBsoRUiw8zMVttkP" \
+                  "hEOoMfM0smmdCZPKX6tVOgK0s/0KiohAVHXaw1kNly2VOt47MlzTfkC" \
+                  "IUTOgW34Orw1LSJt+9mCOICS9AFA6PsD"
+
+RESULTS = {
+    'info_height': {'epoch': 25612, 'height': 993640},
+    'info_region': {'region': 'EU868'},
+    'info_summary': {'firmware_version': '2021.10.18.0', 'height': 993640},
+    'peer_addr': {'peer_addr': '/p2p/11jr2kMp1bZvSC6pd3XkNvs9Q43qCgEzxRwV6vpuqXanC5UcLEs'},
+    'peer_book': [{'address': '/p2p/1'}],
+    'txn_add_gateway': {'result': ADD_GATEWAY_TXN}
+}
+
+
+class MinerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, req_body):
+        result = self.server.results.get(req_body['method'])
+        response = {'jsonrpc': '2.0', 'id': req_body['id']}
+        if result is None:
+            response['error'] = {'code': -32601, 'message': 'Method not found'}
+        else:
+            response['result'] = result
+        return response
+
+    def do_POST(self):
+        self.server.requests += 1
+        self.server.connections.add(self.client_address)
+        req_body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if isinstance(req_body, list):
+            response = [self.reply(req) for req in req_body]
+        else:
+            response = self.reply(req_body)
+        body = json.dumps(response).encode()
+
+        if self.server.status != 200 or self.server.body is not None:
+            body = self.server.body or b''
+            self.send_response(self.server.status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if self.server.chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i in range(0, len(body), 16):
+                chunk = body[i:i + 16]
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+
+class TestMinerJSONRPCAsync(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), MinerHandler)
+        self.server.results = dict(RESULTS)
+        self.server.requests = 0
+        self.server.connections = set()
+        self.server.chunked = False
+        self.server.status = 200
+        self.server.body = None
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={'poll_interval': 0.01})
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    async def test_methods(self):
+        async with AsyncMinerClient(self.url) as client:
+            self.assertEqual(await client.get_height(), RESULTS['info_height'])
+            self.assertEqual(await client.get_region(), RESULTS['info_region'])
+            self.assertEqual(await client.get_summary(), RESULTS['info_summary'])
+            self.assertEqual(await client.get_peer_addr(), RESULTS['peer_addr'])
+            self.assertEqual(await client.get_peer_book(), RESULTS['peer_book'])
+            self.assertEqual(await client.get_firmware_version(), '2021.10.18.0')
+
+            txn = await client.create_add_gateway_txn(OWNER_ADDRESS, PAYER_ADDRESS)
+            self.assertEqual(txn['owner_address'], OWNER_ADDRESS)
+            self.assertEqual(txn['staking_fee'], 4000000)
+            self.assertEqual(txn['txn'], ADD_GATEWAY_TXN)
+            with self.assertRaises(MinerMalformedAddGatewayTxn):
+                await client.create_add_gateway_txn(PAYER_ADDRESS, PAYER_ADDRESS)
+
+        # all requests are made over a single keep-alive connection
+        self.assertEqual(self.server.requests, 8)
+        self.assertEqual(len(self.server.connections), 1)
+
+    async def test_concurrent_requests(self):
+        async with AsyncMinerClient(self.url, max_connections=2) as client:
+            heights = await asyncio.gather(*(client.get_height()
+                                             for _ in range(10)))
+        self.assertEqual(heights, [RESULTS['info_height']] * 10)
+        self.assertLessEqual(len(self.server.connections), 2)
+
+    async def test_chunked_response(self):
+        self.server.chunked = True
+        async with AsyncMinerClient(self.url) as client:
+            self.assertEqual(await client.get_summary(), RESULTS['info_summary'])
+            self.assertEqual(await client.get_height(), RESULTS['info_height'])
+        self.assertEqual(len(self.server.connections), 1)
+
+    async def test_batch(self):
+        async with AsyncMinerClient(self.url) as client:
+            results = await client.batch(['info_height', ('peer_book', {'addr': 'self'})])
+            self.assertEqual(results, [RESULTS['info_height'], RESULTS['peer_book']])
+            self.assertEqual(await client.batch([]), [])
+            with self.assertRaises(MinerFailedFetchData):
+                await client.batch(['info_height', 'not_a_method'])
+
+    async def test_region_unset(self):
+        self.server.results['info_region'] = {'region': None}
+        async with AsyncMinerClient(self.url) as client:
+            with self.assertRaises(MinerRegionUnset):
+                await client.get_region()
+
+    async def test_http_error(self):
+        self.server.status = 500
+        async with AsyncMinerClient(self.url) as client:
+            with self.assertRaisesRegex(requests.exceptions.HTTPError,
+                                        '500 Server Error'):
+                await client.get_height()
+
+    async def test_http_error_html_body(self):
+        self.server.status = 502
+        self.server.body = b'<html><body>Bad Gateway</body></html>'
+        async with AsyncMinerClient(self.url) as client:
+            with self.assertRaisesRegex(requests.exceptions.HTTPError, '502'):
+                await client.get_height()
+
+    async def test_invalid_json(self):
+        self.server.body = b'<html></html>'
+        breaker = CircuitBreaker(failure_threshold=1)
+        async with AsyncMinerClient(self.url, circuit_breaker=breaker) as client:
+            with self.assertRaisesRegex(MinerFailedFetchData, 'invalid JSON'):
+                await client.get_height()
+            # the connection is still usable
+            self.server.body = None
+            self.assertEqual(await client.get_height(), RESULTS['info_height'])
+
+    async def test_malformed_status_line(self):
+        async def not_http(reader, writer):
+            await reader.readuntil(b'\r\n\r\n')
+            writer.write(b'garbage\r\n\r\n')
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(not_http, '127.0.0.1', 0)
+        url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+        async with AsyncMinerClient(url) as client:
+            with self.assertRaisesRegex(MinerFailedFetchData, 'malformed'):
+                await client.get_height()
+        server.close()
+        await server.wait_closed()
+
+    async def test_malformed_url(self):
+        async with AsyncMinerClient('fakeurl') as client:
+            with self.assertRaises(MinerMalformedURL):
+                await client.get_height()
+
+    async def test_connection_error(self):
+        async with AsyncMinerClient('http://127.0.0.1:1') as client:
+            with self.assertRaises(MinerConnectionError):
+                await client.get_height()
+
+    async def test_stale_connection_retried(self):
+        async with AsyncMinerClient(self.url) as client:
+            await client.get_height()
+            # server drops the idle keep-alive connection
+            _, writer = client._pool._idle[0]
+            writer.transport.abort()
+            self.assertEqual(await client.get_height(), RESULTS['info_height'])
+        self.assertEqual(len(self.server.connections), 2)
+
+    async def test_timeout_and_circuit_breaker(self):
+        async def never_answer(reader, writer):
+            await reader.read()
+
+        server = await asyncio.start_server(never_answer, '127.0.0.1', 0)
+        url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+        breaker = CircuitBreaker(failure_threshold=1)
+        async with AsyncMinerClient(url, read_timeout=0.05,
+                                    circuit_breaker=breaker) as client:
+            with self.assertRaisesRegex(MinerConnectionError, 'Timed out'):
+                await client.get_height()
+            with self.assertRaises(MinerCircuitOpen):
+                await client.get_height()
+        server.close()
+        await server.wait_closed()
+
+    async def test_cancelled_probe(self):
+        async def never_answer(reader, writer):
+            await reader.read()
+
+        server = await asyncio.start_server(never_answer, '127.0.0.1', 0)
+        url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.before_call()
+        breaker.record_failure()
+        async with AsyncMinerClient(url, circuit_breaker=breaker) as client:
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.get_height(), 0.05)
+        # the miner never answered, the next call probes again
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+        breaker.before_call()
+        server.close()
+        await server.wait_closed()
+
+    async def test_no_resend_after_partial_response(self):
+        received = []
+
+        async def drop_second_response(reader, writer):
+            while True:
+                headers = await reader.readuntil(b'\r\n\r\n')
+                length = int(headers.split(b'Content-Length: ')[1].split()[0])
+                received.append(await reader.readexactly(length))
+                if len(received) == 1:
+                    body = b'{"result": 1}'
+                    writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n'
+                                 b'\r\n%s' % (len(body), body))
+                else:
+                    writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 100\r\n'
+                                 b'\r\n{')
+                    await writer.drain()
+                    writer.close()
+                    return
+
+        server = await asyncio.start_server(drop_second_response,
+                                            '127.0.0.1', 0)
+        url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+        async with AsyncMinerClient(url) as client:
+            self.assertEqual(await client.get_height(), 1)
+            with self.assertRaises(MinerConnectionError):
+                await client.create_add_gateway_txn(OWNER_ADDRESS,
+                                                    PAYER_ADDRESS)
+        self.assertEqual(len(received), 2)
+        server.close()
+        await server.wait_closed()
+
+    async def test_write_timeout(self):
+        stalled = asyncio.Event()
+
+        async def never_read(reader, writer):
+            await stalled.wait()
+
+        server = await asyncio.start_server(never_read, '127.0.0.1', 0)
+        url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+        async with AsyncMinerClient(url, read_timeout=0.2) as client:
+            with self.assertRaisesRegex(MinerConnectionError, 'Timed out'):
+                await client.batch([('info_height', {'padding': 'x' * 2 ** 25})])
+        stalled.set()
+        server.close()
+        await server.wait_closed()
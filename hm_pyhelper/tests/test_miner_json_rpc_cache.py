@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+
+import mock
+import responses
+
+from hm_pyhelper.miner_json_rpc import MinerClient
+from hm_pyhelper.miner_json_rpc.cache import DEFAULT_CACHE_TTLS, \
+    ResponseCache
+from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError
+from hm_pyhelper.tests.fake_clock import FakeClock
+
+BASE_URL = 'http://helium-miner:4467'
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(clock=self.clock)
+        self.fetch = mock.Mock(side_effect=lambda: {'height': self.clock.now})
+
+    def test_ttl(self):
+        self.assertEqual(self.cache.get('info_height', {}, self.fetch), {'height': 0})
+        self.clock.now = DEFAULT_CACHE_TTLS['info_height'] - 1
+        self.assertEqual(self.cache.get('info_height', {}, self.fetch), {'height': 0})
+        self.clock.now = DEFAULT_CACHE_TTLS['info_height']
+        self.assertEqual(self.cache.get('info_height', {}, self.fetch),
+                         {'height': DEFAULT_CACHE_TTLS['info_height']})
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_uncached_method(self):
+        self.cache.get('peer_addr', {}, self.fetch)
+        self.cache.get('peer_addr', {}, self.fetch)
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertIsNone(self.cache.get_metadata('peer_addr'))
+
+    def test_params_are_part_of_key(self):
+        cache = ResponseCache(ttls={'peer_book': 10}, clock=self.clock)
+        cache.get('peer_book', {'addr': 'self'}, self.fetch)
+        cache.get('peer_book', {'addr': 'self'}, self.fetch)
+        cache.get('peer_book', {'addr': 'other'}, self.fetch)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_copy_returned(self):
+        self.cache.get('info_height', {}, self.fetch)['height'] = 'mutated'
+        self.assertEqual(self.cache.get('info_height', {}, self.fetch), {'height': 0})
+
+    def test_metadata_and_invalidate(self):
+        self.cache.get('info_region', {}, self.fetch)
+        self.clock.now = 100
+        self.assertEqual(self.cache.get_metadata('info_region'), {
+            'age': 100, 'ttl': DEFAULT_CACHE_TTLS['info_region'], 'stale': False
+        })
+        self.clock.now = 1000
+        self.assertTrue(self.cache.get_metadata('info_region')['stale'])
+
+        self.cache.invalidate('info_region')
+        self.assertIsNone(self.cache.get_metadata('info_region'))
+        self.cache.get('info_region', {}, self.fetch)
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get_metadata('info_region'))
+
+    def test_errors_not_cached(self):
+        fetch = mock.Mock(side_effect=[MinerConnectionError(), {'height': 1}])
+        with self.assertRaises(MinerConnectionError):
+            self.cache.get('info_height', {}, fetch)
+        self.assertEqual(self.cache.get('info_height', {}, fetch), {'height': 1})
+
+    def test_coalescing(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch():
+            started.set()
+            release.wait()
+            return {'height': 42}
+
+        fetch = mock.Mock(side_effect=slow_fetch)
+        results = []
+
+        def call():
+            results.append(self.cache.get('info_height', {}, fetch))
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while self.cache.coalesced < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(results, [{'height': 42}] * 5)
+
+
+class TestMinerClientCache(unittest.TestCase):
+
+    @responses.activate
+    def test_client_cache(self):
+        responses.add(responses.POST, BASE_URL, json={
+            'id': 1, 'result': {'firmware_version': '2021.10.18.0', 'height': 1}})
+        with MinerClient(cache=True) as client:
+            self.assertEqual(client.get_firmware_version(), '2021.10.18.0')
+            self.assertEqual(client.get_summary()['height'], 1)
+            self.assertFalse(client.cache.get_metadata('info_summary')['stale'])
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_no_cache_by_default(self):
+        responses.add(responses.POST, BASE_URL, json={'id': 1, 'result': {}})
+        with MinerClient() as client:
+            self.assertIsNone(client.cache)
+            client.get_summary()
+            client.get_summary()
+        self.assertEqual(len(responses.calls), 2)
@@ -0,0 +1,141 @@
+import json
+import unittest
+
+import mock
+import requests
+import responses
+
+from hm_pyhelper.miner_json_rpc import MinerClient
+from hm_pyhelper.miner_json_rpc.circuit_breaker import CircuitBreaker, \
+    STATE_CLOSED, STATE_HALF_OPEN
+from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError, \
+    MinerFailedFetchData
+from hm_pyhelper.miner_json_rpc.streaming import iter_result_items
+
+BASE_URL = 'http://helium-miner:4467'
+
+PEER_BOOK = [
+    {
+        'address': '/p2p/11jr2kMp1bZvSC6pd3XkNvs9Q43qCgEzxRwV6vpuqXanC5UcLEs',
+        'listen_addrs': ['/ip4/192.168.1.2/tcp/44158'],
+        'name': 'scruffy-chocolate-shell',
+        'nat': 'none',
+        'last_updated': 1637336419123
+    },
+    {
+        'address': '/p2p/112qB3YaH5bZkCnKA5uRH7tBtGNv2Y5B4smv1jsmvGUzgKT71QpE',
+        'listen_addrs': [],
+        'name': 'fünky-ünicode-näme',
+        'nat': 'symmetric',
+        'last_updated': 42
+    }
+]
+
+
+def chunked(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class TestStreaming(unittest.TestCase):
+
+    def parse(self, document, chunk_size=1):
+        data = json.dumps(document, ensure_ascii=False).encode()
+        return list(iter_result_items(chunked(data, chunk_size)))
+
+    def test_result_array(self):
+        document = {'jsonrpc': '2.0', 'id': 1, 'result': PEER_BOOK}
+        for chunk_size in (1, 3, 7, 4096):
+            self.assertEqual(self.parse(document, chunk_size), PEER_BOOK)
+
+    def test_result_first(self):
+        document = {'result': [1, 22, 333, 4444.5, None, 'x'], 'id': 1}
+        self.assertEqual(self.parse(document), [1, 22, 333, 4444.5, None, 'x'])
+
+    def test_empty(self):
+        self.assertEqual(self.parse({'id': 1, 'result': []}), [])
+        self.assertEqual(self.parse({}), [])
+        self.assertEqual(self.parse({'result': None}), [])
+
+    def test_error(self):
+        document = {'id': 1, 'result': None,
+                    'error': {'code': -32601, 'message': 'Method not found'}}
+        with self.assertRaisesRegex(MinerFailedFetchData, 'Method not found'):
+            self.parse(document)
+
+    def test_malformed(self):
+        for data in (b'', b'[1, 2]', b'{"result": [1, 2', b'{"result": [1 2]}'):
+            with self.assertRaises(MinerFailedFetchData):
+                list(iter_result_items(chunked(data, 2)))
+
+    def test_bounded_buffer(self):
+        # A generator producing the document lazily: the stream must
+        # yield entries before the whole body has been produced.
+        produced = []
+
+        def body():
+            yield b'{"id": 1, "result": ['
+            for i in range(1000):
+                produced.append(i)
+                yield (b',' if i else b'') + json.dumps({'n': i}).encode()
+            yield b']}'
+
+        items = iter_result_items(body())
+        self.assertEqual(next(items), {'n': 0})
+        self.assertLess(len(produced), 3)
+        self.assertEqual(sum(1 for _ in items), 999)
+
+
+class TestMinerClientStreaming(unittest.TestCase):
+
+    @responses.activate
+    def test_iter_peer_book(self):
+        responses.add(responses.POST, BASE_URL,
+                      json={'jsonrpc': '2.0', 'id': 1, 'result': PEER_BOOK})
+        with MinerClient() as client:
+            self.assertEqual(list(client.iter_peer_book(chunk_size=5)),
+                             PEER_BOOK)
+        sent = json.loads(responses.calls[0].request.body)
+        self.assertEqual(sent['method'], 'peer_book')
+        self.assertEqual(sent['params'], {'addr': 'self'})
+
+    @responses.activate
+    def test_iter_peer_book_connection_lost(self):
+        responses.add(responses.POST, BASE_URL, body=b'{"result": [')
+        with MinerClient() as client:
+            peer_book = client.iter_peer_book()
+            with mock.patch('requests.models.Response.iter_content',
+                            side_effect=requests.exceptions.ChunkedEncodingError()):
+                with self.assertRaises(MinerConnectionError):
+                    list(peer_book)
+
+    @responses.activate
+    def test_iter_peer_book_http_error(self):
+        responses.add(responses.POST, BASE_URL, status=500)
+        with MinerClient() as client:
+            with mock.patch('requests.models.Response.close',
+                            autospec=True) as close:
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    list(client.iter_peer_book())
+        close.assert_called()
+
+    @responses.activate
+    def test_iter_peer_book_circuit_breaker(self):
+        responses.add(responses.POST, BASE_URL,
+                      json={'jsonrpc': '2.0', 'id': 1, 'result': PEER_BOOK})
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        with MinerClient(circuit_breaker=breaker) as client:
+            with mock.patch('requests.models.Response.iter_content',
+                            side_effect=requests.exceptions.ChunkedEncodingError()):
+                with self.assertRaises(MinerConnectionError):
+                    list(client.iter_peer_book())
+            self.assertEqual(breaker.get_metrics()['failures'], 1)
+            self.assertEqual(breaker.state, STATE_HALF_OPEN)
+
+            # stopping early neither closes nor re-opens the circuit
+            peer_book = client.iter_peer_book(chunk_size=5)
+            next(peer_book)
+            peer_book.close()
+            self.assertEqual(breaker.state, STATE_HALF_OPEN)
+
+            self.assertEqual(list(client.iter_peer_book()), PEER_BOOK)
+            self.assertEqual(breaker.state, STATE_CLOSED)
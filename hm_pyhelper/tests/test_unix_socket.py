@@ -0,0 +1,99 @@
+import asyncio
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+
+from hm_pyhelper.gateway_grpc.client import GatewayClient
+from hm_pyhelper.miner_json_rpc import MinerClient, AsyncMinerClient
+from hm_pyhelper.miner_json_rpc.exceptions import MinerConnectionError
+from hm_pyhelper.miner_json_rpc.unix_adapter import get_socket_path, \
+    is_unix_url
+from hm_pyhelper.tests.fake_gateway import FakeGatewayServer
+from hm_pyhelper.tests.test_fake_gateway import PUBKEY_DECODED
+from hm_pyhelper.tests.test_miner_json_rpc_async import MinerHandler, RESULTS
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TestUnixSocket(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'miner.sock')
+        self.url = 'unix://' + self.socket_path
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def start_miner(self):
+        server = UnixHTTPServer(self.socket_path, MinerHandler)
+        server.results = dict(RESULTS)
+        server.requests = 0
+        server.connections = set()
+        server.chunked = False
+        server.status = 200
+        server.body = None
+        thread = threading.Thread(target=server.serve_forever,
+                                  kwargs={'poll_interval': 0.01})
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        self.addCleanup(stop)
+        return server
+
+    def test_url_helpers(self):
+        self.assertTrue(is_unix_url('unix:///var/run/miner.sock'))
+        self.assertFalse(is_unix_url('http://helium-miner:4467'))
+        self.assertEqual(get_socket_path('unix:///var/run/miner.sock'),
+                         '/var/run/miner.sock')
+
+    def test_miner_client(self):
+        server = self.start_miner()
+        with MinerClient(self.url) as client:
+            self.assertEqual(client.get_height(), RESULTS['info_height'])
+            self.assertEqual(client.get_region(), RESULTS['info_region'])
+            self.assertEqual(client.batch(['info_height', 'peer_addr']),
+                             [RESULTS['info_height'], RESULTS['peer_addr']])
+            self.assertEqual(list(client.iter_peer_book()),
+                             RESULTS['peer_book'])
+        self.assertEqual(server.requests, 4)
+
+    def test_miner_client_no_socket(self):
+        with MinerClient(self.url) as client:
+            with self.assertRaises(MinerConnectionError):
+                client.get_height()
+
+    def test_async_miner_client(self):
+        server = self.start_miner()
+
+        async def run():
+            async with AsyncMinerClient(self.url) as client:
+                return [await client.get_height(), await client.get_summary()]
+
+        self.assertEqual(asyncio.run(run()),
+                         [RESULTS['info_height'], RESULTS['info_summary']])
+        self.assertEqual(server.requests, 2)
+
+    def test_async_miner_client_no_socket(self):
+        async def run():
+            async with AsyncMinerClient(self.url) as client:
+                await client.get_height()
+
+        with self.assertRaises(MinerConnectionError):
+            asyncio.run(run())
+
+    def test_gateway_client(self):
+        socket_path = os.path.join(self.tmp_dir, 'gateway.sock')
+        with FakeGatewayServer(socket_path=socket_path) as server:
+            self.assertEqual(server.address, 'unix://' + socket_path)
+            with GatewayClient(server.address) as client:
+                self.assertEqual(client.get_pubkey(), PUBKEY_DECODED)
+            self.assertEqual(server.servicer.calls['pubkey'], 1)
@@ -0,0 +1,96 @@
+"Test cases for util.add_gateway_txn module."
+
+import base64
+import unittest
+
+from hm_pyhelper.exceptions import MalformedAddGatewayTxn
+from hm_pyhelper.gateway_grpc import client as gateway_client
+from hm_pyhelper.gateway_grpc.exceptions import \
+    MinerMalformedAddGatewayTxn as GatewayMalformedAddGatewayTxn
+from hm_pyhelper.miner_json_rpc import client as miner_client
+from hm_pyhelper.miner_json_rpc.exceptions import \
+    MinerMalformedAddGatewayTxn, MinerJSONRPCException
+from hm_pyhelper.protos import blockchain_txn_pb2
+from hm_pyhelper.util.add_gateway_txn import AddGatewayTxnInfo, \
+    inspect_add_gateway_txn, verify_add_gateway_txn
+
+WRAPPED_TXN = base64.b64decode(
+    "CroBCiEBwPbb63LQD8x/m/ZDLLyOLgtxypQIjh+xPPS+d8g/i24SIQB"
+    "8XdzWqrIF201DNKHpXKFtsMtgvZeqBBc1wOk9sV2j4SJGMEQCIGE82g"
+    "Hbn0z/AOyaDXsuQDptC/I15fHCF//QEgzoxodrAiBsoRUiw8zMVttkP"
+    "hEOoMfM0smmdCZPKX6tVOgK0s/0KiohAVHXaw1kNly2VOt47MlzTfkC"
+    "IUTOgW34Orw1LSJt+9mCOICS9AFA6PsD")
+
+EXPECTED_INFO = AddGatewayTxnInfo(
+    gateway_address='11wmnCAfvFkdx3Az1hesTsSv9YeBUhs8JZKjCqcs2vmRwRazpBa',
+    owner_address='14QjC3A5DEH2uFwhDxyBHdFir7YWGG23Fic1wGvkCr6qrWC7Q47',
+    payer_address='13Zni1he7KY9pUmkXMhEhTwfUpL9AcEV1m2UbbvFsrU9QPTMgE3',
+    fee=65000,
+    staking_fee=4000000
+)
+
+
+def unwrap(wrapped_txn):
+    txn = blockchain_txn_pb2.blockchain_txn()
+    txn.ParseFromString(wrapped_txn)
+    return txn.add_gateway
+
+
+class TestAddGatewayTxn(unittest.TestCase):
+
+    def setUp(self):
+        inspect_add_gateway_txn.cache_clear()
+
+    def test_inspect_wrapped(self):
+        self.assertEqual(inspect_add_gateway_txn(WRAPPED_TXN, wrapped=True),
+                         EXPECTED_INFO)
+
+    def test_inspect_unwrapped(self):
+        txn = unwrap(WRAPPED_TXN).SerializeToString()
+        self.assertEqual(inspect_add_gateway_txn(txn), EXPECTED_INFO)
+
+    def test_inspect_cached(self):
+        for _ in range(3):
+            inspect_add_gateway_txn(WRAPPED_TXN, wrapped=True)
+        cache_info = inspect_add_gateway_txn.cache_info()
+        self.assertEqual(cache_info.misses, 1)
+        self.assertEqual(cache_info.hits, 2)
+
+    def test_inspect_malformed(self):
+        with self.assertRaises(MalformedAddGatewayTxn):
+            inspect_add_gateway_txn(b'\xff\xff\xff', wrapped=True)
+        with self.assertRaises(MinerMalformedAddGatewayTxn):
+            inspect_add_gateway_txn(b'\xff\xff\xff', wrapped=True,
+                                    error_class=MinerMalformedAddGatewayTxn)
+
+    def test_verify(self):
+        verify_add_gateway_txn(EXPECTED_INFO)
+        verify_add_gateway_txn(EXPECTED_INFO,
+                               EXPECTED_INFO.gateway_address,
+                               EXPECTED_INFO.owner_address,
+                               EXPECTED_INFO.payer_address)
+
+        with self.assertRaisesRegex(MalformedAddGatewayTxn,
+                                    'Expected payer address'):
+            verify_add_gateway_txn(EXPECTED_INFO,
+                                   payer_address=EXPECTED_INFO.owner_address)
+
+    def test_client_exceptions(self):
+        # Client specific exceptions share a common base class
+        self.assertTrue(issubclass(MinerMalformedAddGatewayTxn,
+                                   MinerJSONRPCException))
+        self.assertTrue(issubclass(MinerMalformedAddGatewayTxn,
+                                   MalformedAddGatewayTxn))
+        self.assertTrue(issubclass(GatewayMalformedAddGatewayTxn,
+                                   MalformedAddGatewayTxn))
+
+    def test_get_address_from_add_gateway_txn(self):
+        add_gateway_txn = unwrap(WRAPPED_TXN)
+        for module, error_class in (
+                (miner_client, MinerMalformedAddGatewayTxn),
+                (gateway_client, GatewayMalformedAddGatewayTxn)):
+            self.assertEqual(module.get_address_from_add_gateway_txn(
+                add_gateway_txn, 'owner'), EXPECTED_INFO.owner_address)
+            with self.assertRaises(error_class):
+                module.get_address_from_add_gateway_txn(
+                    add_gateway_txn, 'gateway', EXPECTED_INFO.owner_address)
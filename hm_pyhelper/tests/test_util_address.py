@@ -0,0 +1,53 @@
+"Test cases for util.address module."
+
+import unittest
+
+from hm_pyhelper.tests.benchmark_address import run_benchmarks
+from hm_pyhelper.util.address import address_cache_info, \
+    clear_address_cache, decode_address, decode_addresses, encode_address, \
+    encode_addresses
+
+PUBKEY_ENCODED = b"\x01\xc3\x06\x7f\xb9\x19}\xd1n2\xe2M\xeb\xb5\x11\x7f" \
+                 b"\xbc\x12\xebT\xb9\x84R\xc7\xca\xf8o\xdddx\xea~\xab"
+PUBKEY_DECODED = "14RdqcZC2rbdTBwNaTsj5EVWYaM7BKGJ44ycq6wWJy9Hg7RKCii"
+PAYER_ADDRESS = "13Zni1he7KY9pUmkXMhEhTwfUpL9AcEV1m2UbbvFsrU9QPTMgE3"
+
+
+class TestAddress(unittest.TestCase):
+
+    def setUp(self):
+        clear_address_cache()
+
+    def test_encode_decode(self):
+        self.assertEqual(encode_address(PUBKEY_ENCODED), PUBKEY_DECODED)
+        self.assertEqual(decode_address(PUBKEY_DECODED), PUBKEY_ENCODED)
+        self.assertEqual(encode_address(decode_address(PAYER_ADDRESS)),
+                         PAYER_ADDRESS)
+
+    def test_invalid_address(self):
+        with self.assertRaises(ValueError):
+            decode_address(PUBKEY_DECODED[:-1] + '1')
+
+    def test_cache(self):
+        for _ in range(3):
+            encode_address(PUBKEY_ENCODED)
+            decode_address(PUBKEY_DECODED)
+
+        cache_info = address_cache_info()
+        self.assertEqual(cache_info['encode']['misses'], 1)
+        self.assertEqual(cache_info['encode']['hits'], 2)
+        self.assertEqual(cache_info['decode']['misses'], 1)
+        self.assertEqual(cache_info['decode']['hits'], 2)
+
+    def test_batch(self):
+        addresses = [PUBKEY_DECODED, PAYER_ADDRESS, PUBKEY_DECODED]
+        decoded = decode_addresses(addresses)
+        self.assertEqual(decoded[0], PUBKEY_ENCODED)
+        self.assertEqual(encode_addresses(bytearray(key) for key in decoded),
+                         addresses)
+        self.assertEqual(address_cache_info()['decode']['misses'], 2)
+
+    def test_benchmark(self):
+        results = run_benchmarks(addresses=2, calls=10, repeat=1)
+        self.assertEqual(set(results), {'base58 encode', 'codec encode',
+                                        'base58 decode', 'codec decode'})
@@ -0,0 +1,122 @@
+"""
+Single-pass inspection of blockchain_txn_add_gateway_v1 transactions,
+shared by the miner JSON-RPC and gateway-rs gRPC clients.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+from google.protobuf.message import DecodeError
+
+from hm_pyhelper.exceptions import MalformedAddGatewayTxn
+from hm_pyhelper.protos import blockchain_txn_pb2, \
+    blockchain_txn_add_gateway_v1_pb2
+from hm_pyhelper.util.address import encode_address
+
+ADDRESS_TYPES = ('gateway', 'owner', 'payer')
+TXN_CACHE_SIZE = 64
+
+
+class AddGatewayTxnInfo(NamedTuple):
+    gateway_address: str
+    owner_address: str
+    payer_address: str
+    fee: int
+    staking_fee: int
+
+
+@lru_cache(maxsize=TXN_CACHE_SIZE)
+def inspect_add_gateway_txn(txn: bytes, wrapped: bool = False,
+                            error_class=MalformedAddGatewayTxn) -> AddGatewayTxnInfo:
+    """
+    Parses a serialized add gateway transaction once and decodes all of
+    its addresses and fees. Results are cached by txn, so validating the
+    same transaction again (eg. on BLE retries) does not parse it again.
+
+    Params:
+        - txn: serialized blockchain_txn_add_gateway_v1, or a
+               blockchain_txn wrapping one if wrapped is True.
+        - wrapped: True if txn is a blockchain_txn, like the ones
+                   returned by the miner txn_add_gateway RPC.
+        - error_class (optional): Exception raised on parse errors.
+
+    Raises:
+        error_class if txn can not be parsed.
+    """
+    try:
+        if wrapped:
+            # https://github.com/helium/blockchain-core/blob/3cd6bca6c5595a1363a9bbd625ef254383a4141b/src/transactions/blockchain_txn.erl#L160
+            wrapped_txn = blockchain_txn_pb2.blockchain_txn()
+            wrapped_txn.ParseFromString(txn)
+            add_gateway_txn = wrapped_txn.add_gateway
+        else:
+            add_gateway_txn = blockchain_txn_add_gateway_v1_pb2.\
+                blockchain_txn_add_gateway_v1()
+            add_gateway_txn.ParseFromString(txn)
+    except DecodeError as e:
+        raise error_class(f"Unable to parse add gateway txn: {e}")
+
+    return AddGatewayTxnInfo(
+        gateway_address=encode_address(add_gateway_txn.gateway),
+        owner_address=encode_address(add_gateway_txn.owner),
+        payer_address=encode_address(add_gateway_txn.payer),
+        fee=add_gateway_txn.fee,
+        staking_fee=add_gateway_txn.staking_fee
+    )
+
+
+def check_address(address_type: str, address: str, expected_address: str = None,
+                  error_class=MalformedAddGatewayTxn):
+    """
+    Raises error_class if expected_address is supplied and does not
+    match address.
+    """
+    if expected_address is not None and address != expected_address:
+        msg = f"Expected {address_type} address to be {expected_address}," + \
+              f"but is {address}"
+        raise error_class(msg)
+
+
+def verify_add_gateway_txn(txn_info: AddGatewayTxnInfo,
+                           gateway_address: str = None,
+                           owner_address: str = None,
+                           payer_address: str = None,
+                           error_class=MalformedAddGatewayTxn):
+    """
+    Checks the addresses of an inspected transaction against the
+    expected ones. Addresses that are None are not checked.
+
+    Raises:
+        error_class if any supplied address does not match.
+    """
+    expected_addresses = (gateway_address, owner_address, payer_address)
+    for address_type, expected_address in zip(ADDRESS_TYPES, expected_addresses):
+        check_address(address_type,
+                      getattr(txn_info, f"{address_type}_address"),
+                      expected_address, error_class)
+
+
+def get_address_from_add_gateway_txn(add_gateway_txn:
+                                     blockchain_txn_add_gateway_v1_pb2,
+                                     address_type: str,
+                                     expected_address: str = None,
+                                     error_class=MalformedAddGatewayTxn) -> str:
+    """
+    Deserializes specified field in an already parsed
+    blockchain_txn_add_gateway_v1_pb2 protobuf to a base58 Helium address.
+    Prefer inspect_add_gateway_txn when more than one field is needed.
+
+    Params:
+        - add_gateway_txn: The blockchain_txn_add_gateway_v1_pb2 to
+                           inspect.
+        - address_type: 'owner', 'gateway', or 'payer'.
+        - expected_address (optional): Value we expect to be returned.
+        - error_class (optional): Exception raised on mismatch.
+
+    Raises:
+        error_class if expected_address supplied and does not match
+        the return value.
+    """
+    # Convert binary address to base58
+    address = encode_address(getattr(add_gateway_txn, address_type))
+    check_address(address_type, address, expected_address, error_class)
+    return address
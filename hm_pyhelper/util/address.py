@@ -0,0 +1,67 @@
+"""
+Memoized encoding and decoding of base58check Helium addresses.
+
+base58.b58encode_check/b58decode_check convert through a big integer
+and hash twice on every call. The same handful of addresses (Nebra's
+payer wallet, the gateway's own key) are converted over and over, so
+results are kept in bounded LRU caches.
+"""
+from functools import lru_cache
+from typing import Iterable, List
+
+import base58
+
+# Addresses returned by the RPC response are missing a leading
+# byte for the version. The version is currently always 0.
+# https://github.com/helium/helium-js/blob/8d5cb76e156fb80de6fc80f239b43e3872c7b7d7/packages/crypto/src/Address.ts#L64
+VERSION_BYTE = b'\x00'
+
+ADDRESS_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def encode_address(address_bytes: bytes) -> str:
+    """
+    Encode binary address bytes, as found in RPC responses and
+    transactions (without version byte), to a base58 Helium address.
+    """
+    return base58.b58encode_check(VERSION_BYTE + address_bytes).decode()
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def decode_address(address: str) -> bytes:
+    """
+    Decode a base58 Helium address to the binary address bytes expected
+    by RPC requests (without version byte).
+
+    Raises ValueError if the checksum is invalid.
+    """
+    # base58 gives version number as first byte. Get rid of it.
+    return base58.b58decode_check(address)[1:]
+
+
+def encode_addresses(addresses_bytes: Iterable[bytes]) -> List[str]:
+    """
+    Batch version of encode_address. Duplicates are only encoded once.
+    """
+    return [encode_address(bytes(address_bytes))
+            for address_bytes in addresses_bytes]
+
+
+def decode_addresses(addresses: Iterable[str]) -> List[bytes]:
+    """
+    Batch version of decode_address. Duplicates are only decoded once.
+    """
+    return [decode_address(address) for address in addresses]
+
+
+def clear_address_cache():
+    encode_address.cache_clear()
+    decode_address.cache_clear()
+
+
+def address_cache_info() -> dict:
+    return {
+        'encode': encode_address.cache_info()._asdict(),
+        'decode': decode_address.cache_info()._asdict()
+    }